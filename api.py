@@ -0,0 +1,289 @@
+import gzip
+import hashlib
+import json
+from datetime import datetime, timezone
+
+from flask import Blueprint, current_app, jsonify, request, session
+
+from database import get_db_connection
+from pagination import page_args, keyset_page
+from periods import period_key, period_label
+from rollups import monthly_totals
+from settlement import settle, trainer_settlement
+
+try:
+    import brotli
+except ImportError:  # İsteğe bağlı; yoksa sadece gzip
+    brotli = None
+
+# Salt okunur JSON API: /api/v1/...
+#
+# Tablet ve entegrasyonlar listeleri sık sık yoklar; çoğu yoklamada veri
+# değişmemiştir. Her yanıtın ETag'i, kullandığı tabloların table_versions
+# sayaçlarından (migration 14, tetikleyicilerle tutulur) türetilir. Sayaçlar
+# değişmediyse If-None-Match / If-Modified-Since isteklerine sorgu
+# çalıştırılmadan 304 döner. Gövde Accept-Encoding'e göre gzip veya
+# (brotli modülü kuruluysa) br ile sıkıştırılır.
+#
+# Eğitmen web arayüzündeki gibi sadece kendi üyelerini (members.trainer_id),
+# onların kayıt ve ödemelerini görür; hakedişte sadece kendi satırını alır,
+# gelir raporu yöneticiye açıktır. ETag kullanıcıya göre değişir.
+#
+#   GET /api/v1/members?fields=id,name,belt_level&limit=200&after=1200
+#   GET /api/v1/payments?member_id=42
+#   GET /api/v1/payments/17
+#   GET /api/v1/reports/monthly
+#   GET /api/v1/reports/settlement/2024-09
+#
+# Liste yanıtı: {"data": [...], "next_after": <sonraki sayfa için after> | null}
+
+COMPRESS_MIN_SIZE = 1024      # Bayt; daha küçük gövdeler sıkıştırılmaz
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+class Resource:
+    """Bir tablonun API'de görünen alanları ve izin verilen süzgeçleri."""
+
+    def __init__(self, table, fields, filters=None, trainer_scope=None):
+        self.table = table
+        self.fields = fields
+        self.filters = filters or {}       # parametre adı -> değer dönüştürücü
+        self.trainer_scope = trainer_scope  # eğitmenin görebildiği satırlar (? = eğitmen id)
+
+    def scoped(self):
+        return session['role'] != 'admin' and self.trainer_scope is not None
+
+    def tables(self):
+        """ETag'e giren tablolar; kapsam üyelere bağlıysa members da."""
+        return (self.table, 'members') if self.scoped() and self.table != 'members' else (self.table,)
+
+    def columns(self):
+        """?fields=a,b → seçilecek alanlar; id her zaman dahil (sayfalama anahtarı)."""
+        requested = request.args.get('fields')
+        if not requested:
+            return self.fields
+        names = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ValueError(f"bilinmeyen alan: {', '.join(unknown)}")
+        return ('id',) + tuple(name for name in self.fields if name in names and name != 'id')
+
+    def conditions(self):
+        where, params = [], []
+        if self.scoped():
+            where.append(self.trainer_scope)
+            params.append(session['user_id'])
+        for name, convert in self.filters.items():
+            value = request.args.get(name)
+            if value is None:
+                continue
+            converted = convert(value)
+            if converted is None:
+                raise ValueError(f'geçersiz {name}: {value}')
+            where.append(f'{name} = ?')
+            params.append(converted)
+        return where, params
+
+
+# Eğitmenin kendi üyeleri; /members ile aynı ölçüt
+OWN_MEMBERS = 'member_id IN (SELECT id FROM members WHERE trainer_id = ?)'
+
+
+def _int(value):
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+RESOURCES = {
+    'members': Resource('members', (
+        'id', 'name', 'email', 'phone', 'birth_date', 'height', 'weight', 'belt_level',
+        'weight_category', 'parent_name', 'parent_phone', 'parent_email',
+        'registration_date', 'join_date', 'trainer_id',
+    ), {'trainer_id': _int, 'belt_level': str}, trainer_scope='trainer_id = ?'),
+    'classes': Resource('classes', (
+        'id', 'name', 'description', 'day', 'time', 'trainer_id',
+    ), {'trainer_id': _int}),
+    'enrollments': Resource('enrollments', (
+        'id', 'member_id', 'class_id',
+    ), {'member_id': _int, 'class_id': _int}, trainer_scope=OWN_MEMBERS),
+    'payments': Resource('payments', (
+        'id', 'member_id', 'amount', 'payment_date', 'start_date', 'end_date', 'period', 'note',
+    ), {'member_id': _int, 'period': period_key}, trainer_scope=OWN_MEMBERS),
+}
+
+# Rapor toplamları (revenue_rollup) ödemelerden türetilir; sayacı kaynak tablodan
+MONTHLY_TABLES = ('payments',)
+# Hakediş: kapatılmış aylar settlement_*'tan, açık aylar canlı tablolardan
+SETTLEMENT_TABLES = ('payments', 'enrollments', 'classes', 'trainers', 'settlement_periods')
+
+
+# --- Koşullu yanıt ---
+
+def _validators(conn, tables):
+    """(ETag, Last-Modified): tablo sayaçları + kullanıcı, istek yolu ve parametreleri."""
+    rows = conn.execute(
+        f"SELECT name, version, changed_at FROM table_versions WHERE name IN ({', '.join('?' * len(tables))}) ORDER BY name",
+        tables,
+    ).fetchall()
+    args = sorted(request.args.items(multi=True))
+    user = [session['role'], session['user_id']]
+    key = json.dumps([user, request.path, args, [tuple(row) for row in rows]], ensure_ascii=False)
+    etag = hashlib.blake2b(key.encode(), digest_size=12).hexdigest()
+    changed_at = max((row['changed_at'] for row in rows), default=None)
+    last_modified = datetime.fromisoformat(changed_at).replace(tzinfo=timezone.utc) if changed_at else None
+    return etag, last_modified
+
+
+def _not_modified(etag, last_modified):
+    # If-None-Match varsa If-Modified-Since'e bakılmaz (RFC 9110 13.2.2)
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    return since is not None and last_modified is not None and last_modified <= since
+
+
+def _compress(response):
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+    encoding = request.accept_encodings.best_match(['br', 'gzip'] if brotli else ['gzip'])
+    if encoding == 'br':
+        response.set_data(brotli.compress(body, quality=BROTLI_QUALITY))
+    elif encoding == 'gzip':
+        response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0))
+    else:
+        return response
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def conditional(conn, tables, build):
+    """build() sadece istemcideki kopya eskiyse çalışır; aksi halde 304."""
+    etag, last_modified = _validators(conn, tables)
+    if _not_modified(etag, last_modified):
+        response = current_app.response_class(status=304)
+    else:
+        try:
+            payload = build()
+        except LookupError as e:
+            return _error(str(e), 404)
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+        response = _compress(current_app.response_class(body, mimetype='application/json'))
+    response.set_etag(etag, weak=True)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    # Last-Modified saniye çözünürlüğündedir; aynı saniye içindeki sonraki
+    # bir yazı fark edilmeyeceği için o saniyede değişmiş veride verilmez
+    if last_modified is not None and last_modified < now:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.update(('Accept-Encoding', 'Cookie'))
+    return response
+
+
+def _error(message, status):
+    return jsonify({'error': message}), status
+
+
+# --- Uç noktalar ---
+
+@api.before_request
+def require_login():
+    if 'user_id' not in session:
+        return _error('Giriş gerekli', 401)
+
+
+def _admin_only():
+    if session['role'] != 'admin':
+        return _error('Bu rapora erişim yetkiniz yok', 403)
+    return None
+
+
+@api.errorhandler(ValueError)
+def bad_request(e):
+    return _error(str(e), 400)
+
+
+@api.route('/<name>')
+def list_resource(name):
+    if name not in RESOURCES:
+        return _error('Bilinmeyen kaynak', 404)
+    resource = RESOURCES[name]
+    columns = resource.columns()
+    where, params = resource.conditions()
+    after, limit, _ = page_args()
+    sql = f'''
+        SELECT {', '.join(columns)} FROM {resource.table}
+        WHERE {' AND '.join(where + ['id > ?'])}
+        ORDER BY id LIMIT ?
+    '''
+    conn = get_db_connection()
+
+    def build():
+        page = keyset_page(conn, sql, params, after, limit)
+        data = [{column: row[column] for column in columns} for row in page]
+        return {'data': data, 'next_after': page.next_after if page.has_more else None}
+
+    response = conditional(conn, resource.tables(), build)
+    conn.close()
+    return response
+
+
+@api.route('/<name>/<int:item_id>')
+def get_resource(name, item_id):
+    if name not in RESOURCES:
+        return _error('Bilinmeyen kaynak', 404)
+    resource = RESOURCES[name]
+    columns = resource.columns()
+    where, params = ['id = ?'], [item_id]
+    if resource.scoped():
+        where.append(resource.trainer_scope)
+        params.append(session['user_id'])
+    conn = get_db_connection()
+
+    def build():
+        # Eğitmenin kapsamı dışındaki kayıt yokmuş gibi 404 döner
+        row = conn.execute(f'SELECT {", ".join(columns)} FROM {resource.table} WHERE {" AND ".join(where)}',
+                           params).fetchone()
+        if row is None:
+            raise LookupError('Kayıt bulunamadı')
+        return {'data': {column: row[column] for column in columns}}
+
+    response = conditional(conn, resource.tables(), build)
+    conn.close()
+    return response
+
+
+@api.route('/reports/monthly')
+def report_monthly():
+    denied = _admin_only()
+    if denied:
+        return denied
+    conn = get_db_connection()
+    response = conditional(conn, MONTHLY_TABLES, lambda: {'data': monthly_totals(conn)})
+    conn.close()
+    return response
+
+
+@api.route('/reports/settlement/<month>')
+def report_settlement(month):
+    period = period_key(month)
+    if period is None:
+        return _error('Ay YYYY-MM biçiminde olmalı', 400)
+    conn = get_db_connection()
+
+    def build():
+        if session['role'] != 'admin':
+            # Eğitmen sadece kendi satırını görür; salon toplamları verilmez
+            line = trainer_settlement(conn, period, session['user_id'])
+            return {'data': {'month': period_label(period), 'trainers': [line] if line else []}}
+        summary = settle(conn, [period])[period]
+        return {'data': dict(summary, month=period_label(period))}
+
+    response = conditional(conn, SETTLEMENT_TABLES, build)
+    conn.close()
+    return response
@@ -1,42 +1,111 @@
-from flask import Flask, render_template, request, redirect, session
-from database import get_db_connection  # Eğer veritabanı bağlantısı ayrı dosyadaysa
-import sqlite3 
+from flask import Blueprint, Flask, current_app, render_template, request, redirect, session, jsonify, Response, stream_with_context
+import database
+from database import get_db_connection, close_db_connection, init_db, pool, ConnectionPool
+from lookup import LOOKUP_TABLES, LOOKUP_LIMIT, lookup_by_name
+from member_search import fts_query, search_members_sql
+from pagination import page_args, keyset_page, render_page, next_page_url
+from periods import period_key, current_period, period_label, month_name
+from profiling import init_profiling, metrics_response
+from auth import HashBusy, authenticate, login_blocked, get_user, hash_password, invalidate_user
+from class_stats import trainer_class_stats, class_members, class_payment_total, unpaid_members
+from response_cache import cached, invalidate, cache, ResponseCache, CACHE_DB
+from rollups import (refresh_periods, rebuild_rollups,
+                     member_periods, monthly_totals, belt_totals, top_totals)
+from settlement import (settle, to_tl, close_period, closed_periods, trainer_settlement,
+                        trainer_payouts, trainer_income_totals)
+from subscriptions import (EXPIRING_HORIZONS, EXPIRING_PAGE_SIZE, count_expiring,
+                           expiring_subscriptions, renewal_suggestion, refresh_member_status,
+                           refresh_status_dates, status_is_stale)
+from write_queue import writes, WriteQueue
+from jobs import scheduler, Scheduler
+from notifications import outbox_counts
+from api import api
 from datetime import datetime
-import locale
-from werkzeug.security import generate_password_hash, check_password_hash
 
-app = Flask(__name__)
-app.secret_key = 'supersecretkey'  # Oturumlar için gizli anahtar
+bp = Blueprint('main', __name__)
 
-# Türkçe ay ismi için locale ayarla
-locale.setlocale(locale.LC_TIME, 'tr_TR.UTF-8')
-current_month = datetime.now().strftime('%B')  # Örn: "Eylül"
 
-def get_db_connection():
-    conn = sqlite3.connect('database.db')
-    conn.row_factory = sqlite3.Row
-    return conn
-
-@app.route('/')
+def create_app(config=None):
+    """Uygulamayı kurar. Veritabanına dokunmaz; şema için: flask --app app init-db"""
+    app = Flask(__name__)
+    app.config.update(
+        SECRET_KEY='supersecretkey',  # Oturumlar için gizli anahtar
+        DATABASE=database.DATABASE,
+        SCHEDULER_ENABLED=True,       # Gece işleri (jobs.py); ölçüm/test için kapatılabilir
+        CACHE_DB=CACHE_DB,
+    )
+    app.config.update(config or {})
+
+    # Havuz, yazıcı, önbellek ve planlayıcı uygulamaya aittir; aynı süreçte
+    # farklı DATABASE ile kurulan ikinci uygulama (testler, komut satırı)
+    # birincinin veritabanına dokunmaz. Modüllerdeki pool / writes / cache /
+    # scheduler adları etkin uygulamanınkini gösterir.
+    app.extensions['db_pool'] = ConnectionPool(app.config['DATABASE'])
+    app.extensions['write_queue'] = WriteQueue(app.config['DATABASE'])
+    app.extensions['response_cache'] = ResponseCache(disk_path=app.config['CACHE_DB'])
+    app.extensions['scheduler'] = Scheduler(app)
+
+    # Her request sonunda bağlantıyı havuza geri bırak
+    app.teardown_appcontext(close_db_connection)
+    app.add_template_global(next_page_url)
+    app.add_template_filter(month_name)
+    app.add_template_filter(to_tl, 'tl')
+    # İstek süreleri ve SQL sayaçları (/metrics)
+    init_profiling(app)
+    if app.config['SCHEDULER_ENABLED']:
+        # Import sırasında veya reloader'ın ana sürecinde değil, ilk istekte başlar
+        app.before_request(app.extensions['scheduler'].start)
+    app.register_blueprint(bp)
+    app.register_blueprint(api)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Tabloları oluşturur ve bekleyen migration'ları çalıştırır."""
+        init_db(app.config['DATABASE'])
+        print(f"{app.config['DATABASE']} hazır.")
+
+    return app
+
+
+@bp.route('/')
 def index():
     return redirect('/dashboard')
 
-@app.route('/members')
+@bp.route('/members')
 def show_members():
     if 'user_id' not in session:
         return redirect('/login')
 
+    after, limit, stream = page_args()
     conn = get_db_connection()
 
     if session['role'] == 'trainer':
-        members = conn.execute('SELECT * FROM members WHERE trainer_id = ?', (session['user_id'],)).fetchall()
+        members = keyset_page(conn, '''
+            SELECT * FROM members WHERE trainer_id = ? AND id > ? ORDER BY id LIMIT ?
+        ''', (session['user_id'],), after, limit, stream=stream)
     else:
-        members = conn.execute('SELECT * FROM members').fetchall()
-
-    conn.close()
-    return render_template('index.html', members=members)
-
-@app.route('/add', methods=['POST'])
+        members = keyset_page(conn, 'SELECT * FROM members WHERE id > ? ORDER BY id LIMIT ?',
+                              after=after, limit=limit, stream=stream)
+
+    return render_page('index.html', stream, members=members)
+
+def form_record_id(conn, table, field, required=True):
+    """Type-ahead'in doldurduğu gizli id alanını doğrular.
+
+    Dönüş (id, hata): alan boşsa ve zorunlu değilse (None, None); sayı
+    değilse veya kayıt yoksa (None, hata mesajı).
+    """
+    value = request.form.get(field, '').strip()
+    if not value:
+        return None, ('Listeden bir kayıt seçin.' if required else None)
+    if not value.isdigit():
+        return None, 'Geçersiz seçim.'
+    row = conn.execute(f'SELECT id FROM {table} WHERE id = ?', (int(value),)).fetchone()
+    if row is None:
+        return None, 'Seçilen kayıt bulunamadı (silinmiş olabilir).'
+    return row['id'], None
+
+@bp.route('/add', methods=['POST'])
 def add_member():
     if 'user_id' not in session:
         return redirect('/login')
@@ -47,22 +116,22 @@ def add_member():
     phone = request.form['phone']
     join_date = request.form.get('join_date') or datetime.now().strftime('%Y-%m-%d')
 
-    conn = get_db_connection()
-    conn.execute('INSERT INTO members (trainer_id, name, email, phone, join_date) VALUES (?, ?, ?, ?, ?)',
-                 (trainer_id, name, email, phone, join_date))
-    conn.commit()
-    conn.close()
+    def insert(conn, batch):
+        conn.execute('INSERT INTO members (trainer_id, name, email, phone, join_date) VALUES (?, ?, ?, ?, ?)',
+                     (trainer_id, name, email, phone, join_date))
 
+    writes.write(insert)
+    invalidate('members')
     return redirect('/members')
 
-@app.route('/trainers')
+@bp.route('/trainers')
 def show_trainers():
     conn = get_db_connection()
     trainers = conn.execute('SELECT * FROM trainers').fetchall()
     conn.close()
     return render_template('trainers.html', trainers=trainers)
 
-@app.route('/classes')
+@bp.route('/classes')
 def show_classes():
     conn = get_db_connection()
     classes = conn.execute('''
@@ -70,107 +139,148 @@ def show_classes():
         FROM classes
         LEFT JOIN trainers ON classes.trainer_id = trainers.id
     ''').fetchall()
-
-    trainers = conn.execute('SELECT * FROM trainers').fetchall()
     conn.close()
-    return render_template('classes.html', classes=classes, trainers=trainers)
+    return render_template('classes.html', classes=classes)
 
-@app.route('/add_class', methods=['POST'])
+@bp.route('/add_class', methods=['POST'])
 def add_class():
     name = request.form['name']
     description = request.form['description']
     day = request.form['day']
     time = request.form['time']
-    trainer_id = request.form['trainer_id']
+    trainer_id, error = form_record_id(get_db_connection(), 'trainers', 'trainer_id', required=False)
+    if error:
+        flash(f'Eğitmen: {error}')
+        return redirect('/classes')
 
-    conn = get_db_connection()
-    conn.execute('INSERT INTO classes (name, description, day, time, trainer_id) VALUES (?, ?, ?, ?, ?)',
-                 (name, description, day, time, trainer_id))
-    conn.commit()
-    conn.close()
+    def insert(conn, batch):
+        conn.execute('INSERT INTO classes (name, description, day, time, trainer_id) VALUES (?, ?, ?, ?, ?)',
+                     (name, description, day, time, trainer_id))
+
+    writes.write(insert)
+    invalidate('classes')
     return redirect('/classes')
 
-@app.route('/add_trainer', methods=['POST'])
+@bp.route('/add_trainer', methods=['POST'])
 def add_trainer():
     name = request.form['name']
     email = request.form['email']
     phone = request.form['phone']
     share_percent = request.form['share_percent']
 
-    conn = get_db_connection()
-    conn.execute('''
-        INSERT INTO trainers (name, email, phone, share_percent)
-        VALUES (?, ?, ?, ?)
-    ''', (name, email, phone, share_percent))
-    conn.commit()
-    conn.close()
+    def insert(conn, batch):
+        conn.execute('''
+            INSERT INTO trainers (name, email, phone, share_percent)
+            VALUES (?, ?, ?, ?)
+        ''', (name, email, phone, share_percent))
+
+    writes.write(insert)
+    invalidate('trainers')
     return redirect('/trainers')
 
-@app.route('/enroll', methods=['POST'])
+@bp.route('/enroll', methods=['POST'])
 def enroll_member():
-    member_id = request.form['member_id']
-    class_id = request.form['class_id']
-
     conn = get_db_connection()
-    conn.execute('INSERT INTO enrollments (member_id, class_id) VALUES (?, ?)',
-                 (member_id, class_id))
-    conn.commit()
-    conn.close()
+    member_id, member_error = form_record_id(conn, 'members', 'member_id')
+    class_id, class_error = form_record_id(conn, 'classes', 'class_id')
+    if member_error or class_error:
+        flash(f'Üye: {member_error}' if member_error else f'Sınıf: {class_error}')
+        return redirect('/enrollments')
+
+    def insert(conn, batch):
+        conn.execute('INSERT INTO enrollments (member_id, class_id) VALUES (?, ?)',
+                     (member_id, class_id))
+        batch.defer(refresh_periods, member_periods(conn, member_id))
+
+    writes.write(insert)
+    invalidate('enrollments')
     return redirect('/enrollments')
 
-@app.route('/enrollments')
+@bp.route('/enrollments')
 def show_enrollments():
+    after, limit, stream = page_args()
     conn = get_db_connection()
-    enrollments = conn.execute('''
+    enrollments = keyset_page(conn, '''
         SELECT enrollments.id, members.name AS member_name, classes.name AS class_name
         FROM enrollments
         JOIN members ON enrollments.member_id = members.id
         JOIN classes ON enrollments.class_id = classes.id
-    ''').fetchall()
-    members = conn.execute('SELECT * FROM members').fetchall()
-    classes = conn.execute('SELECT * FROM classes').fetchall()
-    conn.close()
-    return render_template('enrollments.html', enrollments=enrollments, members=members, classes=classes)
+        WHERE enrollments.id > ?
+        ORDER BY enrollments.id
+        LIMIT ?
+    ''', after=after, limit=limit, stream=stream)
+    return render_page('enrollments.html', stream, enrollments=enrollments)
 
-@app.route('/search_members', methods=['GET'])
+@bp.route('/search_members', methods=['GET'])
 def search_members():
     query = request.args.get('q', '')
+    after, limit, stream = page_args()
     conn = get_db_connection()
-    members = conn.execute('SELECT * FROM members WHERE name LIKE ?', ('%' + query + '%',)).fetchall()
-    conn.close()
-    return render_template('search_members.html', members=members, query=query)
+    match = fts_query(query)
+    if match:
+        # Sıralı tam metin arama; sayfalama sonuç sırasına göre
+        members = keyset_page(conn, search_members_sql(), (match,), after, limit,
+                              key='position', stream=stream)
+    else:
+        members = keyset_page(conn, 'SELECT * FROM members WHERE id > ? ORDER BY id LIMIT ?',
+                              after=after, limit=limit, stream=stream)
+    return render_page('search_members.html', stream, members=members, query=query)
 
-@app.route('/payments')
+@bp.route('/payments')
 def show_payments():
+    after, limit, stream = page_args()
     conn = get_db_connection()
-    payments = conn.execute('''
+    payments = keyset_page(conn, '''
         SELECT payments.*, members.name AS member_name
         FROM payments
         JOIN members ON payments.member_id = members.id
-    ''').fetchall()
-    members = conn.execute('SELECT * FROM members').fetchall()
-    conn.close()
-    return render_template('payments.html', payments=payments, members=members)
+        WHERE payments.id > ?
+        ORDER BY payments.id
+        LIMIT ?
+    ''', after=after, limit=limit, stream=stream)
+    return render_page('payments.html', stream, payments=payments)
 
-@app.route('/add_payment', methods=['POST'])
+@bp.route('/add_payment', methods=['POST'])
 def add_payment():
-    member_id = request.form['member_id']
+    member_id, error = form_record_id(get_db_connection(), 'members', 'member_id')
     amount = request.form['amount']
     date = request.form['date']
     note = request.form['note']
-
-    conn = get_db_connection()
-    conn.execute('INSERT INTO payments (member_id, amount, date, note) VALUES (?, ?, ?, ?)',
-                 (member_id, amount, date, note))
-    conn.commit()
-    conn.close()
+    if error:
+        flash(f'Üye: {error}')
+        return redirect('/payments')
+    if period_key(date) is None:
+        flash('Ödeme tarihi girin.')
+        return redirect('/payments')
+
+    def insert(conn, batch):
+        conn.execute('INSERT INTO payments (member_id, amount, date, note, period) VALUES (?, ?, ?, ?, ?)',
+                     (member_id, amount, date, note, period_key(date)))
+        batch.defer(refresh_periods, [period_key(date)])
+        batch.defer(refresh_member_status, [member_id])
+
+    writes.write(insert)
+    invalidate('payments')
     return redirect('/payments')
 
-@app.route('/member/<int:member_id>')
+def ensure_status_current(conn):
+    """member_status'un güne bağlı alanları bugün tazelenmediyse tazeler.
+
+    Asıl tazeleme günlük iştir; bu, iş kaçırıldığında sayfaların dünkü
+    kalan gün / bu ay ödendi bilgisini göstermesini önler. Uygulama
+    (veritabanı) başına günde bir kez kontrol edilir.
+    """
+    today = datetime.now().date()
+    if current_app.extensions.get('status_checked_on') == today:
+        return
+    if status_is_stale(conn, today):
+        writes.write(lambda write_conn, batch: refresh_status_dates(write_conn, today))
+    current_app.extensions['status_checked_on'] = today
+
+@bp.route('/member/<int:member_id>')
 def member_detail(member_id):
-    from datetime import datetime
-
     conn = get_db_connection()
+    ensure_status_current(conn)
     member = conn.execute('SELECT * FROM members WHERE id = ?', (member_id,)).fetchone()
     payments = conn.execute('SELECT * FROM payments WHERE member_id = ? ORDER BY end_date DESC', (member_id,)).fetchall()
     enrollments = conn.execute('''
@@ -180,15 +290,7 @@ def member_detail(member_id):
     ''', (member_id,)).fetchall()
 
     # 🔔 Otomatik yenileme önerisi
-    renew_suggestion = None
-    if payments and payments[0]['end_date']:
-        try:
-            end_date = datetime.strptime(payments[0]['end_date'], '%Y-%m-%d')
-            days_left = (end_date - datetime.today()).days
-            if days_left <= 7:
-                renew_suggestion = f"Bu öğrencinin aboneliği {days_left} gün içinde bitiyor. Yenileme önerin!"
-        except:
-            pass
+    renew_suggestion = renewal_suggestion(conn, member_id)
 
     conn.close()
     return render_template('member_detail.html',
@@ -198,85 +300,72 @@ def member_detail(member_id):
         renew_suggestion=renew_suggestion
     )
 
-@app.route('/delete_member/<int:member_id>', methods=['POST'])
+@bp.route('/delete_member/<int:member_id>', methods=['POST'])
 def delete_member(member_id):
-    conn = get_db_connection()
-    conn.execute('DELETE FROM members WHERE id = ?', (member_id,))
-    conn.commit()
-    conn.close()
+    def delete(conn, batch):
+        # Üyenin dokunduğu aylar silmeden önce okunur
+        batch.defer(refresh_periods, member_periods(conn, member_id))
+        batch.defer(refresh_member_status, [member_id])
+        conn.execute('DELETE FROM members WHERE id = ?', (member_id,))
+
+    writes.write(delete)
+    invalidate('members', 'payments')
     return redirect('/members')
 
-@app.route('/edit_member/<int:member_id>')
+@bp.route('/edit_member/<int:member_id>')
 def edit_member(member_id):
     conn = get_db_connection()
     member = conn.execute('SELECT * FROM members WHERE id = ?', (member_id,)).fetchone()
     conn.close()
     return render_template('edit_member.html', member=member)
 
-@app.route('/update_member/<int:member_id>', methods=['POST'])
+@bp.route('/update_member/<int:member_id>', methods=['POST'])
 def update_member(member_id):
     data = {key: request.form[key] for key in request.form}
-    conn = get_db_connection()
-    conn.execute('''
-        UPDATE members SET
-            name = ?, email = ?, phone = ?, birth_date = ?, height = ?, weight = ?,
-            belt_level = ?, weight_category = ?, parent_name = ?, parent_phone = ?,
-            parent_email = ?, registration_date = ?
-        WHERE id = ?
-    ''', (
-        data['name'], data['email'], data['phone'], data['birth_date'], data['height'], data['weight'],
-        data['belt_level'], data['weight_category'], data['parent_name'], data['parent_phone'],
-        data['parent_email'], data['registration_date'], member_id
-    ))
-    conn.commit()
-    conn.close()
+
+    def update(conn, batch):
+        conn.execute('''
+            UPDATE members SET
+                name = ?, email = ?, phone = ?, birth_date = ?, height = ?, weight = ?,
+                belt_level = ?, weight_category = ?, parent_name = ?, parent_phone = ?,
+                parent_email = ?, registration_date = ?
+            WHERE id = ?
+        ''', (
+            data['name'], data['email'], data['phone'], data['birth_date'], data['height'], data['weight'],
+            data['belt_level'], data['weight_category'], data['parent_name'], data['parent_phone'],
+            data['parent_email'], data['registration_date'], member_id
+        ))
+        batch.defer(refresh_periods, member_periods(conn, member_id))
+
+    writes.write(update)
+    invalidate('members')
     return redirect('/members')
 
-@app.route('/trainer/<int:trainer_id>')
+@bp.route('/trainer/<int:trainer_id>')
+@cached('trainers', 'classes', 'enrollments')
 def trainer_detail(trainer_id):
     conn = get_db_connection()
     trainer = conn.execute('SELECT * FROM trainers WHERE id = ?', (trainer_id,)).fetchone()
 
-    classes = conn.execute('SELECT * FROM classes WHERE trainer_id = ?', (trainer_id,)).fetchall()
-
-    # Her sınıftaki öğrenci sayısını hesapla
-    class_stats = []
-    for cls in classes:
-        count = conn.execute('SELECT COUNT(*) FROM enrollments WHERE class_id = ?', (cls['id'],)).fetchone()[0]
-        class_stats.append({
-            'class_name': cls['name'],
-            'student_count': count
-        })
+    # Her sınıftaki öğrenci sayısı tek sorguda
+    class_stats = trainer_class_stats(conn, trainer_id)
 
     conn.close()
     return render_template('trainer_detail.html', trainer=trainer, class_stats=class_stats)
 
-@app.route('/class/<int:class_id>')
+@bp.route('/class/<int:class_id>')
 def class_detail(class_id):
-    from datetime import datetime
-    current_month = datetime.today().strftime('%Y-%m')
+    period = current_period()
     conn = get_db_connection()
+    ensure_status_current(conn)
     cls = conn.execute('SELECT * FROM classes WHERE id = ?', (class_id,)).fetchone()
     trainer = conn.execute('SELECT * FROM trainers WHERE id = ?', (cls['trainer_id'],)).fetchone()
 
     # Katılımcı listesi
-    members = conn.execute('''
-        SELECT members.* FROM enrollments
-        JOIN members ON enrollments.member_id = members.id
-        WHERE enrollments.class_id = ?
-    ''', (class_id,)).fetchall()
-
-    # Toplam ödeme (bu sınıfa kayıtlı öğrencilerin yaptığı tüm ödemeler)
-    member_ids = [m['id'] for m in members]
-    if member_ids:
-        placeholders = ','.join(['?'] * len(member_ids))
-        total_payment = conn.execute(f'''
-    SELECT SUM(amount) FROM payments
-    WHERE member_id IN ({placeholders})
-    AND payment_date LIKE ?
-''', member_ids + [current_month + '%']).fetchone()[0]
-    else:
-        total_payment = 0
+    members = class_members(conn, class_id)
+
+    # Toplam ödeme (bu sınıfa kayıtlı öğrencilerin bu ay yaptığı ödemeler)
+    total_payment = class_payment_total(conn, class_id, period)
 
     # Eğitmen payı ve salon payı hesaplama
     trainer_share = 0
@@ -285,15 +374,8 @@ def class_detail(class_id):
         trainer_share = round(total_payment * trainer['share_percent'] / 100, 2)
         salon_share = round(total_payment - trainer_share, 2)
 
-    # Bu ay ödeme yapmayan sporcuları bul
-    current_month = datetime.today().strftime('%Y-%m')
-    paid_ids = conn.execute('''
-        SELECT DISTINCT member_id FROM payments
-        WHERE date LIKE ?
-    ''', (current_month + '%',)).fetchall()
-    paid_ids = [row['member_id'] for row in paid_ids]
-
-    unpaid_members = [m for m in members if m['id'] not in paid_ids]
+    # Bu ay ödeme yapmayan sporcular
+    unpaid = unpaid_members(conn, class_id, period)
 
     conn.close()
     return render_template('class_detail.html',
@@ -303,71 +385,89 @@ def class_detail(class_id):
         total_payment=total_payment,
         trainer_share=trainer_share,
         salon_share=salon_share,
-        unpaid_members=unpaid_members
+        unpaid_members=unpaid
     )
 
-@app.route('/delete_class/<int:class_id>', methods=['POST'])
+@bp.route('/delete_class/<int:class_id>', methods=['POST'])
 def delete_class(class_id):
-    conn = get_db_connection()
-    conn.execute('DELETE FROM classes WHERE id = ?', (class_id,))
-    conn.commit()
-    conn.close()
+    def delete(conn, batch):
+        conn.execute('DELETE FROM classes WHERE id = ?', (class_id,))
+        batch.defer(rebuild_rollups)
+
+    writes.write(delete)
+    invalidate('classes', 'enrollments')
     return redirect('/classes')
 
-@app.route('/delete_trainer/<int:trainer_id>', methods=['POST'])
+@bp.route('/delete_trainer/<int:trainer_id>', methods=['POST'])
 def delete_trainer(trainer_id):
-    conn = get_db_connection()
-    conn.execute('DELETE FROM trainers WHERE id = ?', (trainer_id,))
-    conn.commit()
-    conn.close()
+    def delete(conn, batch):
+        conn.execute('DELETE FROM trainers WHERE id = ?', (trainer_id,))
+        batch.defer(rebuild_rollups)
+
+    writes.write(delete)
+    invalidate('trainers', 'classes')
     return redirect('/trainers')
 
-@app.route('/edit_class/<int:class_id>')
+@bp.route('/edit_class/<int:class_id>')
 def edit_class(class_id):
     conn = get_db_connection()
-    cls = conn.execute('SELECT * FROM classes WHERE id = ?', (class_id,)).fetchone()
-    trainers = conn.execute('SELECT * FROM trainers').fetchall()
+    cls = conn.execute('''
+        SELECT classes.*, trainers.name AS trainer_name
+        FROM classes
+        LEFT JOIN trainers ON classes.trainer_id = trainers.id
+        WHERE classes.id = ?
+    ''', (class_id,)).fetchone()
     conn.close()
-    return render_template('edit_class.html', cls=cls, trainers=trainers)
+    return render_template('edit_class.html', cls=cls)
 
-@app.route('/update_class/<int:class_id>', methods=['POST'])
+@bp.route('/update_class/<int:class_id>', methods=['POST'])
 def update_class(class_id):
     data = {key: request.form[key] for key in request.form}
-    conn = get_db_connection()
-    conn.execute('''
-        UPDATE classes SET
-            name = ?, description = ?, day = ?, time = ?, trainer_id = ?
-        WHERE id = ?
-    ''', (
-        data['name'], data['description'], data['day'], data['time'], data['trainer_id'], class_id
-    ))
-    conn.commit()
-    conn.close()
+    data['trainer_id'], error = form_record_id(get_db_connection(), 'trainers', 'trainer_id', required=False)
+    if error:
+        flash(f'Eğitmen: {error}')
+        return redirect(f'/edit_class/{class_id}')
+
+    def update(conn, batch):
+        conn.execute('''
+            UPDATE classes SET
+                name = ?, description = ?, day = ?, time = ?, trainer_id = ?
+            WHERE id = ?
+        ''', (
+            data['name'], data['description'], data['day'], data['time'], data['trainer_id'], class_id
+        ))
+        batch.defer(rebuild_rollups)
+
+    writes.write(update)
+    invalidate('classes')
     return redirect('/classes')
 
-@app.route('/edit_trainer/<int:trainer_id>')
+@bp.route('/edit_trainer/<int:trainer_id>')
 def edit_trainer(trainer_id):
     conn = get_db_connection()
     trainer = conn.execute('SELECT * FROM trainers WHERE id = ?', (trainer_id,)).fetchone()
     conn.close()
     return render_template('edit_trainer.html', trainer=trainer)
 
-@app.route('/update_trainer/<int:trainer_id>', methods=['POST'])
+@bp.route('/update_trainer/<int:trainer_id>', methods=['POST'])
 def update_trainer(trainer_id):
     data = {key: request.form[key] for key in request.form}
-    conn = get_db_connection()
-    conn.execute('''
-        UPDATE trainers SET
-            name = ?, email = ?, phone = ?, share_percent = ?
-        WHERE id = ?
-    ''', (
-        data['name'], data['email'], data['phone'], data['share_percent'], trainer_id
-    ))
-    conn.commit()
-    conn.close()
+
+    def update(conn, batch):
+        conn.execute('''
+            UPDATE trainers SET
+                name = ?, email = ?, phone = ?, share_percent = ?
+            WHERE id = ?
+        ''', (
+            data['name'], data['email'], data['phone'], data['share_percent'], trainer_id
+        ))
+        batch.defer(rebuild_rollups)
+
+    writes.write(update)
+    invalidate('trainers')
     return redirect('/trainers')
 
-@app.route('/add_payment/<int:member_id>')
+@bp.route('/add_payment/<int:member_id>')
 def add_payment_form(member_id):
     conn = get_db_connection()
     member = conn.execute('SELECT * FROM members WHERE id = ?', (member_id,)).fetchone()
@@ -392,7 +492,7 @@ def add_payment_form(member_id):
     conn.close()
     return render_template('add_payment.html', member=member, suggested_month=next_month)
 
-@app.route('/save_payment/<int:member_id>', methods=['POST'])
+@bp.route('/save_payment/<int:member_id>', methods=['POST'])
 def save_payment(member_id):
     amount = request.form['amount']
     payment_date = request.form['payment_date']
@@ -400,50 +500,46 @@ def save_payment(member_id):
     end_date = request.form['end_date']
     note = request.form['note']
 
-    conn = get_db_connection()
-    conn.execute('''
-        INSERT INTO payments (member_id, amount, payment_date, start_date, end_date, note)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (member_id, amount, payment_date, start_date, end_date, note))
-    conn.commit()
-    conn.close()
+    def insert(conn, batch):
+        conn.execute('''
+            INSERT INTO payments (member_id, amount, payment_date, start_date, end_date, note, period)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (member_id, amount, payment_date, start_date, end_date, note, period_key(payment_date)))
+        batch.defer(refresh_periods, [period_key(payment_date)])
+        batch.defer(refresh_member_status, [member_id])
+
+    writes.write(insert)
+    invalidate('payments')
     return redirect(f'/member/{member_id}')
 
-@app.route('/reports')
+@bp.route('/reports')
+@cached('payments', 'enrollments', 'trainers', 'classes', 'members')
 def reports():
-    from datetime import datetime
-    current_month = datetime.today().strftime('%Y-%m')
+    period = current_period()
+    current_month = period_label(period)
 
     conn = get_db_connection()
 
-    # Bu ayki tüm ödemeler
+    # Bu ayki tüm ödemeler (her ödeme bir kez; sınıflar yan yana yazılır)
     payments = conn.execute('''
-        SELECT payments.*, members.name AS member_name, classes.name AS class_name, trainers.name AS trainer_name, trainers.share_percent
+        SELECT payments.*, members.name AS member_name,
+               (SELECT group_concat(classes.name, ', ') FROM enrollments
+                JOIN classes ON enrollments.class_id = classes.id
+                WHERE enrollments.member_id = payments.member_id) AS class_name,
+               (SELECT group_concat(DISTINCT trainers.name) FROM enrollments
+                JOIN classes ON enrollments.class_id = classes.id
+                JOIN trainers ON classes.trainer_id = trainers.id
+                WHERE enrollments.member_id = payments.member_id) AS trainer_name
         FROM payments
         JOIN members ON payments.member_id = members.id
-        LEFT JOIN enrollments ON enrollments.member_id = members.id
-        LEFT JOIN classes ON enrollments.class_id = classes.id
-        LEFT JOIN trainers ON classes.trainer_id = trainers.id
-        WHERE payment_date LIKE ?
-    ''', (current_month + '%',)).fetchall()
-
-    total_income = 0
-    trainer_totals = {}
-    salon_total = 0
-
-    for p in payments:
-        amount = p['amount'] or 0
-        total_income += amount
-        share = p['share_percent'] or 0
-        trainer_share = round(amount * share / 100, 2)
-        salon_share = round(amount - trainer_share, 2)
-
-        if p['trainer_name']:
-            if p['trainer_name'] not in trainer_totals:
-                trainer_totals[p['trainer_name']] = 0
-            trainer_totals[p['trainer_name']] += trainer_share
+        WHERE payments.period = ?
+    ''', (period,)).fetchall()
 
-        salon_total += salon_share
+    # Gelir, eğitmen ve salon payları SQL'de kuruş olarak hesaplanır
+    summary = settle(conn, [period])[period]
+    total_income = to_tl(summary['total_kurus'])
+    trainer_totals = {t['name']: to_tl(t['trainer_kurus']) for t in summary['trainers']}
+    salon_total = to_tl(summary['salon_kurus'])
 
     conn.close()
     return render_template('reports.html',
@@ -454,41 +550,32 @@ def reports():
         current_month=current_month
     )
 
-@app.route('/expiring')
+@bp.route('/expiring')
 def expiring_members():
-    from datetime import datetime, timedelta
-
-    today = datetime.today()
-    warning_date = today + timedelta(days=7)  # 7 gün içinde bitenler
+    days = request.args.get('days', 7, type=int)
+    if days not in EXPIRING_HORIZONS:
+        days = 7
+    page = max(request.args.get('page', 1, type=int), 1)
 
     conn = get_db_connection()
-    members = conn.execute('SELECT * FROM members').fetchall()
-
-    expiring = []
-
-    for m in members:
-        latest_payment = conn.execute('''
-            SELECT end_date FROM payments
-            WHERE member_id = ?
-            ORDER BY end_date DESC LIMIT 1
-        ''', (m['id'],)).fetchone()
-
-        if latest_payment and latest_payment['end_date']:
-            try:
-                end_date = datetime.strptime(latest_payment['end_date'], '%Y-%m-%d')
-                if today <= end_date <= warning_date:
-                    expiring.append({
-                        'name': m['name'],
-                        'belt': m['belt_level'],
-                        'end_date': latest_payment['end_date']
-                    })
-            except:
-                continue
-
+    ensure_status_current(conn)
+    total = count_expiring(conn, days)
+    expiring = expiring_subscriptions(conn, days,
+                                      limit=EXPIRING_PAGE_SIZE,
+                                      offset=(page - 1) * EXPIRING_PAGE_SIZE)
     conn.close()
-    return render_template('expiring.html', expiring=expiring)
 
-@app.route('/edit_payment/<int:payment_id>')
+    page_count = max((total + EXPIRING_PAGE_SIZE - 1) // EXPIRING_PAGE_SIZE, 1)
+    return render_template('expiring.html',
+        expiring=expiring,
+        days=days,
+        horizons=EXPIRING_HORIZONS,
+        page=page,
+        page_count=page_count,
+        total=total
+    )
+
+@bp.route('/edit_payment/<int:payment_id>')
 def edit_payment(payment_id):
     conn = get_db_connection()
     payment = conn.execute('SELECT * FROM payments WHERE id = ?', (payment_id,)).fetchone()
@@ -496,7 +583,7 @@ def edit_payment(payment_id):
     conn.close()
     return render_template('edit_payment.html', payment=payment, member=member)
 
-@app.route('/update_payment/<int:payment_id>', methods=['POST'])
+@bp.route('/update_payment/<int:payment_id>', methods=['POST'])
 def update_payment(payment_id):
     amount = request.form['amount']
     payment_date = request.form['payment_date']
@@ -504,70 +591,63 @@ def update_payment(payment_id):
     end_date = request.form['end_date']
     note = request.form['note']
 
-    conn = get_db_connection()
-    conn.execute('''
-        UPDATE payments
-        SET amount = ?, payment_date = ?, start_date = ?, end_date = ?, note = ?
-        WHERE id = ?
-    ''', (amount, payment_date, start_date, end_date, note, payment_id))
-    conn.commit()
-    conn.close()
+    def update(conn, batch):
+        old = conn.execute('SELECT member_id, period FROM payments WHERE id = ?', (payment_id,)).fetchone()
+        conn.execute('''
+            UPDATE payments
+            SET amount = ?, payment_date = ?, start_date = ?, end_date = ?, note = ?, period = ?
+            WHERE id = ?
+        ''', (amount, payment_date, start_date, end_date, note, period_key(payment_date), payment_id))
+        periods = [period_key(payment_date)]
+        if old:
+            periods.append(old['period'])
+            batch.defer(refresh_member_status, [old['member_id']])
+        batch.defer(refresh_periods, periods)
+
+    writes.write(update)
+    invalidate('payments')
 
     return redirect(f"/member/{request.form['member_id']}")
 
-@app.route('/delete_payment/<int:payment_id>')
+@bp.route('/delete_payment/<int:payment_id>')
 def delete_payment(payment_id):
-    conn = get_db_connection()
-    member_id = conn.execute('SELECT member_id FROM payments WHERE id = ?', (payment_id,)).fetchone()['member_id']
-    conn.execute('DELETE FROM payments WHERE id = ?', (payment_id,))
-    conn.commit()
-    conn.close()
+    def delete(conn, batch):
+        payment = conn.execute('SELECT member_id, period FROM payments WHERE id = ?', (payment_id,)).fetchone()
+        conn.execute('DELETE FROM payments WHERE id = ?', (payment_id,))
+        batch.defer(refresh_periods, [payment['period']])
+        batch.defer(refresh_member_status, [payment['member_id']])
+        return payment['member_id']
+
+    member_id = writes.write(delete)
+    invalidate('payments')
     return redirect(f"/member/{member_id}")
 
-@app.route('/monthly_report')
+@bp.route('/monthly_report')
+@cached('payments', 'enrollments', 'trainers', 'classes', 'members')
 def monthly_report():
-    from datetime import datetime
     conn = get_db_connection()
 
-    # Ay bazlı toplamlar
-    monthly_totals = conn.execute('''
-        SELECT SUBSTR(payment_date, 1, 7) AS month, SUM(amount) AS total
-        FROM payments
-        GROUP BY month
-        ORDER BY month DESC
-    ''').fetchall()
-
-    # Kuşak bazlı toplamlar
-    belt_totals = conn.execute('''
-        SELECT members.belt_level, SUM(payments.amount) AS total
-        FROM payments
-        JOIN members ON payments.member_id = members.id
-        GROUP BY members.belt_level
-        ORDER BY total DESC
-    ''').fetchall()
-
-    # Sınıf bazlı toplamlar
-    class_totals = conn.execute('''
-        SELECT classes.name, SUM(payments.amount) AS total
-        FROM payments
-        JOIN members ON payments.member_id = members.id
-        JOIN enrollments ON enrollments.member_id = members.id
-        JOIN classes ON enrollments.class_id = classes.id
-        GROUP BY classes.name
-        ORDER BY total DESC
-    ''').fetchall()
+    # Ay, kuşak ve sınıf bazlı toplamlar önceden hesaplanmış tablodan gelir
+    monthly = monthly_totals(conn)
+    belts = belt_totals(conn)
+    class_totals = top_totals(conn, 'class')
 
     conn.close()
     return render_template('monthly_report.html',
-        monthly_totals=monthly_totals,
-        belt_totals=belt_totals,
+        monthly_totals=monthly,
+        belt_totals=belts,
         class_totals=class_totals
     )
 
-@app.route('/trainer/<int:trainer_id>')
+@bp.route('/trainer/<int:trainer_id>/payouts')
 def trainer_panel(trainer_id):
-    from datetime import datetime
-    current_month = datetime.today().strftime('%Y-%m')
+    if 'user_id' not in session:
+        return redirect('/login')
+    if session['role'] == 'trainer' and session['user_id'] != trainer_id:
+        return "❌ Bu sayfaya erişim yetkiniz yok.", 403
+
+    period = current_period()
+    current_month = period_label(period)
 
     conn = get_db_connection()
 
@@ -576,19 +656,31 @@ def trainer_panel(trainer_id):
     # Eğitmenin sınıfları
     classes = conn.execute('SELECT * FROM classes WHERE trainer_id = ?', (trainer_id,)).fetchall()
 
-    # Eğitmenin öğrencileri ve bu ayki ödemeleri
+    # Eğitmenin öğrencilerinin bu ayki ödemeleri (her ödeme bir kez)
     payments = conn.execute('''
-        SELECT payments.*, members.name AS member_name, classes.name AS class_name
+        SELECT payments.*, members.name AS member_name,
+               (SELECT group_concat(classes.name, ', ') FROM enrollments
+                JOIN classes ON enrollments.class_id = classes.id
+                WHERE enrollments.member_id = payments.member_id
+                AND classes.trainer_id = ?) AS class_name
         FROM payments
         JOIN members ON payments.member_id = members.id
-        JOIN enrollments ON enrollments.member_id = members.id
-        JOIN classes ON enrollments.class_id = classes.id
-        WHERE classes.trainer_id = ? AND payment_date LIKE ?
-    ''', (trainer_id, current_month + '%')).fetchall()
-
-    total_income = sum(p['amount'] or 0 for p in payments)
-    share = trainer['share_percent'] or 0
-    trainer_income = round(total_income * share / 100, 2)
+        WHERE payments.period = ?
+        AND payments.member_id IN (
+            SELECT enrollments.member_id FROM enrollments
+            JOIN classes ON enrollments.class_id = classes.id
+            WHERE classes.trainer_id = ?
+        )
+    ''', (trainer_id, period, trainer_id)).fetchall()
+
+    # Bu ayın hakedişi; geçmiş aylar kapatılmış görüntüden okunur
+    settlement = trainer_settlement(conn, period, trainer_id)
+    trainer_income = to_tl(settlement['trainer_kurus']) if settlement else 0
+    payouts = [{'month': period_label(row['period']),
+                'share_percent': row['share_bp'] / 100,
+                'revenue': to_tl(row['revenue_kurus']),
+                'income': to_tl(row['trainer_kurus'])}
+               for row in trainer_payouts(conn, trainer_id)]
 
     conn.close()
     return render_template('trainer_panel.html',
@@ -596,47 +688,23 @@ def trainer_panel(trainer_id):
         classes=classes,
         payments=payments,
         trainer_income=trainer_income,
+        payouts=payouts,
         current_month=current_month
     )
 
-@app.route('/performance')
+@bp.route('/performance')
+@cached('payments', 'enrollments', 'trainers', 'classes', 'members', 'settlements')
 def performance_panel():
     conn = get_db_connection()
 
     # En çok ödeme yapan öğrenciler
-    top_members = conn.execute('''
-        SELECT members.name, SUM(payments.amount) AS total
-        FROM payments
-        JOIN members ON payments.member_id = members.id
-        GROUP BY members.id
-        ORDER BY total DESC
-        LIMIT 10
-    ''').fetchall()
+    top_members = top_totals(conn, 'member', limit=10)
 
     # En çok gelir getiren sınıflar
-    top_classes = conn.execute('''
-        SELECT classes.name, SUM(payments.amount) AS total
-        FROM payments
-        JOIN members ON payments.member_id = members.id
-        JOIN enrollments ON enrollments.member_id = members.id
-        JOIN classes ON enrollments.class_id = classes.id
-        GROUP BY classes.id
-        ORDER BY total DESC
-        LIMIT 10
-    ''').fetchall()
+    top_classes = top_totals(conn, 'class', limit=10)
 
     # En çok kazanan eğitmenler
-    top_trainers = conn.execute('''
-        SELECT trainers.name, SUM(payments.amount * trainers.share_percent / 100.0) AS income
-        FROM payments
-        JOIN members ON payments.member_id = members.id
-        JOIN enrollments ON enrollments.member_id = members.id
-        JOIN classes ON enrollments.class_id = classes.id
-        JOIN trainers ON classes.trainer_id = trainers.id
-        GROUP BY trainers.id
-        ORDER BY income DESC
-        LIMIT 10
-    ''').fetchall()
+    top_trainers = trainer_income_totals(conn, limit=10)
 
     conn.close()
     return render_template('performance.html',
@@ -645,20 +713,101 @@ def performance_panel():
         top_trainers=top_trainers
     )
 
-from werkzeug.security import check_password_hash
+@bp.route('/settlements')
+def settlements():
+    if 'user_id' not in session or session['role'] != 'admin':
+        return redirect('/login')
+    conn = get_db_connection()
+    closed = closed_periods(conn)
+    conn.close()
+
+    # Kapatılmamış en son geçmiş ay önerilir
+    suggested = current_period() - 1
+    if suggested % 100 == 0:
+        suggested -= 88
+    return render_template('settlements.html',
+        closed=[{'period': row['period'],
+                 'month': period_label(row['period']),
+                 'closed_at': row['closed_at'],
+                 'total': to_tl(row['total_kurus']),
+                 'salon': to_tl(row['salon_kurus'])} for row in closed.values()],
+        suggested=period_label(suggested)
+    )
+
+@bp.route('/settlements/close', methods=['POST'])
+def close_settlement():
+    if 'user_id' not in session or session['role'] != 'admin':
+        return redirect('/login')
+    period = period_key(request.form.get('month'))
+    if period is None:
+        flash("Geçersiz ay.")
+        return redirect('/settlements')
+
+    try:
+        writes.write(lambda conn, batch: close_period(conn, period))
+    except ValueError as e:
+        flash(str(e))
+        return redirect('/settlements')
+    invalidate('settlements')
+    return redirect(f'/settlements/{period}')
+
+@bp.route('/settlements/<int:period>')
+def settlement_detail(period):
+    if 'user_id' not in session or session['role'] != 'admin':
+        return redirect('/login')
+    conn = get_db_connection()
+    summary = settle(conn, [period])[period]
+    conn.close()
+    return render_template('settlement_detail.html',
+        month=period_label(period),
+        summary=summary
+    )
+
+@bp.route('/jobs')
+def job_status():
+    if 'user_id' not in session or session['role'] != 'admin':
+        return redirect('/login')
+    conn = get_db_connection()
+    jobs, history = scheduler.status(conn)
+    outbox = outbox_counts(conn)
+    conn.close()
+    return render_template('jobs.html', jobs=jobs, history=history, stats=scheduler.stats(), outbox=outbox)
+
+@bp.route('/jobs/<name>/run', methods=['POST'])
+def run_job(name):
+    if 'user_id' not in session or session['role'] != 'admin':
+        return redirect('/login')
+    conn = get_db_connection()
+    try:
+        scheduler.run_now(conn, name)
+        flash(f"{name} sıraya alındı.")
+    except ValueError as e:
+        flash(str(e))
+    conn.close()
+    return redirect('/jobs')
+
 from flask import flash
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form['username'].strip()
         password = request.form['password']
 
+        if login_blocked(username, request.remote_addr):
+            flash("⏳ Çok fazla başarısız deneme. Lütfen birkaç dakika sonra tekrar deneyin.")
+            return redirect('/login')
+
         conn = get_db_connection()
-        user = conn.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
-        conn.close()
+        try:
+            user = authenticate(conn, username, password, request.remote_addr)
+        except HashBusy:
+            flash("⏳ Sunucu şu an yoğun. Lütfen birkaç saniye sonra tekrar deneyin.")
+            return render_template('login.html'), 503, {'Retry-After': '5'}
+        finally:
+            conn.close()
 
-        if user and check_password_hash(user['password'], password):
+        if user:
             session['user_id'] = user['id']
             session['role'] = user['role']
             if user['role'] == 'admin':
@@ -671,7 +820,12 @@ def login():
 
     return render_template('login.html')
 
-@app.route('/dashboard')
+@bp.errorhandler(HashBusy)
+def hash_busy(e):
+    # Giriş dışındaki şifre işlemleri (kullanıcı ekleme vb.)
+    return "⏳ Sunucu şu an yoğun. Lütfen birkaç saniye sonra tekrar deneyin.", 503, {'Retry-After': '5'}
+
+@bp.route('/dashboard')
 def dashboard():
     if 'user_id' not in session:
         return redirect('/login')
@@ -681,16 +835,14 @@ def dashboard():
 
     return render_template('dashboard.html')  # admin için tam panel
 
-from werkzeug.security import generate_password_hash
-from flask import flash
 
-@app.route('/trainer_dashboard')
+@bp.route('/trainer_dashboard')
 def trainer_dashboard():
     if 'user_id' not in session or session['role'] != 'trainer':
         return redirect('/login')
     return render_template('trainer_dashboard.html')
 
-@app.route('/add_user', methods=['GET', 'POST'])
+@bp.route('/add_user', methods=['GET', 'POST'])
 def add_user():
     if 'user_id' not in session or session['role'] != 'admin':
         return redirect('/login')
@@ -707,20 +859,21 @@ def add_user():
 
         # Veritabanında aynı kullanıcı adı var mı?
         conn = get_db_connection()
-        existing = conn.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
+        existing = get_user(conn, username)
         if existing:
             conn.close()
             flash("Bu kullanıcı adı zaten mevcut.")
             return redirect('/add_user')
 
         # Şifreyi güvenli şekilde hash'le
-        hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
+        hashed_password = hash_password(password)
 
         # Kullanıcıyı ekle
         conn.execute('INSERT INTO users (username, password, role) VALUES (?, ?, ?)',
                      (username, hashed_password, role))
         conn.commit()
         conn.close()
+        invalidate_user(username)
 
         flash("Kullanıcı başarıyla eklendi.")
         return redirect('/dashboard')
@@ -728,7 +881,7 @@ def add_user():
     return render_template('add_user.html')
 
 
-@app.route('/trainer/<int:trainer_id>')
+@bp.route('/trainer/<int:trainer_id>')
 def trainer_profile (trainer_id):
     if 'user_id' not in session or session['role'] != 'trainer':
         return redirect('/login')
@@ -763,22 +916,20 @@ def trainer_profile (trainer_id):
 
 
 
-@app.route('/test_login', methods=['GET', 'POST'])
+@bp.route('/test_login', methods=['GET', 'POST'])
 def test_login():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
 
+        if login_blocked(username, request.remote_addr):
+            return "⏳ Çok fazla başarısız deneme"
+
         conn = get_db_connection()
-        user = conn.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
+        user = authenticate(conn, username, password, request.remote_addr)
         conn.close()
 
         if user:
-            print("Veritabanı şifre:", user['password'])
-            print("Girilen şifre:", password)
-            print("Karşılaştırma sonucu:", check_password_hash(user['password'], password))
-
-        if user and check_password_hash(user['password'], password):
             return "✅ Giriş başarılı"
         else:
             return "❌ Şifre yanlış veya kullanıcı yok"
@@ -791,10 +942,9 @@ def test_login():
         </form>
     '''
 
-@app.route('/hash/<sifre>')
+@bp.route('/hash/<sifre>')
 def hash_sifre(sifre):
-    from werkzeug.security import generate_password_hash
-    hashli = generate_password_hash(sifre, method='pbkdf2:sha256')
+    hashli = hash_password(sifre)
     return f"Hashli şifre: {hashli}"
 
 
@@ -814,12 +964,119 @@ def hash_sifre(sifre):
 
 
 
-@app.route('/logout')
+@bp.route('/import', methods=['GET', 'POST'])
+def bulk_import():
+    if 'user_id' not in session or session['role'] != 'admin':
+        return redirect('/login')
+
+    result = None
+    if request.method == 'POST':
+        # Sadece yönetici ara sıra kullanıyor; açılışta yüklenmesin
+        from bulk_import import IMPORTERS, read_rows
+
+        from bulk_import import RowError
+
+        kind = request.form.get('kind')
+        upload = request.files.get('file')
+        if kind not in IMPORTERS or not upload:
+            flash("Aktarım türü ve dosya seçilmeli.")
+            return redirect('/import')
+        dry_run = bool(request.form.get('dry_run'))
+        options = {'upsert': bool(request.form.get('upsert'))} if kind == 'members' else {}
+
+        conn = get_db_connection()
+        try:
+            # Okuma bu bağlantıdan; yazılar 1000 satırlık parçalar halinde tek yazıcıdan
+            result = IMPORTERS[kind](conn, read_rows(upload.stream, upload.filename), dry_run=dry_run,
+                                     write=writes.write, **options)
+        except RowError as e:
+            flash(f"Dosya okunamadı: {e}")
+            return redirect('/import')
+        finally:
+            conn.close()
+            if not dry_run:
+                # Hata verse de önceki parçalar yazılmış olabilir
+                invalidate('members', 'payments')
+
+    return render_template('import.html', result=result)
+
+@bp.route('/export/<dataset>.<fmt>')
+def export_data(dataset, fmt):
+    if 'user_id' not in session or session['role'] != 'admin':
+        return redirect('/login')
+    from export import EXPORT_FORMATS, MEMBERS_QUERY, payments_query, report_query, stream_rows
+
+    if fmt not in EXPORT_FORMATS:
+        return "Desteklenmeyen biçim", 404
+
+    if dataset == 'payments':
+        sql, params = payments_query(
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            trainer_id=request.args.get('trainer_id', type=int),
+            class_id=request.args.get('class_id', type=int),
+        )
+    elif dataset == 'members':
+        sql, params = MEMBERS_QUERY, []
+    elif dataset == 'report':
+        sql, params = report_query(
+            start_period=period_key(request.args.get('start')),
+            end_period=period_key(request.args.get('end')),
+        )
+    else:
+        return "Bilinmeyen veri", 404
+
+    # Bağlantı, akış bitince teardown ile havuza döner
+    conn = get_db_connection()
+    return Response(
+        stream_with_context(stream_rows(conn, sql, params, fmt)),
+        content_type=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={dataset}.{fmt}'},
+    )
+
+@bp.route('/api/lookup/<table>')
+def lookup(table):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Giriş gerekli'}), 401
+    if table not in LOOKUP_TABLES:
+        return jsonify({'error': 'Bilinmeyen tablo'}), 404
+
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', LOOKUP_LIMIT, type=int)
+    conn = get_db_connection()
+    results = lookup_by_name(conn, table, query, limit)
+    conn.close()
+    return jsonify(results)
+
+@bp.route('/db_stats')
+def db_stats():
+    if 'user_id' not in session or session['role'] != 'admin':
+        return redirect('/login')
+    return jsonify({'pool': pool.stats(), 'writes': writes.stats()})
+
+@bp.route('/cache_stats')
+def cache_stats():
+    if 'user_id' not in session or session['role'] != 'admin':
+        return redirect('/login')
+    return jsonify(cache.stats())
+
+@bp.route('/metrics')
+def metrics():
+    if 'user_id' not in session or session['role'] != 'admin':
+        return redirect('/login')
+    return metrics_response([
+        ('fittrack_db_pool', pool.stats()),
+        ('fittrack_write_queue', writes.stats()),
+        ('fittrack_scheduler', scheduler.stats()),
+        ('fittrack_cache', cache.stats()),
+    ])
+
+@bp.route('/logout')
 def logout():
     session.clear()
     return redirect('/login')
 
-@app.template_filter('calculate_age')
+@bp.app_template_filter('calculate_age')
 def calculate_age(birth_date_str):
     try:
         birth_date = datetime.strptime(birth_date_str, '%Y-%m-%d')
@@ -831,4 +1088,5 @@ def calculate_age(birth_date_str):
 
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5001)
\ No newline at end of file
+    init_db()
+    create_app().run(debug=True, port=5001)
\ No newline at end of file
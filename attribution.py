@@ -0,0 +1,85 @@
+# Ödemelerin sınıflara ve eğitmenlere dağıtılması.
+#
+# payments → members → enrollments → classes zinciriyle doğrudan JOIN
+# yapınca, N sınıfa kayıtlı bir üyenin her ödemesi N kez sayılıyordu. Burada
+# önce ödemeler üye ve ay bazında bir kez toplanır, sonra kurala göre
+# sınıflara dağıtılır:
+#
+#   even     üyenin ödemesi kayıtlı olduğu sınıflara eşit bölünür
+#   primary  ödemenin tamamı üyenin ilk kaydolduğu sınıfa yazılır
+#
+# Hiçbir sınıfa kayıtlı olmayan üyenin ödemesi class_id/trainer_id NULL
+# olarak kalır (salona ait).
+
+ATTRIBUTION_RULE = 'even'
+
+_CLASS_WEIGHTS = {
+    'even': '1.0 / COUNT(*) OVER (PARTITION BY mp.period, mp.member_id)',
+    'primary': 'CASE WHEN row_number() OVER (PARTITION BY mp.period, mp.member_id ORDER BY MIN(enrollments.id)) = 1 THEN 1.0 ELSE 0.0 END',
+}
+
+
+def attribution_ctes(where='1', rule=None):
+    """WITH ile kullanılacak CTE'ler; sonuncusu:
+
+        attributed(period, member_id, class_id, trainer_id, amount, payment_count)
+
+    `where` payments tablosuna uygulanır; parametreleri sorgunun başına gelir.
+    """
+    weight = _CLASS_WEIGHTS[rule or ATTRIBUTION_RULE]
+    # Sınıflar ayrı bir CTE'de toplanıp member_payments ile birleştirilince
+    # SQLite o CTE'yi küçük sanıp her ödeme satırı için baştan tarıyordu
+    # (40 bin ödemede ~8 sn). Kayıtlar doğrudan idx_enrollments_member ile
+    # okunur (+class_id, sınıf indeksinin seçilmesini engeller); aynı sınıfa
+    # çift kayıt GROUP BY ile teke iner.
+    return f'''
+        p AS (
+            SELECT id, member_id, amount, COALESCE(period, 0) AS period
+            FROM payments
+            WHERE {where}
+        ),
+        member_payments AS (
+            SELECT period, member_id, SUM(amount) AS amount, COUNT(*) AS payment_count
+            FROM p
+            GROUP BY period, member_id
+        ),
+        attributed AS (
+            SELECT period, member_id, class_id, trainer_id, amount * weight AS amount, payment_count
+            FROM (
+                SELECT mp.period, mp.member_id, classes.id AS class_id, classes.trainer_id,
+                       mp.amount, mp.payment_count, {weight} AS weight
+                FROM member_payments mp
+                LEFT JOIN enrollments ON enrollments.member_id = mp.member_id
+                                     AND +enrollments.class_id IN (SELECT id FROM classes)
+                LEFT JOIN classes ON enrollments.class_id = classes.id
+                GROUP BY mp.period, mp.member_id, classes.id
+            )
+            WHERE weight > 0
+        )
+    '''
+
+
+def trainer_revenue(conn, period, trainer_id=None, rule=None):
+    """Ay içinde eğitmen başına düşen gelir (trainer_id verilirse sadece o eğitmen)."""
+    params = [period]
+    trainer_filter = ''
+    if trainer_id is not None:
+        trainer_filter = 'WHERE trainers.id = ?'
+        params.append(trainer_id)
+    return conn.execute(f'''
+        WITH {attribution_ctes('period = ?', rule)}
+        SELECT trainers.id, trainers.name, trainers.share_percent, SUM(attributed.amount) AS revenue
+        FROM attributed
+        JOIN trainers ON attributed.trainer_id = trainers.id
+        {trainer_filter}
+        GROUP BY trainers.id
+        ORDER BY revenue DESC
+    ''', params).fetchall()
+
+
+def class_revenue(conn, class_id, period, rule=None):
+    """Ay içinde sınıfa düşen gelir."""
+    return conn.execute(f'''
+        WITH {attribution_ctes('period = ? AND member_id IN (SELECT member_id FROM enrollments WHERE class_id = ?)', rule)}
+        SELECT COALESCE(SUM(amount), 0) FROM attributed WHERE class_id = ?
+    ''', (period, class_id, class_id)).fetchone()[0]
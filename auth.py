@@ -0,0 +1,153 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Giriş ve şifre işlemleri.
+#
+# pbkdf2 bilerek yavaş bir hesap; ders değişiminde onlarca eğitmen aynı
+# anda giriş yapınca bütün worker thread'leri hash hesaplamakla meşgul
+# oluyordu. Hash işleri artık sınırlı bir thread havuzunda çalışır (hashlib
+# bu sırada GIL'i bırakır), aynı anda en fazla HASH_WORKERS tane hesaplanır.
+# Sırası HASH_TIMEOUT içinde gelmeyen hash iptal edilir ve HashBusy
+# yükselir; giriş sayfası 503 ile "tekrar deneyin" der.
+
+HASH_WORKERS = 4
+HASH_ITERATIONS = 600000          # Yeni şifrelerin maliyeti; eski hash'ler kendi ayarıyla doğrulanır
+HASH_TIMEOUT = 10                 # Saniye
+
+USER_CACHE_TTL = 60               # Kullanıcı satırı önbelleği (saniye)
+
+# Hız sınırı: pencere içinde izin verilen başarısız deneme
+LOGIN_WINDOW = 300                # Saniye
+MAX_ATTEMPTS_PER_USER = 5
+MAX_ATTEMPTS_PER_IP = 20
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix='hash')
+
+
+class HashBusy(Exception):
+    """Hash havuzu HASH_TIMEOUT içinde sıra veremedi (giriş yoğunluğu)."""
+
+
+def _run(func, *args, **kwargs):
+    future = _executor.submit(func, *args, **kwargs)
+    try:
+        return future.result(HASH_TIMEOUT)
+    except FutureTimeout:
+        # Sırada bekleyen hash artık kimsenin işine yaramaz
+        future.cancel()
+        raise HashBusy() from None
+
+
+def hash_password(password):
+    method = f'pbkdf2:sha256:{HASH_ITERATIONS}'
+    return _run(generate_password_hash, password, method=method)
+
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+
+_dummy_hash = None
+
+
+def _dummy_password_hash():
+    # Kullanıcı yoksa da aynı süre harcansın; kullanıcı adı tahmini zorlaşır
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password('dummy')
+    return _dummy_hash
+
+
+class UserCache:
+    def __init__(self, ttl=USER_CACHE_TTL):
+        self.ttl = ttl
+        self._users = {}
+        self._lock = threading.Lock()
+
+    def get(self, conn, username):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._users.get(username)
+        if cached and cached[1] > now:
+            return cached[0]
+        row = conn.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
+        user = dict(row) if row else None
+        with self._lock:
+            self._users[username] = (user, now + self.ttl)
+        return user
+
+    def invalidate(self, username=None):
+        with self._lock:
+            if username is None:
+                self._users.clear()
+            else:
+                self._users.pop(username, None)
+
+
+users = UserCache()
+
+
+def get_user(conn, username):
+    return users.get(conn, username)
+
+
+def invalidate_user(username=None):
+    users.invalidate(username)
+
+
+class RateLimiter:
+    """Anahtar başına (kullanıcı adı veya IP) kayan pencerede başarısız deneme sayar."""
+
+    def __init__(self, limit, window=LOGIN_WINDOW):
+        self.limit = limit
+        self.window = window
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    def _recent(self, key, now):
+        attempts = self._attempts.get(key)
+        if attempts is None:
+            return None
+        while attempts and attempts[0] <= now - self.window:
+            attempts.popleft()
+        if not attempts:
+            del self._attempts[key]
+            return None
+        return attempts
+
+    def blocked(self, key):
+        with self._lock:
+            attempts = self._recent(key, time.monotonic())
+            return attempts is not None and len(attempts) >= self.limit
+
+    def record(self, key):
+        with self._lock:
+            self._attempts.setdefault(key, deque()).append(time.monotonic())
+
+    def reset(self, key):
+        with self._lock:
+            self._attempts.pop(key, None)
+
+
+user_limiter = RateLimiter(MAX_ATTEMPTS_PER_USER)
+ip_limiter = RateLimiter(MAX_ATTEMPTS_PER_IP)
+
+
+def login_blocked(username, ip):
+    return user_limiter.blocked(username) or ip_limiter.blocked(ip)
+
+
+def authenticate(conn, username, password, ip):
+    """Kullanıcıyı doğrular; başarısızsa None. Hız sınırını da işler."""
+    user = get_user(conn, username)
+    ok = verify_password(user['password'] if user else _dummy_password_hash(), password) and user is not None
+    if ok:
+        user_limiter.reset(username)
+        return user
+    user_limiter.record(username)
+    ip_limiter.record(ip)
+    return None
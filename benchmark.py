@@ -0,0 +1,218 @@
+import json
+import os
+import platform
+import sqlite3
+import time
+import tracemalloc
+
+# Sayfa bazında performans ölçümü.
+#
+# Her rota Flask test client ile REPEAT kez çağrılır; p50/p95/p99 süre,
+# istek başına sorgu sayısı ve (ayrı bir turda, tracemalloc ile) en yüksek
+# bellek kullanımı raporlanır. Sonuçlar bir JSON dosyasına kaydedilip
+# sonraki çalıştırmalar ona göre karşılaştırılabilir; eşiği aşan yavaşlama
+# veya artan sorgu sayısı varsa çıkış kodu 1 olur.
+#
+#   python benchmark.py bench.db --generate --members 50000 --classes 500 \
+#       --trainers 200 --payments 2000000 --save baseline.json
+#   python benchmark.py bench.db --compare baseline.json
+
+REPEAT = 20
+TOLERANCE = 0.25             # p95 ve bellek için izin verilen oransal artış
+MIN_REGRESSION_MS = 2.0      # Bunun altındaki farklar gürültü sayılır
+MIN_REGRESSION_KB = 256
+
+ROUTES = (
+    '/members',
+    '/search_members?q={search}',
+    '/trainers',
+    '/classes',
+    '/enrollments',
+    '/payments',
+    '/reports',
+    '/monthly_report',
+    '/performance',
+    '/expiring',
+    '/expiring?days=30',
+    '/dashboard',
+    '/member/{member_id}',
+    '/class/{class_id}',
+    '/trainer/{trainer_id}',
+    '/add_payment/{member_id}',
+    '/api/lookup/members?q={search}',
+)
+
+
+def route_params(conn):
+    """En kalabalık sınıf, en çok sınıfı olan eğitmen ve en uzun geçmişli üye."""
+    def first(sql):
+        row = conn.execute(sql).fetchone()
+        return row[0] if row else 0
+
+    return {
+        'class_id': first('SELECT class_id FROM enrollments GROUP BY class_id ORDER BY COUNT(*) DESC LIMIT 1'),
+        'trainer_id': first('SELECT trainer_id FROM classes GROUP BY trainer_id ORDER BY COUNT(*) DESC LIMIT 1'),
+        'member_id': first('SELECT member_id FROM payments GROUP BY member_id ORDER BY COUNT(*) DESC LIMIT 1'),
+        'search': (first("SELECT name FROM members WHERE name LIKE '% %' LIMIT 1") or 'a').split()[-1][:3],
+    }
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, sql, params, elapsed):
+        self.count += 1
+
+
+def measure(client, path, repeat=REPEAT, keep_cache=False):
+    import database
+
+    cache = client.application.extensions['response_cache']
+    counter = QueryCounter()
+    database.query_listeners.append(counter)
+    try:
+        timings, queries, status = [], [], None
+        for i in range(repeat + 1):
+            if not keep_cache:
+                cache.clear()
+            counter.count = 0
+            started = time.perf_counter()
+            response = client.get(path)
+            response.get_data()
+            elapsed = (time.perf_counter() - started) * 1000
+            status = response.status_code
+            if i:   # İlk istek ısınma turu
+                timings.append(elapsed)
+                queries.append(counter.count)
+
+        # Bellek ayrı turda: tracemalloc süreleri bozar
+        if not keep_cache:
+            cache.clear()
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        client.get(path).get_data()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    finally:
+        database.query_listeners.remove(counter)
+
+    return {
+        'status': status,
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+        'queries': max(queries),
+        'peak_kb': round(peak / 1024),
+    }
+
+
+def run(path, routes=ROUTES, repeat=REPEAT, keep_cache=False, username='admin1', password='1234'):
+    """path'teki veritabanıyla bütün rotaları ölçer."""
+    from app import create_app
+    app = create_app({'DATABASE': path, 'SCHEDULER_ENABLED': False})
+
+    conn = sqlite3.connect(path)
+    params = route_params(conn)
+    counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+              for table in ('members', 'classes', 'trainers', 'enrollments', 'payments')}
+    conn.close()
+
+    client = app.test_client()
+    response = client.post('/login', data={'username': username, 'password': password})
+    if response.status_code != 302 or '/dashboard' not in response.headers.get('Location', ''):
+        raise SystemExit(f'{username} ile giriş yapılamadı')
+
+    results = {}
+    for route in routes:
+        results[route] = measure(client, route.format(**params), repeat, keep_cache)
+        _print_row(route, results[route])
+    return {
+        'meta': {
+            'counts': counts,
+            'repeat': repeat,
+            'cached': keep_cache,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+        },
+        'routes': results,
+    }
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Kayıtlı sonuca göre kötüleşen ölçümlerin listesi."""
+    regressions = []
+    for route, now in results['routes'].items():
+        before = baseline['routes'].get(route)
+        if before is None:
+            continue
+        if now['p95_ms'] > before['p95_ms'] * (1 + tolerance) and now['p95_ms'] - before['p95_ms'] > MIN_REGRESSION_MS:
+            regressions.append(f"{route}: p95 {before['p95_ms']} → {now['p95_ms']} ms")
+        if now['queries'] > before['queries']:
+            regressions.append(f"{route}: sorgu sayısı {before['queries']} → {now['queries']}")
+        if now['peak_kb'] > before['peak_kb'] * (1 + tolerance) and now['peak_kb'] - before['peak_kb'] > MIN_REGRESSION_KB:
+            regressions.append(f"{route}: bellek {before['peak_kb']} → {now['peak_kb']} KB")
+        if now['status'] != before['status']:
+            regressions.append(f"{route}: durum kodu {before['status']} → {now['status']}")
+    if baseline['meta'].get('counts') != results['meta']['counts']:
+        regressions.insert(0, 'Uyarı: veri boyutları kayıttakinden farklı, karşılaştırma anlamsız olabilir')
+    return regressions
+
+
+def _print_row(route, result):
+    print(f"{route:<36} {result['status']:>4} {result['p50_ms']:>9} {result['p95_ms']:>9} "
+          f"{result['p99_ms']:>9} {result['queries']:>7} {result['peak_kb']:>9}")
+
+
+if __name__ == '__main__':
+    import argparse
+    import resource
+
+    from seed_data import DEFAULT_SIZES
+
+    parser = argparse.ArgumentParser(description='Rotaların süre / sorgu / bellek ölçümü.')
+    parser.add_argument('path', help='Ölçümde kullanılacak veritabanı dosyası')
+    parser.add_argument('--generate', action='store_true', help='Dosya yoksa sentetik veriyle oluştur')
+    for key, value in DEFAULT_SIZES.items():
+        parser.add_argument(f'--{key}', type=int, default=value)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--cached', action='store_true', help='Yanıt önbelleğini temizlemeden ölç')
+    parser.add_argument('--routes', help='Virgülle ayrılmış rota listesi (varsayılan: hepsi)')
+    parser.add_argument('--save', help='Sonuçları bu JSON dosyasına yaz')
+    parser.add_argument('--compare', help='Bu JSON dosyasındaki sonuçlarla karşılaştır')
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    if args.generate and not os.path.exists(args.path):
+        from seed_data import build_database
+        print('Veri üretiliyor:', build_database(args.path, seed=args.seed,
+                                                 **{key: getattr(args, key) for key in DEFAULT_SIZES}))
+    else:
+        from database import init_db
+        init_db(args.path)
+
+    print(f"{'rota':<36} {'kod':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'sorgu':>7} {'bellek KB':>9}")
+    routes = args.routes.split(',') if args.routes else ROUTES
+    results = run(args.path, routes, args.repeat, args.cached)
+    results['meta']['max_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"En yüksek RSS: {results['meta']['max_rss_kb'] // 1024} MB")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print('  ' + line)
+        if any(not line.startswith('Uyarı') for line in regressions):
+            raise SystemExit(1)
+        print('Kayıtlı sonuca göre kötüleşme yok.')
@@ -0,0 +1,352 @@
+import csv
+import io
+import re
+from datetime import datetime
+from itertools import islice
+
+from periods import period_key
+from rollups import refresh_periods, rebuild_rollups
+from subscriptions import refresh_member_status
+
+# Excel/CSV'den toplu üye ve ödeme aktarımı.
+#
+# Dosya parça parça okunur (BATCH_SIZE satır), her parça doğrulanıp
+# executemany ile tek transaction'da yazılır. Uygulamada yazılar `write`
+# ile (writes.write) tek yazıcının sırasına girer; parça başına bir iş,
+# istekler araya girebilir. dry_run=True ise satırlar doğrulanıp
+# eşleştirilir ama hiçbir şey yazılmaz (yazma kilidi alınmaz, uygulamanın
+# yazıları beklemez); hatalı satırlar satır numarasıyla raporlanır.
+
+BATCH_SIZE = 1000
+
+MEMBER_COLUMNS = (
+    'name', 'email', 'phone', 'birth_date', 'height', 'weight', 'belt_level',
+    'weight_category', 'parent_name', 'parent_phone', 'parent_email', 'registration_date',
+)
+MEMBER_DATE_COLUMNS = ('birth_date', 'registration_date')
+MEMBER_NUMBER_COLUMNS = ('height', 'weight')
+
+PAYMENT_COLUMNS = ('amount', 'payment_date', 'start_date', 'end_date', 'note')
+PAYMENT_DATE_COLUMNS = ('payment_date', 'start_date', 'end_date')
+
+DATE_FORMATS = ('%Y-%m-%d', '%d.%m.%Y', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d')
+
+
+class RowError(ValueError):
+    pass
+
+
+def normalize_date(value):
+    value = (value or '').strip()
+    if not value:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    raise RowError(f"Tarih anlaşılamadı: {value}")
+
+
+def normalize_amount(value):
+    """'1.250,50', '1250.50', '₺ 1250' → 1250.5; '1.250' → 1250 (binlik ayraç)"""
+    if not (value or '').strip():
+        return None
+    text = re.sub(r'[^\d,.\-]', '', value)
+    if re.fullmatch(r'-?\d{1,3}(\.\d{3})+', text):
+        # Virgülsüz, noktadan sonra tam üç hane: Türkçe binlik ayracı
+        text = text.replace('.', '')
+    elif ',' in text and '.' in text:
+        # Hangisi sondaysa o ondalık ayracı
+        if text.rfind(',') > text.rfind('.'):
+            text = text.replace('.', '').replace(',', '.')
+        else:
+            text = text.replace(',', '')
+    elif ',' in text:
+        text = text.replace(',', '.')
+    try:
+        return round(float(text), 2)
+    except ValueError:
+        raise RowError(f"Tutar anlaşılamadı: {value}")
+
+
+def normalize_phone(value):
+    """'+90 532 111 22 33', '0532 111 2233', '5321112233' → '05321112233'"""
+    digits = re.sub(r'\D', '', value or '')
+    if len(digits) == 12 and digits.startswith('90'):
+        digits = '0' + digits[2:]
+    elif len(digits) == 10 and not digits.startswith('0'):
+        digits = '0' + digits
+    return digits or None
+
+
+def _phone_variants(phone):
+    # Elle girilmiş eski kayıtlarda baştaki 0 olmayabilir
+    return (phone, phone[1:]) if phone.startswith('0') else (phone,)
+
+
+def normalize_email(value):
+    value = (value or '').strip().lower()
+    return value or None
+
+
+def _clean_keys(row):
+    return {(k or '').strip().lower(): (v.strip() if isinstance(v, str) else v) for k, v in row.items()}
+
+
+def read_rows(stream, filename=''):
+    """CSV veya .xlsx dosyasından sözlük satırları üretir (satır no, satır)."""
+    if filename.lower().endswith('.xlsx'):
+        yield from _read_xlsx(stream)
+        return
+    if isinstance(stream, (bytes, bytearray)):
+        stream = io.BytesIO(stream)
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    sample = stream.read(4096)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(_chain(sample, stream), dialect=dialect)
+    for line_no, row in enumerate(reader, start=2):
+        yield line_no, _clean_keys(row)
+
+
+def _chain(sample, stream):
+    # Sniffer için okunan ilk parça + dosyanın geri kalanı, satır satır
+    rest = io.StringIO(sample + stream.readline())
+    yield from rest
+    yield from stream
+
+
+def _read_xlsx(stream):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RowError("Excel dosyaları için openpyxl kurulu olmalı (veya CSV olarak kaydedin).")
+    sheet = load_workbook(stream, read_only=True, data_only=True).active
+    rows = sheet.iter_rows(values_only=True)
+    header = [str(h or '').strip().lower() for h in next(rows, [])]
+    for line_no, values in enumerate(rows, start=2):
+        row = {}
+        for key, value in zip(header, values):
+            if hasattr(value, 'strftime'):
+                value = value.strftime('%Y-%m-%d')
+            row[key] = '' if value is None else str(value).strip()
+        yield line_no, row
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _new_result(dry_run):
+    return {'inserted': 0, 'updated': 0, 'errors': [], 'dry_run': dry_run}
+
+
+def _direct_write(conn):
+    """write_queue yokken (komut satırı): func(conn, batch)'i conn üzerinde tek transaction'da çalıştırır."""
+    def write(func):
+        with conn:
+            return func(conn, None)
+    return write
+
+
+def _finish(conn, result):
+    result['errors'].sort()
+    if conn.in_transaction:
+        conn.rollback()
+    return result
+
+
+# --- Üyeler ---
+
+def _member_values(row):
+    if not row.get('name'):
+        raise RowError("Ad Soyad (name) boş olamaz")
+    values = {}
+    for col in MEMBER_COLUMNS:
+        value = row.get(col) or None
+        if value is not None and col in MEMBER_DATE_COLUMNS:
+            value = normalize_date(value)
+        elif value is not None and col in MEMBER_NUMBER_COLUMNS:
+            value = normalize_amount(value)
+        values[col] = value
+    values['email'] = normalize_email(values['email'])
+    if values['phone']:
+        values['phone'] = normalize_phone(values['phone'])
+    return values
+
+
+def _existing_members(conn, batch):
+    emails = sorted({v['email'] for _, v in batch if v['email']})
+    phones = sorted({p for _, v in batch if v['phone'] for p in _phone_variants(v['phone'])})
+    by_email, by_phone = {}, {}
+    if emails:
+        for row in conn.execute(f"SELECT id, lower(email) FROM members WHERE lower(email) IN ({','.join('?' * len(emails))})", emails):
+            by_email[row[1]] = row[0]
+    if phones:
+        for row in conn.execute(f"SELECT id, phone FROM members WHERE phone IN ({','.join('?' * len(phones))})", phones):
+            by_phone[normalize_phone(row[1])] = row[0]
+    return by_email, by_phone
+
+
+def import_members(conn, rows, dry_run=False, upsert=True, batch_size=BATCH_SIZE, write=None):
+    """Üyeleri ekler; upsert=True ise aynı e-posta veya telefondaki üye güncellenir.
+
+    conn okumak içindir; yazılar write(func) ile yapılır (verilmezse conn'a).
+    """
+    write = write or _direct_write(conn)
+    result = _new_result(dry_run)
+    columns = ', '.join(MEMBER_COLUMNS)
+    placeholders = ', '.join('?' * len(MEMBER_COLUMNS))
+    updates = ', '.join(f'{col} = COALESCE(?, {col})' for col in MEMBER_COLUMNS)
+    earlier = set()   # Deneme: önceki parçalarda eklenecek kişiler (gerçek aktarımda veritabanında bulunurlar)
+
+    for raw_batch in _batches(rows, batch_size):
+        batch = []
+        for line_no, row in raw_batch:
+            try:
+                batch.append((line_no, _member_values(row)))
+            except RowError as e:
+                result['errors'].append((line_no, str(e)))
+
+        by_email, by_phone = _existing_members(conn, batch) if upsert else ({}, {})
+        inserts, changes = [], []
+        pending = {}   # Aynı dosyada tekrar eden kişi: e-posta/telefon → inserts içindeki sıra
+        for line_no, values in batch:
+            member_id = by_email.get(values['email']) or by_phone.get(values['phone'])
+            params = [values[col] for col in MEMBER_COLUMNS]
+            keys = [('email', values['email']), ('phone', values['phone'])] if upsert else []
+            if member_id or any(key[1] and key in earlier for key in keys):
+                changes.append(params + [member_id])
+                continue
+            index = next((pending[k] for k in keys if k[1] and k in pending), None)
+            if index is None:
+                index = len(inserts)
+                inserts.append(params)
+            else:
+                inserts[index] = [new if new is not None else old for old, new in zip(inserts[index], params)]
+                result['updated'] += 1
+            for key in keys:
+                if key[1]:
+                    pending[key] = index
+
+        result['inserted'] += len(inserts)
+        result['updated'] += len(changes)
+        if dry_run:
+            earlier.update(pending)
+        else:
+            def save(write_conn, write_batch, inserts=inserts, changes=changes):
+                write_conn.executemany(f'INSERT INTO members ({columns}) VALUES ({placeholders})', inserts)
+                write_conn.executemany(f'UPDATE members SET {updates} WHERE id = ?', changes)
+            write(save)
+
+    if result['updated'] and not dry_run:
+        # İsim/kuşak değişmiş olabilir; rapor toplamlarını tazele
+        write(lambda write_conn, write_batch: rebuild_rollups(write_conn))
+    return _finish(conn, result)
+
+
+# --- Ödemeler ---
+
+def _payment_values(row):
+    values = {
+        'amount': normalize_amount(row.get('amount')),
+        'note': row.get('note') or None,
+    }
+    if values['amount'] is None:
+        raise RowError("Tutar (amount) boş olamaz")
+    for col in PAYMENT_DATE_COLUMNS:
+        values[col] = normalize_date(row.get(col))
+    if not values['payment_date']:
+        raise RowError("Ödeme tarihi (payment_date) boş olamaz")
+    values['period'] = period_key(values['payment_date'])
+    values['member_id'] = int(row['member_id']) if (row.get('member_id') or '').isdigit() else None
+    values['email'] = normalize_email(row.get('email'))
+    values['phone'] = normalize_phone(row.get('phone'))
+    if not (values['member_id'] or values['email'] or values['phone']):
+        raise RowError("Üye için member_id, email veya phone gerekli")
+    return values
+
+
+def import_payments(conn, rows, dry_run=False, batch_size=BATCH_SIZE, write=None):
+    """Ödemeleri ekler; üye member_id, e-posta veya telefonla bulunur.
+
+    conn okumak içindir; yazılar write(func) ile yapılır (verilmezse conn'a).
+    """
+    write = write or _direct_write(conn)
+    result = _new_result(dry_run)
+    periods, member_ids = set(), set()
+
+    for raw_batch in _batches(rows, batch_size):
+        batch = []
+        for line_no, row in raw_batch:
+            try:
+                batch.append((line_no, _payment_values(row)))
+            except RowError as e:
+                result['errors'].append((line_no, str(e)))
+
+        by_email, by_phone = _existing_members(conn, batch)
+        ids = sorted({v['member_id'] for _, v in batch if v['member_id']})
+        known_ids = set()
+        if ids:
+            known_ids = {row[0] for row in conn.execute(
+                f"SELECT id FROM members WHERE id IN ({','.join('?' * len(ids))})", ids)}
+
+        inserts = []
+        for line_no, values in batch:
+            member_id = values['member_id'] if values['member_id'] in known_ids else None
+            member_id = member_id or by_email.get(values['email']) or by_phone.get(values['phone'])
+            if not member_id:
+                result['errors'].append((line_no, "Üye bulunamadı"))
+                continue
+            inserts.append((member_id, values['amount'], values['payment_date'], values['start_date'],
+                            values['end_date'], values['note'], values['period']))
+            periods.add(values['period'])
+            member_ids.add(member_id)
+
+        result['inserted'] += len(inserts)
+        if not dry_run:
+            write(lambda write_conn, write_batch, inserts=inserts: write_conn.executemany('''
+                INSERT INTO payments (member_id, amount, payment_date, start_date, end_date, note, period)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', inserts))
+
+    if periods and not dry_run:
+        def refresh(write_conn, write_batch):
+            refresh_periods(write_conn, periods)
+            refresh_member_status(write_conn, member_ids)
+        write(refresh)
+    return _finish(conn, result)
+
+
+IMPORTERS = {
+    'members': import_members,
+    'payments': import_payments,
+}
+
+
+if __name__ == '__main__':
+    # Örnek: python bulk_import.py payments odemeler.csv --dry-run
+    import sys
+    from database import get_db_connection
+
+    kind, path = sys.argv[1], sys.argv[2]
+    dry_run = '--dry-run' in sys.argv
+    options = {'upsert': False} if '--no-upsert' in sys.argv and kind == 'members' else {}
+
+    conn = get_db_connection()
+    with open(path, 'rb') as f:
+        result = IMPORTERS[kind](conn, read_rows(f, path), dry_run=dry_run, **options)
+    conn.close()
+
+    print(f"{'(deneme) ' if dry_run else ''}eklenen: {result['inserted']}, güncellenen: {result['updated']}, hatalı: {len(result['errors'])}")
+    for line_no, message in result['errors'][:50]:
+        print(f"  satır {line_no}: {message}")
@@ -0,0 +1,55 @@
+from attribution import class_revenue
+from periods import current_period
+
+# Sınıf istatistikleri: sınıf veya üye sayısından bağımsız olarak sabit
+# sayıda sorguyla çalışır (sınıf başına döngüde sorgu yok).
+
+
+def trainer_class_stats(conn, trainer_id):
+    """Eğitmenin sınıfları ve her sınıftaki öğrenci sayısı (tek gruplu sorgu)."""
+    return conn.execute('''
+        SELECT classes.id, classes.name AS class_name, COUNT(enrollments.id) AS student_count
+        FROM classes
+        LEFT JOIN enrollments ON enrollments.class_id = classes.id
+        WHERE classes.trainer_id = ?
+        GROUP BY classes.id
+        ORDER BY classes.name
+    ''', (trainer_id,)).fetchall()
+
+
+def class_members(conn, class_id):
+    return conn.execute('''
+        SELECT members.* FROM enrollments
+        JOIN members ON enrollments.member_id = members.id
+        WHERE enrollments.class_id = ?
+    ''', (class_id,)).fetchall()
+
+
+def class_payment_total(conn, class_id, period):
+    """Sınıfa o ay düşen gelir; birden çok sınıftaki üyenin ödemesi paylaştırılır."""
+    return class_revenue(conn, class_id, period)
+
+
+def unpaid_members(conn, class_id, period):
+    """Sınıfta olup o ay hiç ödeme yapmamış öğrenciler.
+
+    İçinde bulunulan ay member_status.current_month_paid'den okunur; geçmiş
+    aylar için ödemelere anti-join yapılır.
+    """
+    if period == current_period():
+        return conn.execute('''
+            SELECT DISTINCT members.* FROM enrollments
+            JOIN members ON enrollments.member_id = members.id
+            LEFT JOIN member_status ON member_status.member_id = members.id
+            WHERE enrollments.class_id = ?
+            AND NOT COALESCE(member_status.current_month_paid, 0)
+        ''', (class_id,)).fetchall()
+    return conn.execute('''
+        SELECT DISTINCT members.* FROM enrollments
+        JOIN members ON enrollments.member_id = members.id
+        WHERE enrollments.class_id = ?
+        AND NOT EXISTS (
+            SELECT 1 FROM payments
+            WHERE payments.member_id = members.id AND payments.period = ?
+        )
+    ''', (class_id, period)).fetchall()
@@ -0,0 +1,59 @@
+import sqlite3
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from database import init_db
+
+# Ortak test düzeni: her test geçici dizinde kendi veritabanını ve kendi
+# uygulamasını (havuz, yazıcı, önbellek) kurar.
+
+PASSWORD = '1234'
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'test.db')
+    init_db(path)
+    conn = sqlite3.connect(path)
+    password = generate_password_hash(PASSWORD)
+    conn.executemany('INSERT INTO users (id, username, password, role) VALUES (?, ?, ?, ?)',
+                     [(1, 'admin1', password, 'admin'), (2, 'trainer1', password, 'trainer'),
+                      (3, 'trainer2', password, 'trainer')])
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def db(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def app(db_path):
+    app = create_app({'DATABASE': db_path, 'SCHEDULER_ENABLED': False, 'TESTING': True})
+    yield app
+    app.extensions['write_queue'].close()
+    app.extensions['db_pool'].close_all()
+
+
+def login(client, username):
+    response = client.post('/login', data={'username': username, 'password': PASSWORD})
+    assert response.status_code == 302
+    return client
+
+
+@pytest.fixture
+def admin(app):
+    return login(app.test_client(), 'admin1')
+
+
+@pytest.fixture
+def trainer(app):
+    # trainer1 kullanıcısı (id 2) eğitmen kaydı 2'ye karşılık gelir
+    return login(app.test_client(), 'trainer1')
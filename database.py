@@ -1,101 +1,406 @@
+import os
 import sqlite3
+import threading
+import time
+from queue import LifoQueue, Empty
 
+from flask import current_app, g, has_app_context
+from werkzeug.local import LocalProxy
 
-def get_db_connection():
-    conn = sqlite3.connect('database.db')
+DATABASE = os.environ.get('FITTRACK_DB', 'database.db')
+
+# Havuz ayarları
+POOL_SIZE = 8            # Aynı anda açık tutulacak en fazla bağlantı
+POOL_TIMEOUT = 5.0       # Boş bağlantı beklerken en fazla kaç saniye
+BUSY_TIMEOUT_MS = 5000   # "database is locked" yerine kilidin açılmasını bekle
+
+# Her bağlantı açılırken bir kez çalışan ayarlar
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA cache_size = -16000',      # ~16 MB sayfa önbelleği
+    'PRAGMA mmap_size = 67108864',     # 64 MB mmap
+    'PRAGMA temp_store = MEMORY',
+    f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}',
+)
+
+
+# Her yeni bağlantı açıldığında çağrılır: hook(conn)
+connection_hooks = []
+
+# Sorgu bitince çağrılır: listener(conn, sql, params, süre_saniye). Süre
+# execute ile satırların okunması (fetch*/döngü) dahildir; SELECT'te işin
+# çoğu satırlar okunurken yapılır.
+query_listeners = []
+
+
+class TimedCursor(sqlite3.Cursor):
+    """execute'tan satırlar bitene (veya imleç bırakılana) kadar SQL süresini toplar."""
+
+    _sql = None
+
+    def _timed(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self._elapsed += time.perf_counter() - started
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        self._sql, self._params, self._elapsed = sql, parameters, 0.0
+        try:
+            self._timed(super().execute, sql, parameters)
+        except Exception:
+            self._finish()
+            raise
+        if self.description is None:      # Satır döndürmeyen ifade
+            self._finish()
+        return self
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._timed(super().fetchmany, size)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            return self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # conn.execute(...).fetchone() gibi sonuna kadar okunmayan imleçler
+        self._finish()
+
+    def _finish(self):
+        if self._sql is None:
+            return
+        sql, self._sql = self._sql, None
+        self.connection._notify(sql, self._params, self._elapsed)
+
+
+class PooledConnection(sqlite3.Connection):
+    """Havuza ait bağlantı: close() bağlantıyı kapatmaz, sadece yarım kalan işlemi geri alır.
+
+    Route'lardaki conn.close() çağrıları aynen kalabilsin diye böyle. Bağlantı
+    request sonunda teardown ile havuza geri bırakılır.
+    """
+
+    pooled = False
+
+    def close(self):
+        if not self.pooled:
+            super().close()
+        elif self.in_transaction:
+            self.rollback()
+
+    def really_close(self):
+        super().close()
+
+    def execute(self, sql, parameters=()):
+        if not query_listeners:
+            return super().execute(sql, parameters)
+        return self.cursor(TimedCursor).execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not query_listeners:
+            return super().executemany(sql, seq_of_parameters)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._notify(sql, None, time.perf_counter() - started)
+
+    def _notify(self, sql, parameters, elapsed):
+        for listener in query_listeners:
+            listener(self, sql, parameters, elapsed)
+
+
+def connect(path=None):
+    """Havuza ait olmayan, kendi kapanan bir bağlantı (yazıcı thread, planlayıcı, betikler)."""
+    return _open_connection(path)
+
+
+def _open_connection(path=None):
+    # IMMEDIATE: yazma işlemi baştan yazma kilidini ister. Birden çok worker
+    # aynı anda yazmaya kalkınca sırayla bekler (busy_timeout), okuma kilidini
+    # yazmaya yükseltmeye çalışırken SQLITE_BUSY ile düşmez.
+    conn = sqlite3.connect(path or DATABASE, factory=PooledConnection, check_same_thread=False,
+                           timeout=BUSY_TIMEOUT_MS / 1000, isolation_level='IMMEDIATE')
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
     conn.row_factory = sqlite3.Row
+    for hook in connection_hooks:
+        hook(conn)
     return conn
 
-# Veritabanı bağlantısı
-conn = sqlite3.connect('database.db')
-cursor = conn.cursor()
-
-# Kullanıcı tablosu (giriş sistemi için)
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS users (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT UNIQUE NOT NULL,
-    password TEXT NOT NULL,
-    role TEXT NOT NULL CHECK(role IN ('admin', 'trainer'))
-)
-''')
-
-# Üye tablosu
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS members (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT,
-    email TEXT,
-    phone TEXT
-)
-''')
-
-# Eğitmen tablosu
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS trainers (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT,
-    email TEXT,
-    phone TEXT
-)
-''')
-
-# Sınıf tablosu
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS classes (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT,
-    trainer_id INTEGER,
-    FOREIGN KEY (trainer_id) REFERENCES trainers(id)
-)
-''')
-
-# Katılım tablosu
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS enrollments (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    member_id INTEGER,
-    class_id INTEGER,
-    FOREIGN KEY (member_id) REFERENCES members(id),
-    FOREIGN KEY (class_id) REFERENCES classes(id)
-)
-''')
-
-# Ödeme tablosu
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS payments (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    member_id INTEGER,
-    amount REAL,
-    date TEXT,
-    note TEXT,
-    FOREIGN KEY (member_id) REFERENCES members(id)
-)
-''')
-
-# Güvenli sütun ekleme fonksiyonu
-def add_column_if_not_exists(table, column, column_type):
-    cursor.execute(f"PRAGMA table_info({table})")
-    columns = [info[1] for info in cursor.fetchall()]
-    if column not in columns:
-        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
-
-# Öğrenciye özel ek alanlar
-add_column_if_not_exists('members', 'birth_date', 'TEXT')
-add_column_if_not_exists('members', 'height', 'REAL')
-add_column_if_not_exists('members', 'weight', 'REAL')
-add_column_if_not_exists('members', 'belt_level', 'TEXT')
-add_column_if_not_exists('members', 'weight_category', 'TEXT')
-add_column_if_not_exists('members', 'parent_name', 'TEXT')
-add_column_if_not_exists('members', 'parent_phone', 'TEXT')
-add_column_if_not_exists('members', 'parent_email', 'TEXT')
-add_column_if_not_exists('members', 'registration_date', 'TEXT')
-add_column_if_not_exists('trainers', 'share_percent', 'REAL')
-add_column_if_not_exists('payments', 'note', 'TEXT')
-add_column_if_not_exists('payments', 'payment_date', 'TEXT')
-add_column_if_not_exists('payments', 'start_date', 'TEXT')
-add_column_if_not_exists('payments', 'end_date', 'TEXT')
-
-# Değişiklikleri kaydet
-conn.commit()
-conn.close()
\ No newline at end of file
+
+class ConnectionPool:
+    """Sınırlı sayıda SQLite bağlantısı tutan havuz.
+
+    Bağlantılar gerektikçe açılır; serve.py her worker başlarken warm() ile
+    thread sayısı kadarını önceden açar.
+
+    Her uygulamanın kendi havuzu vardır (create_app, app.extensions['db_pool']);
+    aynı süreçteki iki uygulama farklı veritabanlarına bağlanabilir.
+    """
+
+    def __init__(self, path=None, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self.hits = 0            # Boşta bekleyen bağlantı hazır bulundu
+        self.misses = 0          # Yeni bağlantı açmak gerekti
+        self.waits = 0           # Havuz doluydu, bağlantı beklendi
+        self.timeouts = 0
+        self.checkouts = 0
+        self.checkout_time = 0.0
+        self.max_checkout_time = 0.0
+
+    def acquire(self):
+        started = time.perf_counter()
+        try:
+            conn = self._idle.get_nowait()
+            with self._lock:
+                self.hits += 1
+        except Empty:
+            conn = self._create_or_wait()
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_time += elapsed
+            self.max_checkout_time = max(self.max_checkout_time, elapsed)
+        return conn
+
+    def _create_or_wait(self):
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+                self.misses += 1
+            else:
+                self.waits += 1
+
+        if can_create:
+            try:
+                conn = _open_connection(self.path)
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+            conn.pooled = True
+            return conn
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except Empty:
+            with self._lock:
+                self.timeouts += 1
+            raise sqlite3.OperationalError('Veritabanı bağlantı havuzu dolu')
+
+    def warm(self, count=None):
+        """Uygulama açılırken bağlantıları önceden açar."""
+        count = min(count or self.size, self.size)
+        opened = [self.acquire() for _ in range(count)]
+        for conn in opened:
+            self.release(conn)
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except Empty:
+                break
+            conn.really_close()
+            with self._lock:
+                self._created -= 1
+
+    def after_fork(self):
+        """fork edilen worker'da çağrılır; ana süreçten kalan bağlantılar kullanılmaz.
+
+        SQLite bağlantısı fork'tan sonra çocukta kapatılmamalı da; sadece bırakılır.
+        """
+        self._idle = LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'open': self._created,
+                'idle': self._idle.qsize(),
+                'hits': self.hits,
+                'misses': self.misses,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'checkouts': self.checkouts,
+                'avg_checkout_ms': round(self.checkout_time / self.checkouts * 1000, 3) if self.checkouts else 0,
+                'max_checkout_ms': round(self.max_checkout_time * 1000, 3),
+            }
+
+
+# Etkin uygulamanın havuzu
+pool = LocalProxy(lambda: current_app.extensions['db_pool'])
+
+
+def get_db_connection():
+    """Request boyunca aynı havuz bağlantısını döndürür.
+
+    Flask request'i dışında (script, komut satırı) normal, kendi kapanan bir
+    bağlantı açılır.
+    """
+    if not has_app_context():
+        return _open_connection()
+    if 'db' not in g:
+        g.db = pool.acquire()
+    return g.db
+
+
+def close_db_connection(exception=None):
+    """app.teardown_appcontext ile kaydedilir; bağlantıyı havuza geri bırakır."""
+    conn = g.pop('db', None)
+    if conn is not None:
+        pool.release(conn)
+
+
+def create_schema(conn):
+    """Tabloları oluşturur, eksik sütunları ekler ve migration'ları çalıştırır."""
+    from migrations import run_migrations
+
+    cursor = conn.cursor()
+
+    # Kullanıcı tablosu (giriş sistemi için)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        role TEXT NOT NULL CHECK(role IN ('admin', 'trainer'))
+    )
+    ''')
+
+    # Üye tablosu
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS members (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        email TEXT,
+        phone TEXT
+    )
+    ''')
+
+    # Eğitmen tablosu
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS trainers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        email TEXT,
+        phone TEXT
+    )
+    ''')
+
+    # Sınıf tablosu
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS classes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        trainer_id INTEGER,
+        FOREIGN KEY (trainer_id) REFERENCES trainers(id)
+    )
+    ''')
+
+    # Katılım tablosu
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS enrollments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        member_id INTEGER,
+        class_id INTEGER,
+        FOREIGN KEY (member_id) REFERENCES members(id),
+        FOREIGN KEY (class_id) REFERENCES classes(id)
+    )
+    ''')
+
+    # Ödeme tablosu
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS payments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        member_id INTEGER,
+        amount REAL,
+        date TEXT,
+        note TEXT,
+        FOREIGN KEY (member_id) REFERENCES members(id)
+    )
+    ''')
+
+    # Güvenli sütun ekleme fonksiyonu
+    def add_column_if_not_exists(table, column, column_type):
+        cursor.execute(f"PRAGMA table_info({table})")
+        columns = [info[1] for info in cursor.fetchall()]
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+    # Öğrenciye özel ek alanlar
+    add_column_if_not_exists('members', 'birth_date', 'TEXT')
+    add_column_if_not_exists('members', 'height', 'REAL')
+    add_column_if_not_exists('members', 'weight', 'REAL')
+    add_column_if_not_exists('members', 'belt_level', 'TEXT')
+    add_column_if_not_exists('members', 'weight_category', 'TEXT')
+    add_column_if_not_exists('members', 'parent_name', 'TEXT')
+    add_column_if_not_exists('members', 'parent_phone', 'TEXT')
+    add_column_if_not_exists('members', 'parent_email', 'TEXT')
+    add_column_if_not_exists('members', 'registration_date', 'TEXT')
+    add_column_if_not_exists('trainers', 'share_percent', 'REAL')
+    add_column_if_not_exists('payments', 'note', 'TEXT')
+    add_column_if_not_exists('payments', 'payment_date', 'TEXT')
+    add_column_if_not_exists('payments', 'start_date', 'TEXT')
+    add_column_if_not_exists('payments', 'end_date', 'TEXT')
+
+    # Değişiklikleri kaydet
+    conn.commit()
+
+    # Sürümlü şema adımları (indeksler, eksik sütunlar, ANALYZE)
+    run_migrations(conn)
+
+
+def init_db(path=None):
+    """Şemayı kurar/günceller. Import sırasında değil, açıkça çağrılır:
+
+        flask --app app init-db    veya    python database.py
+    """
+    conn = sqlite3.connect(path or DATABASE)
+    create_schema(conn)
+    conn.close()
+
+
+if __name__ == '__main__':
+    init_db()
+    print(f'{DATABASE} hazır.')
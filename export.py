@@ -0,0 +1,120 @@
+import csv
+import io
+import json
+
+from attribution import attribution_ctes
+from pagination import iter_rows
+from periods import period_key
+
+# CSV ve JSON-lines dışa aktarım. Satırlar imleçten parça parça okunup
+# hemen gönderilir; dosyanın tamamı hiçbir zaman bellekte tutulmaz.
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+# Ödeme tarihi: period doldurmasıyla (migration 4) aynı ifade; boş payment_date de date'e düşer
+PAYMENT_DATE = "COALESCE(NULLIF(payments.payment_date, ''), payments.date)"
+
+
+def payments_query(start=None, end=None, trainer_id=None, class_id=None):
+    """Tarih aralığı (YYYY-MM-DD), eğitmen ve/veya sınıfa göre süzülmüş ödemeler.
+
+    Eski formdan girilen ödemelerde sadece date / period dolu (payment_date
+    boş veya NULL); tarih PAYMENT_DATE ile okunur. period koşulu indeksi
+    kullanır, tarih koşulu ay içindeki sınırı keser.
+    """
+    where, params = [], []
+    if start:
+        if period_key(start):
+            where.append('payments.period >= ?')
+            params.append(period_key(start))
+        where.append(f'{PAYMENT_DATE} >= ?')
+        params.append(start)
+    if end:
+        if period_key(end):
+            where.append('payments.period <= ?')
+            params.append(period_key(end))
+        where.append(f'{PAYMENT_DATE} <= ?')
+        params.append(end)
+    class_filters = []
+    if trainer_id:
+        class_filters.append('classes.trainer_id = ?')
+        params.append(trainer_id)
+    if class_id:
+        class_filters.append('classes.id = ?')
+        params.append(class_id)
+    if class_filters:
+        where.append(f'''payments.member_id IN (
+            SELECT enrollments.member_id FROM enrollments
+            JOIN classes ON enrollments.class_id = classes.id
+            WHERE {' AND '.join(class_filters)}
+        )''')
+    sql = f'''
+        SELECT payments.id, payments.member_id, members.name AS member_name,
+               payments.amount, {PAYMENT_DATE} AS payment_date,
+               payments.start_date, payments.end_date, payments.note
+        FROM payments
+        LEFT JOIN members ON payments.member_id = members.id
+        {'WHERE ' + ' AND '.join(where) if where else ''}
+        ORDER BY payments.id
+    '''
+    return sql, params
+
+
+MEMBERS_QUERY = '''
+    SELECT id, name, email, phone, birth_date, belt_level, weight_category,
+           parent_name, parent_phone, parent_email, registration_date
+    FROM members
+    ORDER BY id
+'''
+
+
+def report_query(start_period=None, end_period=None):
+    """Ay / eğitmen / sınıf bazında dağıtılmış gelir (rapor toplamları)."""
+    where, params = ['1'], []
+    if start_period:
+        where.append('period >= ?')
+        params.append(start_period)
+    if end_period:
+        where.append('period <= ?')
+        params.append(end_period)
+    sql = f'''
+        WITH {attribution_ctes(' AND '.join(where))}
+        SELECT printf('%04d-%02d', a.period / 100, a.period % 100) AS month,
+               trainers.name AS trainer_name, classes.name AS class_name,
+               ROUND(SUM(a.amount), 2) AS revenue,
+               ROUND(SUM(a.amount * COALESCE(trainers.share_percent, 0) / 100.0), 2) AS trainer_share
+        FROM attributed a
+        LEFT JOIN classes ON a.class_id = classes.id
+        LEFT JOIN trainers ON a.trainer_id = trainers.id
+        GROUP BY a.period, a.class_id
+        ORDER BY a.period, trainers.name, classes.name
+    '''
+    return sql, params
+
+
+def stream_rows(conn, sql, params, fmt):
+    """Sorgu sonucunu CSV veya JSON-lines metin parçaları olarak üretir."""
+    cursor = conn.execute(sql, params)
+    columns = [col[0] for col in cursor.description]
+
+    if fmt == 'jsonl':
+        for row in iter_rows(cursor):
+            yield json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n'
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # Excel'in Türkçe karakterleri doğru açması için BOM
+    buffer.write('\ufeff')
+    writer.writerow(columns)
+    for row in iter_rows(cursor):
+        writer.writerow(row)
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,403 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from functools import partial
+
+from flask import current_app
+from werkzeug.local import LocalProxy
+
+from database import connect
+from notifications import configured_transports, dispatch, queue_renewal_notifications
+from response_cache import cache, invalidate
+from rollups import rebuild_rollups
+from subscriptions import queue_renewal_reminders, rebuild_member_status
+from write_queue import writes
+
+# Arka plan işleri.
+#
+# Türetilmiş veriler (gelir toplamları, abonelik durumu) ve bakım işleri
+# gece, istek yolunun dışında çalışır. Planlayıcı uygulama sürecinin
+# içinde tek bir thread'dir; dış kuyruk/broker yoktur. Her çalıştırma jobs
+# tablosunda bir satırdır, yeniden başlatmada kaybolmaz; kaçırılan iş ilk
+# fırsatta çalışır.
+#
+# Birden çok worker'da her birinin planlayıcısı çalışır. İş, satırı
+# 'pending' → 'running' yapan UPDATE ile alınır; satırı alamayan worker onu
+# çalıştırmaz. Çalışan iş JOB_HEARTBEAT_SECONDS'te bir heartbeat_at'i
+# günceller; JOB_STALE_SECONDS boyunca nabız gelmeyen iş (süreç ölmüş)
+# yeniden denenir. Saatlerce süren iş de nabız verdiği sürece geri alınmaz.
+# Hata veren iş JOB_BACKOFF_SECONDS'ten başlayıp her denemede iki katına
+# çıkan aralıklarla max_attempts kez denenir.
+#
+# Veriyi değiştiren işler write_queue üzerinden yazar; istekler gibi onlar
+# da tek yazıcının sırasına girer. Planlayıcı uygulamaya bağlıdır
+# (create_app, app.extensions['scheduler']); işler o uygulamanın app
+# context'inde, onun veritabanı ve yazma kuyruğuyla çalışır.
+
+JOB_POLL_SECONDS = 30
+JOB_BACKOFF_SECONDS = 60
+JOB_MAX_ATTEMPTS = 3
+JOB_HEARTBEAT_SECONDS = 60
+JOB_STALE_SECONDS = 600      # Bu kadar süredir nabız vermeyen 'running' iş yeniden denenir
+JOB_WRITE_TIMEOUT = 600      # Gece işlerinin write_queue onayı için bekleme süresi
+JOB_HISTORY = 50             # Durum sayfasında gösterilen son çalıştırma
+
+
+class Job:
+    def __init__(self, name, label, func, at, every_days=1, max_attempts=JOB_MAX_ATTEMPTS):
+        self.name = name
+        self.label = label
+        self.func = func
+        self.at = at
+        self.every_days = every_days
+        self.max_attempts = max_attempts
+
+    def next_run(self, now, last_run=None):
+        """`at` saatindeki ilk uygun zaman; son çalıştırmadan every_days geçmiş olmalı."""
+        hour, minute = (int(part) for part in self.at.split(':'))
+        candidate = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if last_run is not None:
+            earliest = (last_run + timedelta(days=self.every_days)).replace(
+                hour=hour, minute=minute, second=0, microsecond=0)
+            candidate = max(candidate, earliest)
+        if candidate <= now:
+            candidate += timedelta(days=1)
+        return candidate
+
+
+# --- İşler ---
+
+def refresh_rollups():
+    writes.write(lambda conn, batch: rebuild_rollups(conn), timeout=JOB_WRITE_TIMEOUT)
+    invalidate('payments')
+    return 'gelir toplamları yeniden hesaplandı'
+
+
+def refresh_member_status():
+    def rebuild(conn, batch):
+        rebuild_member_status(conn)
+        return conn.execute('SELECT COUNT(*) FROM member_status').fetchone()[0]
+
+    count = writes.write(rebuild, timeout=JOB_WRITE_TIMEOUT)
+    return f'{count} üyenin abonelik durumu güncellendi'
+
+
+def renewal_reminders():
+    today = date.today()
+    count = writes.write(lambda conn, batch: queue_renewal_reminders(conn, today=today), timeout=JOB_WRITE_TIMEOUT)
+    return f'{count} yeni yenileme hatırlatması'
+
+
+def renewal_notifications():
+    transports = configured_transports()
+    if not transports:
+        return 'bildirim kanalı yok (FITTRACK_NOTIFY_EMAIL / FITTRACK_NOTIFY_SMS)'
+    today = date.today()
+    queued = writes.write(lambda conn, batch: queue_renewal_notifications(conn, list(transports), today),
+                          timeout=JOB_WRITE_TIMEOUT)
+    totals = dispatch(transports, partial(writes.write, timeout=JOB_WRITE_TIMEOUT))
+    summary = f"{queued} yeni mesaj; {totals['sent']} gönderildi, {totals['failed']} hata"
+    if totals['failed'] and not totals['sent']:
+        # Hiçbiri gitmediyse (sunucu kapalı vb.) iş geri çekilerek yeniden denensin
+        raise RuntimeError(summary)
+    return summary
+
+
+def _maintenance_connection():
+    conn = connect(current_app.config['DATABASE'])     # Havuz bağlantısının ayarı değişmesin
+    conn.isolation_level = None          # VACUUM transaction içinde çalışmaz
+    return conn
+
+
+def maintenance():
+    conn = _maintenance_connection()
+    try:
+        conn.execute('ANALYZE')
+        busy, wal_pages, checkpointed = conn.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+    finally:
+        conn.close()
+    purged = cache.purge_expired()
+    return (f'ANALYZE tamam; WAL checkpoint {checkpointed}/{wal_pages} sayfa' + (' (meşgul)' if busy else '')
+            + f'; {purged} eski önbellek kaydı silindi')
+
+
+def vacuum():
+    conn = _maintenance_connection()
+    try:
+        before = conn.execute('PRAGMA page_count').fetchone()[0]
+        conn.execute('VACUUM')
+        after = conn.execute('PRAGMA page_count').fetchone()[0]
+    finally:
+        conn.close()
+    return f'{before} → {after} sayfa'
+
+
+JOBS = (
+    Job('rollups', 'Gelir toplamları', refresh_rollups, '03:00'),
+    Job('member_status', 'Abonelik durumu', refresh_member_status, '03:10'),
+    Job('renewal_reminders', 'Yenileme hatırlatmaları', renewal_reminders, '03:20'),
+    Job('renewal_notifications', 'Yenileme bildirimleri (e-posta / SMS)', renewal_notifications, '09:00'),
+    Job('maintenance', 'ANALYZE, WAL checkpoint ve önbellek temizliği', maintenance, '03:40'),
+    Job('vacuum', 'VACUUM', vacuum, '04:00', every_days=7),
+)
+
+
+class Heartbeat:
+    """İş çalışırken jobs.heartbeat_at'i düzenli günceller.
+
+    Kendi thread'i ve kendi bağlantısıyla çalışır; iş ne kadar uzun sürerse
+    sürsün planlayıcılar onu bayat saymaz.
+    """
+
+    def __init__(self, path, job_id, worker, interval=JOB_HEARTBEAT_SECONDS):
+        self.path = path
+        self.job_id = job_id
+        self.worker = worker
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, name='job-heartbeat', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        conn = connect(self.path)
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    with conn:
+                        conn.execute('''
+                            UPDATE jobs SET heartbeat_at = ?
+                            WHERE id = ? AND status = 'running' AND worker = ?
+                        ''', (_iso(_now()), self.job_id, self.worker))
+                except sqlite3.Error:
+                    pass    # Veritabanı meşgul; bir sonraki nabızda
+        finally:
+            conn.close()
+
+
+def _now():
+    return datetime.now().replace(microsecond=0)
+
+
+def _iso(value):
+    return value.isoformat(sep=' ')
+
+
+class Scheduler:
+    def __init__(self, app, jobs=JOBS, poll=JOB_POLL_SECONDS):
+        self.app = app
+        self.jobs = {job.name: job for job in jobs}
+        self.poll = poll
+        self._reset()
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._conn = None
+        self.worker = f'{socket.gethostname()}:{os.getpid()}'
+        self.runs = 0
+        self.failures = 0
+        self.last_tick_error = None
+
+    # --- Yaşam döngüsü ---
+
+    def start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name='job-scheduler', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=10):
+        """Planlayıcıyı durdurur; çalışan iş varsa bitmesini timeout kadar bekler."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        thread.join(timeout)
+        self._thread = None
+
+    def after_fork(self):
+        # Ana süreçteki thread çocuğa geçmez; ilk istekte yeniden başlar
+        self._reset()
+
+    def _run(self):
+        while not self._stopping:
+            try:
+                with self.app.app_context():
+                    self.tick()
+                self.last_tick_error = None
+            except Exception as e:
+                # Veritabanı meşgul vb.; bir sonraki turda tekrar denenir
+                self.last_tick_error = f'{type(e).__name__}: {e}'
+                self._drop_connection()
+            self._wake.wait(self.poll)
+            self._wake.clear()
+        self._drop_connection()
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = connect(self.app.config['DATABASE'])     # Havuza ait olmayan, planlayıcıya özel
+        return self._conn
+
+    def _drop_connection(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    # --- Planlama ---
+
+    def tick(self, now=None):
+        """Bayat işleri kurtarır, eksik planları ekler ve vakti gelen işleri çalıştırır."""
+        conn = self._connection()
+        now = now or _now()
+        self._recover_stale(conn, now)
+        self._schedule(conn, now)
+        while not self._stopping:
+            row = self._claim(conn, now)
+            if row is None:
+                break
+            self._execute(conn, row)
+            now = _now()
+
+    def _recover_stale(self, conn, now):
+        stale = _iso(now - timedelta(seconds=JOB_STALE_SECONDS))
+        with conn:
+            conn.execute('''
+                UPDATE jobs SET
+                    status = CASE WHEN attempts < max_attempts THEN 'pending' ELSE 'failed' END,
+                    run_at = ?, finished_at = ?, error = 'yarıda kaldı (süreç kapanmış olabilir)'
+                WHERE status = 'running' AND COALESCE(heartbeat_at, started_at) < ?
+            ''', (_iso(now), _iso(now), stale))
+
+    def _schedule(self, conn, now):
+        active = {row[0] for row in conn.execute(
+            "SELECT name FROM jobs WHERE status IN ('pending', 'running')")}
+        for job in self.jobs.values():
+            if job.name in active:
+                continue
+            last = conn.execute(
+                "SELECT MAX(started_at) FROM jobs WHERE name = ? AND status = 'done'", (job.name,)).fetchone()[0]
+            run_at = job.next_run(now, datetime.fromisoformat(last) if last else None)
+            with conn:
+                # Başka bir worker aynı anda planladıysa benzersiz indeks ikinciyi yok sayar
+                conn.execute('''
+                    INSERT OR IGNORE INTO jobs (name, status, run_at, max_attempts)
+                    VALUES (?, 'pending', ?, ?)
+                ''', (job.name, _iso(run_at), job.max_attempts))
+
+    def _claim(self, conn, now):
+        rows = conn.execute('''
+            SELECT * FROM jobs WHERE status = 'pending' AND run_at <= ?
+            ORDER BY run_at, id LIMIT 5
+        ''', (_iso(now),)).fetchall()
+        for row in rows:
+            if row['name'] not in self.jobs:
+                continue
+            with conn:
+                claimed = conn.execute('''
+                    UPDATE jobs SET status = 'running', attempts = attempts + 1,
+                                    worker = ?, started_at = ?, heartbeat_at = ?, error = NULL
+                    WHERE id = ? AND status = 'pending'
+                ''', (self.worker, _iso(_now()), _iso(_now()), row['id'])).rowcount
+            if claimed:
+                return conn.execute('SELECT * FROM jobs WHERE id = ?', (row['id'],)).fetchone()
+        return None
+
+    def _execute(self, conn, row):
+        job = self.jobs[row['name']]
+        started = time.perf_counter()
+        try:
+            with Heartbeat(self.app.config['DATABASE'], row['id'], self.worker):
+                result = job.func()
+        except Exception as e:
+            self.failures += 1
+            error = f'{type(e).__name__}: {e}'
+            if row['attempts'] < row['max_attempts']:
+                retry_at = _now() + timedelta(seconds=JOB_BACKOFF_SECONDS * 2 ** (row['attempts'] - 1))
+                status, run_at = 'pending', _iso(retry_at)
+            else:
+                status, run_at = 'failed', row['run_at']
+            with conn:
+                conn.execute('''
+                    UPDATE jobs SET status = ?, run_at = ?, finished_at = ?, duration_ms = ?, error = ?
+                    WHERE id = ?
+                ''', (status, run_at, _iso(_now()), round((time.perf_counter() - started) * 1000),
+                      error, row['id']))
+            return
+
+        self.runs += 1
+        with conn:
+            conn.execute('''
+                UPDATE jobs SET status = 'done', finished_at = ?, duration_ms = ?, result = ?
+                WHERE id = ?
+            ''', (_iso(_now()), round((time.perf_counter() - started) * 1000),
+                  None if result is None else str(result), row['id']))
+
+    # --- Elle çalıştırma ve durum ---
+
+    def run_now(self, conn, name):
+        """İşi hemen çalışacak şekilde öne alır (bekleyeni varsa onu, yoksa yeni satır)."""
+        if name not in self.jobs:
+            raise ValueError(f'bilinmeyen iş: {name}')
+        now = _iso(_now())
+        with conn:
+            moved = conn.execute('''
+                UPDATE jobs SET run_at = ? WHERE name = ? AND status = 'pending'
+            ''', (now, name)).rowcount
+            if not moved:
+                inserted = conn.execute('''
+                    INSERT OR IGNORE INTO jobs (name, status, run_at, max_attempts)
+                    VALUES (?, 'pending', ?, ?)
+                ''', (name, now, self.jobs[name].max_attempts)).rowcount
+                if not inserted:
+                    raise ValueError(f'{name} şu anda çalışıyor')
+        self._wake.set()
+
+    def status(self, conn, limit=JOB_HISTORY):
+        """Durum sayfası için: işlerin sıradaki çalıştırması ve son çalıştırmalar."""
+        active = {row['name']: row for row in conn.execute(
+            "SELECT * FROM jobs WHERE status IN ('pending', 'running')")}
+        last = {row['name']: row for row in conn.execute('''
+            SELECT * FROM jobs WHERE id IN (
+                SELECT MAX(id) FROM jobs WHERE status IN ('done', 'failed') GROUP BY name
+            )
+        ''')}
+        jobs = [{'name': job.name, 'label': job.label, 'at': job.at, 'every_days': job.every_days,
+                 'next': active.get(job.name), 'last': last.get(job.name)}
+                for job in self.jobs.values()]
+        history = conn.execute('''
+            SELECT * FROM jobs WHERE started_at IS NOT NULL
+            ORDER BY id DESC LIMIT ?
+        ''', (limit,)).fetchall()
+        return jobs, history
+
+    def stats(self):
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'runs': self.runs,
+            'failures': self.failures,
+            'tick_error': self.last_tick_error,
+        }
+
+
+# Etkin uygulamanın planlayıcısı
+scheduler = LocalProxy(lambda: current_app.extensions['scheduler'])
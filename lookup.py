@@ -0,0 +1,49 @@
+from member_search import fts_query
+
+# Form alanları için isimle arama (typeahead). Önce name indeksi üzerinden
+# "ile başlayan" eşleşmeler aralık sorgusuyla bulunur. Üyelerde yer kalırsa
+# adın içindeki kelimelerin başıyla eşleşenler members_fts'in name
+# sütunundan eklenir (büyük/küçük harf ve Türkçe harf duyarsız, indeksli).
+# Sınıf ve eğitmen tabloları küçüktür; onlarda sadece ön ek eşleşmesi var.
+
+LOOKUP_TABLES = {
+    'members': 'members',
+    'classes': 'classes',
+    'trainers': 'trainers',
+}
+# Kelime başı eşleşmesi için tam metin tablosu olanlar
+LOOKUP_FTS = {'members': 'members_fts'}
+LOOKUP_LIMIT = 10
+MAX_LOOKUP_LIMIT = 50
+
+
+def lookup_by_name(conn, table, query, limit=LOOKUP_LIMIT):
+    fts_table = LOOKUP_FTS.get(table)
+    table = LOOKUP_TABLES[table]
+    query = query.strip()
+    limit = min(max(limit, 1), MAX_LOOKUP_LIMIT)
+    if not query:
+        return []
+
+    # name >= 'ay' AND name < 'ay\U0010ffff' → idx_<tablo>_name üzerinde aralık taraması
+    rows = conn.execute(f'''
+        SELECT id, name FROM {table}
+        WHERE name >= ? AND name < ?
+        ORDER BY name = ? DESC, length(name), name
+        LIMIT ?
+    ''', (query, query + '\U0010ffff', query, limit)).fetchall()
+    results = [{'id': row['id'], 'name': row['name']} for row in rows]
+
+    match = fts_query(query)
+    if fts_table and match and len(results) < limit:
+        seen = [r['id'] for r in results] or [0]
+        rows = conn.execute(f'''
+            SELECT {table}.id, {table}.name FROM {fts_table}
+            JOIN {table} ON {table}.id = {fts_table}.rowid
+            WHERE {fts_table} MATCH ?
+            AND {table}.id NOT IN ({','.join('?' * len(seen))})
+            ORDER BY length({table}.name), {table}.name
+            LIMIT ?
+        ''', [f'name : ({match})'] + seen + [limit - len(results)]).fetchall()
+        results += [{'id': row['id'], 'name': row['name']} for row in rows]
+    return results
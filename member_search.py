@@ -0,0 +1,82 @@
+import re
+
+# FTS5 ile üye arama. Ad, e-posta, telefon, veli adı ve veli telefonu
+# members_fts tablosunda tutulur; tetikleyiciler members ile eşitler.
+#
+# Türkçe harfler: unicode61 tokenizer büyük/küçük harfi ve şapkaları
+# (ş→s, ç→c, ğ→g, ö→o, ü→u) kendisi katlar, ama İ ve ı için Türkçe kuralı
+# bilmez. Bu ikisi hem kaydederken hem ararken "i" yapılır; böylece "isik",
+# "IŞIK" ve "ışık" aynı kaydı bulur.
+
+FTS_COLUMNS = ('name', 'email', 'phone', 'parent_name', 'parent_phone')
+
+# bm25 ağırlıkları (FTS_COLUMNS sırasıyla): isim eşleşmesi en önde
+FTS_WEIGHTS = (10.0, 2.0, 2.0, 1.0, 1.0)
+
+
+def fold_sql(expr):
+    return f"replace(replace(COALESCE({expr}, ''), 'ı', 'i'), 'İ', 'i')"
+
+
+def fold(text):
+    return text.replace('ı', 'i').replace('İ', 'i')
+
+
+def fts_query(text):
+    """Kullanıcı girdisini FTS5 sorgusuna çevirir: her kelime ön ek olarak, hepsi AND."""
+    terms = re.findall(r'\w+', fold(text))
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def _fts_values(prefix):
+    return ', '.join(fold_sql(f'{prefix}.{col}') for col in FTS_COLUMNS)
+
+
+def create_member_fts(cur):
+    columns = ', '.join(FTS_COLUMNS)
+    cur.execute(f'''
+    CREATE VIRTUAL TABLE IF NOT EXISTS members_fts USING fts5(
+        {columns},
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    ''')
+    cur.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS members_fts_insert AFTER INSERT ON members BEGIN
+        INSERT INTO members_fts (rowid, {columns}) VALUES (new.id, {_fts_values('new')});
+    END
+    ''')
+    cur.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS members_fts_update AFTER UPDATE ON members BEGIN
+        DELETE FROM members_fts WHERE rowid = old.id;
+        INSERT INTO members_fts (rowid, {columns}) VALUES (new.id, {_fts_values('new')});
+    END
+    ''')
+    cur.execute('''
+    CREATE TRIGGER IF NOT EXISTS members_fts_delete AFTER DELETE ON members BEGIN
+        DELETE FROM members_fts WHERE rowid = old.id;
+    END
+    ''')
+    cur.execute('DELETE FROM members_fts')
+    cur.execute(f'INSERT INTO members_fts (rowid, {columns}) SELECT id, {_fts_values("members")} FROM members')
+
+
+def search_members_sql():
+    """keyset_page ile kullanılacak sıralı arama sorgusu.
+
+    Sayfalama id yerine sonuç sırasına (position) göre yapılır; parametreler:
+    (fts sorgusu, son position, limit).
+    """
+    weights = ', '.join(str(w) for w in FTS_WEIGHTS)
+    return f'''
+        SELECT * FROM (
+            SELECT members.*,
+                   row_number() OVER (ORDER BY bm25(members_fts, {weights}), members.id) AS position
+            FROM members_fts
+            JOIN members ON members.id = members_fts.rowid
+            WHERE members_fts MATCH ?
+        )
+        WHERE position > ?
+        ORDER BY position
+        LIMIT ?
+    '''
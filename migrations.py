@@ -0,0 +1,334 @@
+from contextlib import contextmanager
+from datetime import datetime
+
+from member_search import create_member_fts
+from periods import PERIOD_SQL
+from rollups import rebuild_rollups
+from subscriptions import rebuild_member_status
+
+# Sürümlü şema değişiklikleri. Her adım bir kez çalışır ve schema_version
+# tablosuna yazılır; yeni değişiklik gerektiğinde listenin sonuna eklenir.
+
+
+def column_exists(cur, table, column):
+    cur.execute(f"PRAGMA table_info({table})")
+    return column in [info[1] for info in cur.fetchall()]
+
+
+def add_column(cur, table, column, column_type):
+    if not column_exists(cur, table, column):
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+
+def fix_missing_columns(cur):
+    # Kodda kullanılan ama şemada hiç oluşturulmayan sütunlar
+    add_column(cur, 'members', 'trainer_id', 'INTEGER')
+    add_column(cur, 'members', 'join_date', 'TEXT')
+    add_column(cur, 'classes', 'description', 'TEXT')
+    add_column(cur, 'classes', 'day', 'TEXT')
+    add_column(cur, 'classes', 'time', 'TEXT')
+
+
+def create_hot_indexes(cur):
+    # Üye detayı, /expiring ve yenileme önerisi (son bitiş tarihi)
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_payments_member_end ON payments (member_id, end_date)')
+    # Ay bazlı raporlar; amount ve member_id dahil, tabloya dönmeden okunur
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_payments_date ON payments (payment_date, member_id, amount)')
+    # Katılım iki yönden de aranıyor: üyenin sınıfları, sınıfın üyeleri
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_enrollments_member ON enrollments (member_id, class_id)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_enrollments_class ON enrollments (class_id, member_id)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_classes_trainer ON classes (trainer_id)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_members_name ON members (name)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_members_trainer ON members (trainer_id)')
+
+
+def add_payment_period(cur):
+    # payments.period = yyyymm; eski kayıtlarda sadece "date" dolu olabilir
+    add_column(cur, 'payments', 'period', 'INTEGER')
+    source = "COALESCE(NULLIF(payment_date, ''), date)"
+    cur.execute(f'UPDATE payments SET period = {PERIOD_SQL.format(col=source)} WHERE period IS NULL')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_payments_period ON payments (period, member_id, amount)')
+
+
+def create_revenue_rollup(cur):
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS revenue_rollup (
+        period INTEGER NOT NULL,
+        dimension TEXT NOT NULL,
+        key TEXT NOT NULL,
+        label TEXT,
+        total REAL NOT NULL DEFAULT 0,
+        trainer_income REAL,
+        payment_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (dimension, key, period)
+    )
+    ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_revenue_rollup_period ON revenue_rollup (period)')
+    rebuild_rollups(cur)
+
+
+def create_name_indexes(cur):
+    # Typeahead aramaları (members.name zaten 2. adımda var)
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_classes_name ON classes (name)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_trainers_name ON trainers (name)')
+
+
+def create_settlements(cur):
+    # Kapatılmış ayların hakediş görüntüsü; bir kez yazılır, sonra değişmez
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS settlement_periods (
+        period INTEGER PRIMARY KEY,
+        closed_at TEXT NOT NULL,
+        total_kurus INTEGER NOT NULL,
+        salon_kurus INTEGER NOT NULL
+    )
+    ''')
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS settlement_lines (
+        period INTEGER NOT NULL REFERENCES settlement_periods(period),
+        trainer_id INTEGER NOT NULL,
+        class_id INTEGER NOT NULL,
+        trainer_name TEXT,
+        class_name TEXT,
+        share_bp INTEGER NOT NULL,
+        revenue_kurus INTEGER NOT NULL,
+        trainer_kurus INTEGER NOT NULL,
+        PRIMARY KEY (period, trainer_id, class_id)
+    ) WITHOUT ROWID
+    ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_settlement_lines_trainer ON settlement_lines (trainer_id, period)')
+    for table in ('settlement_periods', 'settlement_lines'):
+        for action in ('UPDATE', 'DELETE'):
+            cur.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_no_{action.lower()}
+            BEFORE {action} ON {table}
+            BEGIN
+                SELECT RAISE(ABORT, 'kapatılmış hakediş değiştirilemez');
+            END
+            ''')
+
+
+def create_member_status(cur):
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS member_status (
+        member_id INTEGER PRIMARY KEY,
+        end_date TEXT,
+        last_payment_date TEXT,
+        last_period INTEGER,
+        current_month_paid INTEGER NOT NULL DEFAULT 0,
+        days_left INTEGER,
+        as_of TEXT NOT NULL
+    )
+    ''')
+    # /expiring: bitiş tarihi aralığı
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_member_status_end ON member_status (end_date)')
+    rebuild_member_status(cur)
+
+
+def create_jobs(cur):
+    # Arka plan işleri (jobs.py); her satır bir çalıştırma
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        status TEXT NOT NULL CHECK(status IN ('pending', 'running', 'done', 'failed')),
+        run_at TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        max_attempts INTEGER NOT NULL,
+        worker TEXT,
+        started_at TEXT,
+        finished_at TEXT,
+        duration_ms INTEGER,
+        result TEXT,
+        error TEXT
+    )
+    ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs (status, run_at)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_jobs_name ON jobs (name, id)')
+    # Bir iş adının aynı anda tek bekleyen/çalışan satırı olur; birden çok
+    # worker aynı gece işini iki kez planlayamaz
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active ON jobs (name) WHERE status IN ('pending', 'running')")
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS renewal_reminders (
+        member_id INTEGER NOT NULL,
+        end_date TEXT NOT NULL,
+        days_left INTEGER,
+        created_at TEXT NOT NULL,
+        PRIMARY KEY (member_id, end_date)
+    ) WITHOUT ROWID
+    ''')
+
+
+def create_outbox(cur):
+    # Gönderilecek bildirimler (notifications.py)
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        dedupe_key TEXT NOT NULL UNIQUE,
+        member_id INTEGER,
+        channel TEXT NOT NULL CHECK(channel IN ('email', 'sms')),
+        recipient TEXT NOT NULL,
+        subject TEXT,
+        body TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending' CHECK(status IN ('pending', 'sent', 'failed')),
+        attempts INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT NOT NULL,
+        sent_at TEXT,
+        error TEXT
+    )
+    ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox (status, channel, id)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_outbox_member ON outbox (member_id)')
+
+
+# API'nin ETag / Last-Modified değerleri bu sayaçlardan türetilir (api.py).
+# revenue_rollup sayılmaz; ödemelerden türetilir ve her ödeme yazısında
+# yüzlerce satırı değişir, raporlar kaynak tabloların sayaçlarına bakar.
+VERSIONED_TABLES = ('members', 'classes', 'trainers', 'enrollments', 'payments', 'settlement_periods')
+VERSION_ACTIONS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def create_version_triggers(cur, tables=VERSIONED_TABLES):
+    for table in tables:
+        for action in VERSION_ACTIONS:
+            cur.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_version_{action.lower()}
+            AFTER {action} ON {table}
+            BEGIN
+                UPDATE table_versions SET version = version + 1, changed_at = datetime('now')
+                WHERE name = '{table}';
+            END
+            ''')
+
+
+def create_table_versions(cur):
+    # Tablo başına değişiklik sayacı; uygulama, gece işleri, toplu aktarım
+    # veya komut satırı fark etmeksizin her yazma tetikleyiciyle sayılır
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS table_versions (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0,
+        changed_at TEXT NOT NULL
+    ) WITHOUT ROWID
+    ''')
+    cur.executemany("INSERT OR IGNORE INTO table_versions (name, changed_at) VALUES (?, datetime('now'))",
+                    [(table,) for table in VERSIONED_TABLES])
+    create_version_triggers(cur)
+
+
+@contextmanager
+def version_triggers_suspended(conn, tables=VERSIONED_TABLES):
+    """Toplu yüklemede satır başı sayaç tetikleyicilerini kaldırır; sonunda
+    tetikleyicileri geri kurar ve her tablonun sayacını bir kez artırır.
+    Tek transaction içinde kullanılmalı (başka bağlantıların yazıları
+    sayaçsız kalmasın)."""
+    if not conn.in_transaction:
+        conn.execute('BEGIN')
+    for table in tables:
+        for action in VERSION_ACTIONS:
+            conn.execute(f'DROP TRIGGER IF EXISTS {table}_version_{action.lower()}')
+    yield
+    create_version_triggers(conn, tables)
+    conn.executemany("UPDATE table_versions SET version = version + 1, changed_at = datetime('now') WHERE name = ?",
+                     [(table,) for table in tables])
+
+
+def add_job_heartbeat(cur):
+    # Çalışan iş bu sütunu düzenli günceller; bayat iş kontrolü buna bakar (jobs.py)
+    if not column_exists(cur, 'jobs', 'heartbeat_at'):
+        cur.execute('ALTER TABLE jobs ADD COLUMN heartbeat_at TEXT')
+
+
+def add_outbox_claims(cur):
+    # Gönderici mesajları önce 'sending' olarak sahiplenir; iki gönderici
+    # aynı mesajı gönderemez (notifications.py). CHECK değiştiği için tablo
+    # yeniden kurulur; yarıda kalmasın diye tek transaction'da.
+    if not cur.connection.in_transaction:
+        cur.execute('BEGIN')
+    cur.execute('''
+    CREATE TABLE outbox_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        dedupe_key TEXT NOT NULL UNIQUE,
+        member_id INTEGER,
+        channel TEXT NOT NULL CHECK(channel IN ('email', 'sms')),
+        recipient TEXT NOT NULL,
+        subject TEXT,
+        body TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending' CHECK(status IN ('pending', 'sending', 'sent', 'failed')),
+        attempts INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT NOT NULL,
+        sent_at TEXT,
+        error TEXT,
+        claimed_by TEXT,
+        claimed_at TEXT
+    )
+    ''')
+    cur.execute('''
+    INSERT INTO outbox_new (id, dedupe_key, member_id, channel, recipient, subject, body,
+                            status, attempts, created_at, sent_at, error)
+    SELECT id, dedupe_key, member_id, channel, recipient, subject, body,
+           status, attempts, created_at, sent_at, error
+    FROM outbox
+    ''')
+    cur.execute('DROP TABLE outbox')
+    cur.execute('ALTER TABLE outbox_new RENAME TO outbox')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_outbox_pending ON outbox (status, channel, id)')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_outbox_member ON outbox (member_id)')
+
+
+def analyze(cur):
+    cur.execute('ANALYZE')
+
+
+MIGRATIONS = [
+    (1, 'eksik sütunlar', fix_missing_columns),
+    (2, 'sık sorgu indeksleri', create_hot_indexes),
+    (3, 'planlayıcı istatistikleri', analyze),
+    (4, 'ödeme dönem anahtarı', add_payment_period),
+    (5, 'planlayıcı istatistikleri', analyze),
+    (6, 'gelir özet tablosu', create_revenue_rollup),
+    (7, 'isim indeksleri', create_name_indexes),
+    (8, 'üye tam metin arama', create_member_fts),
+    (9, 'gelir dağıtımı düzeltmesi', rebuild_rollups),
+    (10, 'hakediş dönem kapanışları', create_settlements),
+    (11, 'üye abonelik durumu', create_member_status),
+    (12, 'arka plan işleri', create_jobs),
+    (13, 'bildirim kutusu', create_outbox),
+    (14, 'tablo değişiklik sayaçları', create_table_versions),
+    (15, 'iş nabzı', add_job_heartbeat),
+    (16, 'bildirim sahiplenme', add_outbox_claims),
+]
+
+
+def current_version(cur):
+    cur.execute('''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT,
+        applied_at TEXT
+    )
+    ''')
+    cur.execute('SELECT MAX(version) FROM schema_version')
+    return cur.fetchone()[0] or 0
+
+
+def run_migrations(conn):
+    """Uygulanmamış adımları sırayla çalıştırır; güncel şemada hiçbir şey yapmaz."""
+    cur = conn.cursor()
+    version = current_version(cur)
+    conn.commit()
+
+    applied = []
+    for step_version, name, step in MIGRATIONS:
+        if step_version <= version:
+            continue
+        with conn:
+            step(cur)
+            cur.execute('INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)',
+                        (step_version, name, datetime.now().isoformat(timespec='seconds')))
+        applied.append(step_version)
+
+    if not applied:
+        # Şema güncel; sadece gerekiyorsa istatistikleri tazele (hızlı)
+        cur.execute('PRAGMA optimize')
+    return applied
@@ -0,0 +1,74 @@
+from flask import current_app, request, stream_template, render_template, url_for
+
+# Liste sayfaları için id'ye göre (keyset) sayfalama. OFFSET kullanmadığı
+# için geçmiş büyüdükçe sayfa maliyeti artmaz: her sayfa "id > son_id"
+# koşuluyla birincil anahtar üzerinden okunur.
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+FETCH_BATCH = 100
+
+
+def page_args():
+    """?after=<son id>&limit=<sayfa boyu>&stream=1 parametrelerini okur."""
+    after = max(request.args.get('after', 0, type=int), 0)
+    limit = request.args.get('limit', PAGE_SIZE, type=int)
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    stream = request.args.get('stream') == '1'
+    return after, limit, stream
+
+
+def iter_rows(cursor, batch=FETCH_BATCH):
+    """Satırları fetchall() yerine parça parça döndürür."""
+    while True:
+        rows = cursor.fetchmany(batch)
+        if not rows:
+            return
+        yield from rows
+
+
+class KeysetPage:
+    """Bir sayfalık satır. Sorgu limit + 1 satır ister; fazladan gelen satır
+    sonraki sayfanın var olduğunu gösterir ve listelenmez.
+
+    stream=True ise satırlar şablon döngüsünde imleçten tek tek okunur;
+    has_more ve next_after döngü bittikten sonra doğru değeri alır.
+    """
+
+    def __init__(self, cursor, limit, key='id', stream=False):
+        self.limit = limit
+        self.key = key
+        self.has_more = False
+        self.next_after = None
+        self._rows = self._read(cursor)
+        if not stream:
+            self._rows = list(self._rows)
+
+    def _read(self, cursor):
+        for count, row in enumerate(iter_rows(cursor)):
+            if count == self.limit:
+                self.has_more = True
+                return
+            self.next_after = row[self.key]
+            yield row
+
+    def __iter__(self):
+        return iter(self._rows)
+
+
+def keyset_page(conn, sql, params=(), after=0, limit=PAGE_SIZE, key='id', stream=False):
+    """sql son iki parametre olarak "id > ?" ve "LIMIT ?" değerlerini almalı."""
+    cursor = conn.execute(sql, tuple(params) + (after, limit + 1))
+    return KeysetPage(cursor, limit, key, stream)
+
+
+def next_page_url(page):
+    args = request.args.to_dict()
+    args['after'] = page.next_after
+    return url_for(request.endpoint, **args)
+
+
+def render_page(template, stream=False, **context):
+    if stream:
+        return current_app.response_class(stream_template(template, **context))
+    return render_template(template, **context)
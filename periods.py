@@ -0,0 +1,48 @@
+from datetime import date
+
+# Ödemelerin ay anahtarı: 2024-09-15 -> 202409. Tam sayı olduğu için
+# "payment_date LIKE '2024-09%'" yerine indeksli eşitlik/aralık sorgusu yapılır.
+
+
+def period_key(value):
+    """'YYYY-MM-DD' (veya 'YYYY-MM') metninden yyyymm; geçersizse None."""
+    if not value or len(value) < 7 or value[4] != '-':
+        return None
+    try:
+        year, month = int(value[:4]), int(value[5:7])
+    except ValueError:
+        return None
+    if not 1 <= month <= 12:
+        return None
+    return year * 100 + month
+
+
+def current_period(today=None):
+    today = today or date.today()
+    return today.year * 100 + today.month
+
+
+def period_label(period):
+    """202409 -> '2024-09'"""
+    return f'{period // 100:04d}-{period % 100:02d}'
+
+
+# Ay isimleri locale'den değil buradan gelir; tr_TR kurulu olmayan
+# sunucularda da aynı çalışır ve süreç genelindeki locale'e dokunmaz.
+MONTH_NAMES = ('Ocak', 'Şubat', 'Mart', 'Nisan', 'Mayıs', 'Haziran',
+               'Temmuz', 'Ağustos', 'Eylül', 'Ekim', 'Kasım', 'Aralık')
+
+
+def month_name(value):
+    """202409, '2024-09' veya '2024-09-15' -> 'Eylül'"""
+    period = value if isinstance(value, int) else period_key(value)
+    return MONTH_NAMES[period % 100 - 1] if period else ''
+
+
+# Aynı dönüşümün SQL karşılığı (geriye dönük doldurma için)
+PERIOD_SQL = '''
+    CASE WHEN {col} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]*'
+              AND CAST(substr({col}, 6, 2) AS INTEGER) BETWEEN 1 AND 12
+         THEN CAST(substr({col}, 1, 4) AS INTEGER) * 100 + CAST(substr({col}, 6, 2) AS INTEGER)
+    END
+'''
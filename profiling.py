@@ -0,0 +1,245 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from flask import g, request, has_request_context, Response
+
+import database
+
+# İstek süresi ve SQL profili.
+#
+# get_db_connection() ile açılan her bağlantıya trace/progress callback'leri
+# takılır; istek başına çalışan ifade sayısı, SQL süresi ve yaklaşık VM adımı
+# toplanır (sorgu süresi satırların okunmasını da kapsar, database.TimedCursor).
+# SLOW_QUERY_MS'i aşan sorgular EXPLAIN QUERY PLAN ile, bir istekte
+# REPEAT_THRESHOLD kereden fazla çalışan aynı sorgu (N+1) ayrıca kaydedilir.
+# Hepsi /metrics'te Prometheus metin biçiminde okunur.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)   # Saniye
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250)
+SLOW_QUERY_MS = 100
+SLOW_QUERY_LOG = 50          # Son kaç yavaş sorgu tutulur
+REPEAT_THRESHOLD = 10        # Aynı sorgu bir istekte bundan fazla çalışırsa N+1 sayılır
+REPEAT_LOG = 50
+PROGRESS_STEPS = 1000        # Progress handler her bu kadar VM adımında bir çağrılır
+
+
+def _short_sql(sql, length=160):
+    return ' '.join(sql.split())[:length]
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+
+class RouteStats:
+    __slots__ = ('latency', 'queries', 'statements', 'sql_seconds', 'vm_steps', 'slow', 'repeated')
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.vm_steps = 0
+        self.slow = 0
+        self.repeated = 0
+
+
+class RequestProfile:
+    """Tek isteğin SQL sayaçları; g.profile içinde yaşar."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.vm_steps = 0
+        self.by_sql = {}
+        self.slow = []
+
+
+class Profiler:
+    def __init__(self):
+        self.routes = {}
+        self.slow_queries = deque(maxlen=SLOW_QUERY_LOG)
+        self.repeated_queries = deque(maxlen=REPEAT_LOG)
+        self._lock = threading.Lock()
+        self._explaining = threading.local()
+
+    # --- Bağlantı callback'leri ---
+
+    def attach(self, conn):
+        conn.set_trace_callback(self._on_statement)
+        conn.set_progress_handler(self._on_progress, PROGRESS_STEPS)
+
+    @staticmethod
+    def _current():
+        if has_request_context():
+            return g.get('profile')
+        return None
+
+    def _on_statement(self, sql):
+        # Tetikleyici içindeki ifadeler ve BEGIN/COMMIT de buraya düşer
+        profile = self._current()
+        if profile is not None:
+            profile.statements += 1
+
+    def _on_progress(self):
+        profile = self._current()
+        if profile is not None:
+            profile.vm_steps += PROGRESS_STEPS
+        return 0
+
+    def on_query(self, conn, sql, params, elapsed):
+        if getattr(self._explaining, 'active', False):
+            return
+        profile = self._current()
+        if profile is None:
+            return
+        profile.queries += 1
+        profile.sql_seconds += elapsed
+        profile.by_sql[sql] = profile.by_sql.get(sql, 0) + 1
+        if elapsed * 1000 >= SLOW_QUERY_MS:
+            profile.slow.append((sql, elapsed, self._explain(conn, sql, params)))
+
+    def _explain(self, conn, sql, params):
+        if params is None:
+            return ''
+        self._explaining.active = True
+        try:
+            rows = conn.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+            return ' | '.join(row[3] for row in rows)
+        except sqlite3.Error as e:
+            return f'(plan alınamadı: {e})'
+        finally:
+            self._explaining.active = False
+
+    # --- İstek yaşam döngüsü ---
+
+    def start(self):
+        g.profile = RequestProfile()
+
+    def finish(self, exception=None):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return
+        elapsed = time.perf_counter() - profile.started
+        rule = request.url_rule.rule if request.url_rule else '(eşleşmeyen)'
+        route = (request.method, rule)
+        repeated = [(sql, n) for sql, n in profile.by_sql.items() if n > REPEAT_THRESHOLD]
+
+        with self._lock:
+            stats = self.routes.get(route)
+            if stats is None:
+                stats = self.routes[route] = RouteStats()
+            stats.latency.observe(elapsed)
+            stats.queries.observe(profile.queries)
+            stats.statements += profile.statements
+            stats.sql_seconds += profile.sql_seconds
+            stats.vm_steps += profile.vm_steps
+            stats.slow += len(profile.slow)
+            stats.repeated += len(repeated)
+            for sql, seconds, plan in profile.slow:
+                self.slow_queries.append((route, _short_sql(sql), seconds, plan))
+            for sql, n in repeated:
+                self.repeated_queries.append((route, _short_sql(sql), n))
+
+    # --- Prometheus çıktısı ---
+
+    def render(self, gauges=()):
+        lines = []
+        with self._lock:
+            routes = sorted(self.routes.items())
+            slow_queries = list(self.slow_queries)
+            repeated_queries = list(self.repeated_queries)
+
+            lines += _histogram_lines('fittrack_request_duration_seconds',
+                                      'İstek süresi', routes, lambda s: s.latency)
+            lines += _histogram_lines('fittrack_request_sql_queries',
+                                      'İstek başına conn.execute sayısı', routes, lambda s: s.queries)
+            for name, help_text, kind, attr in (
+                ('fittrack_sql_statements_total', 'Çalışan SQL ifadeleri (tetikleyiciler dahil)', 'counter', 'statements'),
+                ('fittrack_sql_duration_seconds_total', 'SQL sorgularında geçen süre', 'counter', 'sql_seconds'),
+                ('fittrack_sql_vm_steps_total', 'Yaklaşık SQLite VM adımı', 'counter', 'vm_steps'),
+                ('fittrack_slow_queries_total', f'{SLOW_QUERY_MS} ms üstü sorgular', 'counter', 'slow'),
+                ('fittrack_repeated_queries_total', f'Bir istekte {REPEAT_THRESHOLD} kereden fazla çalışan sorgular (N+1)', 'counter', 'repeated'),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for (method, rule), stats in routes:
+                    lines.append(f'{name}{_labels(method=method, route=rule)} {_number(getattr(stats, attr))}')
+
+        lines.append('# HELP fittrack_slow_query_seconds Son yavaş sorgular ve sorgu planları')
+        lines.append('# TYPE fittrack_slow_query_seconds gauge')
+        for (method, rule), sql, seconds, plan in slow_queries:
+            lines.append(f'fittrack_slow_query_seconds{_labels(method=method, route=rule, sql=sql, plan=plan)} {_number(seconds)}')
+        lines.append('# HELP fittrack_repeated_query_count Son N+1 şüpheli sorgular (istek başına tekrar)')
+        lines.append('# TYPE fittrack_repeated_query_count gauge')
+        for (method, rule), sql, n in repeated_queries:
+            lines.append(f'fittrack_repeated_query_count{_labels(method=method, route=rule, sql=sql)} {n}')
+
+        for prefix, values in gauges:
+            for key, value in values.items():
+                if isinstance(value, (int, float)):
+                    lines.append(f'# TYPE {prefix}_{key} gauge')
+                    lines.append(f'{prefix}_{key} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+def _histogram_lines(name, help_text, routes, pick):
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for (method, rule), stats in routes:
+        histogram = pick(stats)
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{_labels(method=method, route=rule, le=bound)} {cumulative}')
+        lines.append(f'{name}_bucket{_labels(method=method, route=rule, le="+Inf")} {histogram.count}')
+        lines.append(f'{name}_sum{_labels(method=method, route=rule)} {_number(float(histogram.sum))}')
+        lines.append(f'{name}_count{_labels(method=method, route=rule)} {histogram.count}')
+    return lines
+
+
+profiler = Profiler()
+
+
+def init_profiling(app):
+    """Profil callback'lerini uygulamaya ve yeni açılan bağlantılara bağlar."""
+    if profiler.attach not in database.connection_hooks:
+        database.connection_hooks.append(profiler.attach)
+        database.query_listeners.append(profiler.on_query)
+    app.before_request(profiler.start)
+    app.teardown_request(profiler.finish)
+
+
+def metrics_response(gauges=()):
+    return Response(profiler.render(gauges), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,277 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request, session, make_response
+from werkzeug.local import LocalProxy
+
+# Rapor ve panel sayfaları için sunucu tarafı önbellek.
+#
+# Her kayıt bir veya daha fazla etiket taşır (payments, enrollments, ...).
+# Yazma işlemleri invalidate('payments') gibi çağrılarla etiketin sürümünü
+# artırır; kayıt, saklandığı andaki sürümler değişmişse bayat sayılır.
+#
+# CACHE_DB verilirse etiket sürümleri ve sayfalar ortak bir SQLite
+# dosyasında da tutulur; böylece birden çok worker aynı önbelleği görür ve
+# bir worker'daki yazma diğerlerinin kopyasını da geçersiz kılar.
+# Süresi dolan kayıtlar gece bakım işinde (jobs.maintenance) silinir.
+
+CACHE_SIZE = 256          # Bellekte tutulacak en fazla sayfa
+CACHE_TTL = 300           # Saniye
+CACHE_DB = os.environ.get('FITTRACK_CACHE_DB')   # Örn: 'cache.db' (worker'lar arası paylaşım için)
+
+
+class CacheEntry:
+    __slots__ = ('body', 'content_type', 'etag', 'expires', 'tags', 'versions')
+
+    def __init__(self, body, content_type, etag, expires, tags, versions):
+        self.body = body
+        self.content_type = content_type
+        self.etag = etag
+        self.expires = expires
+        self.tags = tags
+        self.versions = versions
+
+
+class MemoryTagStore:
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def versions(self, tags):
+        with self._lock:
+            return tuple(self._versions.get(tag, 0) for tag in tags)
+
+    def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+
+class SQLiteStore:
+    """Worker'lar arası paylaşılan etiket sürümleri ve sayfalar."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        # Dosya ilk kullanımda açılır; import sırasında diske dokunulmaz
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            conn.executescript('''
+            CREATE TABLE IF NOT EXISTS cache_tags (
+                tag TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                key TEXT PRIMARY KEY,
+                body BLOB,
+                content_type TEXT,
+                etag TEXT,
+                expires REAL,
+                tags TEXT,
+                versions TEXT
+            );
+            ''')
+            self._local.conn = conn
+        return conn
+
+    def versions(self, tags):
+        rows = dict(self._conn().execute(
+            f"SELECT tag, version FROM cache_tags WHERE tag IN ({','.join('?' * len(tags))})", tags
+        ).fetchall())
+        return tuple(rows.get(tag, 0) for tag in tags)
+
+    def bump(self, tags):
+        conn = self._conn()
+        conn.executemany('''
+            INSERT INTO cache_tags (tag, version) VALUES (?, 1)
+            ON CONFLICT(tag) DO UPDATE SET version = version + 1
+        ''', [(tag,) for tag in tags])
+
+    def get(self, key):
+        row = self._conn().execute(
+            'SELECT body, content_type, etag, expires, tags, versions FROM cache_entries WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        tags = tuple(row[4].split(',')) if row[4] else ()
+        versions = tuple(int(v) for v in row[5].split(',')) if row[5] else ()
+        return CacheEntry(row[0], row[1], row[2], row[3], tags, versions)
+
+    def set(self, key, entry):
+        self._conn().execute('''
+            INSERT OR REPLACE INTO cache_entries (key, body, content_type, etag, expires, tags, versions)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (key, entry.body, entry.content_type, entry.etag, entry.expires,
+              ','.join(entry.tags), ','.join(str(v) for v in entry.versions)))
+
+    def after_fork(self):
+        # Bağlantılar thread'e özel; ana süreçten kalanlar kullanılmasın
+        self._local = threading.local()
+
+    def purge_expired(self):
+        """Süresi dolmuş kayıtları siler (gece bakım işi); silinen sayıyı döndürür."""
+        return self._conn().execute('DELETE FROM cache_entries WHERE expires < ?', (time.time(),)).rowcount
+
+
+class ResponseCache:
+    def __init__(self, size=CACHE_SIZE, ttl=CACHE_TTL, disk_path=CACHE_DB):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.disk = SQLiteStore(disk_path) if disk_path else None
+        self.tags = self.disk or MemoryTagStore()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.not_modified = 0
+
+    def _fresh(self, entry):
+        return entry.expires > time.time() and self.tags.versions(entry.tags) == entry.versions
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self._remember(key, entry)
+
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        if not self._fresh(entry):
+            with self._lock:
+                self._entries.pop(key, None)
+                self.stale += 1
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def versions(self, tags):
+        return self.tags.versions(tuple(sorted(tags)))
+
+    def set(self, key, body, content_type, tags, versions, ttl=None):
+        """versions, sayfa üretilmeden önce alınmalı; arada yazma olursa kayıt bayat doğar."""
+        entry = CacheEntry(
+            body, content_type,
+            hashlib.sha1(body).hexdigest(),
+            time.time() + (ttl or self.ttl),
+            tuple(sorted(tags)), versions,
+        )
+        self._remember(key, entry)
+        if self.disk is not None:
+            self.disk.set(key, entry)
+        return entry
+
+    def invalidate(self, *tags):
+        self.tags.bump(tags)
+
+    def purge_expired(self):
+        """Süresi dolmuş kayıtları bellekten ve (varsa) diskten siler.
+
+        Anahtar sorgu parametrelerini de içerdiği için disk tablosu
+        temizlenmezse her farklı sorgu dizesiyle büyür.
+        """
+        now = time.time()
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry.expires <= now]:
+                del self._entries[key]
+        return self.disk.purge_expired() if self.disk is not None else 0
+
+    def count_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def after_fork(self):
+        self._lock = threading.Lock()
+        if self.disk is not None:
+            self.disk.after_fork()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'evictions': self.evictions,
+                'not_modified': self.not_modified,
+                'shared': self.disk is not None,
+            }
+
+
+# Etkin uygulamanın önbelleği (create_app, app.extensions['response_cache'])
+cache = LocalProxy(lambda: current_app.extensions['response_cache'])
+
+
+def invalidate(*tags):
+    cache.invalidate(*tags)
+
+
+def cache_key():
+    args = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+    role = session.get('role', 'anon')
+    # Eğitmenler sadece kendi verisini görür; anahtar kullanıcıya özel olmalı
+    user = session.get('user_id', '') if role == 'trainer' else ''
+    return f'{request.path}?{args}|{role}|{user}'
+
+
+def _respond(entry):
+    if entry.etag in request.if_none_match:
+        cache.count_not_modified()
+        response = make_response('', 304)
+    else:
+        response = make_response(entry.body)
+        response.content_type = entry.content_type
+    response.set_etag(entry.etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def cached(*tags, ttl=None):
+    """View fonksiyonunun çıktısını verilen etiketlerle önbelleğe alır."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = cache_key()
+            entry = cache.get(key)
+            if entry is None:
+                versions = cache.versions(tags)
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                entry = cache.set(key, response.get_data(), response.content_type, tags, versions, ttl)
+            return _respond(entry)
+        return wrapper
+    return decorator
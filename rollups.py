@@ -0,0 +1,156 @@
+from attribution import attribution_ctes
+from periods import period_label
+
+# Önceden hesaplanmış gelir toplamları. Rapor sayfaları ödeme geçmişini
+# taramak yerine buradan birkaç satır okur.
+#
+#   dimension  key               anlamı
+#   month      ''                ayın toplam geliri
+#   member     member_id         üyenin o ayki ödemeleri
+#   belt       belt_level        kuşak bazlı toplam
+#   class      class_id          sınıfa düşen gelir (attribution.py kuralıyla)
+#   trainer    trainer_id        eğitmenin sınıflarına düşen gelir ve payı
+#
+# Tarihi olmayan ödemeler period = 0 satırlarında tutulur; ay listesinde
+# görünmez ama tüm zamanların toplamlarına dahildir.
+
+UNDATED = 0
+
+ROLLUP_SELECT = '''
+    WITH {ctes}
+    SELECT period, 'month' AS dimension, '' AS key, NULL AS label,
+           SUM(amount) AS total, NULL AS trainer_income, COUNT(*) AS payment_count
+    FROM p GROUP BY period
+    UNION ALL
+    SELECT mp.period, 'member', CAST(members.id AS TEXT), members.name,
+           mp.amount, NULL, mp.payment_count
+    FROM member_payments mp JOIN members ON mp.member_id = members.id
+    UNION ALL
+    SELECT mp.period, 'belt', COALESCE(members.belt_level, ''), members.belt_level,
+           SUM(mp.amount), NULL, SUM(mp.payment_count)
+    FROM member_payments mp JOIN members ON mp.member_id = members.id
+    GROUP BY mp.period, members.belt_level
+    UNION ALL
+    SELECT a.period, 'class', CAST(classes.id AS TEXT), classes.name,
+           SUM(a.amount), NULL, SUM(a.payment_count)
+    FROM attributed a JOIN classes ON a.class_id = classes.id
+    GROUP BY a.period, classes.id
+    UNION ALL
+    SELECT a.period, 'trainer', CAST(trainers.id AS TEXT), trainers.name,
+           SUM(a.amount), SUM(a.amount * trainers.share_percent / 100.0), SUM(a.payment_count)
+    FROM attributed a JOIN trainers ON a.trainer_id = trainers.id
+    GROUP BY a.period, trainers.id
+'''
+
+
+def rollup_select(where):
+    return ROLLUP_SELECT.format(ctes=attribution_ctes(where))
+
+
+ROLLUP_COLUMNS = 'period, dimension, key, label, total, trainer_income, payment_count'
+
+
+def _period_filter(periods):
+    periods = sorted(set(UNDATED if p is None else p for p in periods))
+    dated = [p for p in periods if p != UNDATED]
+    parts = []
+    if dated:
+        parts.append(f"period IN ({','.join('?' * len(dated))})")
+    if UNDATED in periods:
+        parts.append('period IS NULL')
+    return ' OR '.join(parts), dated, periods
+
+
+def refresh_periods(conn, periods):
+    """Verilen ayların toplamlarını yeniden hesaplar (commit çağırana ait)."""
+    where, params, periods = _period_filter(periods)
+    if not periods:
+        return
+    conn.execute(f"DELETE FROM revenue_rollup WHERE period IN ({','.join('?' * len(periods))})", periods)
+    conn.execute(f'INSERT INTO revenue_rollup ({ROLLUP_COLUMNS}) {rollup_select(where)}', params)
+
+
+def member_periods(conn, member_id):
+    rows = conn.execute('SELECT DISTINCT period FROM payments WHERE member_id = ?', (member_id,)).fetchall()
+    return [row[0] for row in rows]
+
+
+def refresh_member(conn, member_id, periods=None):
+    """Üyenin ödeme yaptığı ayları tazeler (kayıt, kuşak veya üye değişince)."""
+    refresh_periods(conn, periods if periods is not None else member_periods(conn, member_id))
+
+
+def rebuild_rollups(conn):
+    """Tüm toplamları sıfırdan hesaplar (sınıf/eğitmen değişikliklerinde ve komut satırından)."""
+    conn.execute('DELETE FROM revenue_rollup')
+    conn.execute(f"INSERT INTO revenue_rollup ({ROLLUP_COLUMNS}) {rollup_select('1')}")
+
+
+def verify_rollups(conn):
+    """Saklanan toplamları taze hesapla karşılaştırır; farklı satırların listesini döndürür."""
+    rows = conn.execute(f'''
+        WITH fresh AS ({rollup_select('1')}),
+        fresh_rounded AS (
+            SELECT period, dimension, key, ROUND(total, 2) AS total,
+                   ROUND(trainer_income, 2) AS trainer_income, payment_count
+            FROM fresh
+        ),
+        stored_rounded AS (
+            SELECT period, dimension, key, ROUND(total, 2) AS total,
+                   ROUND(trainer_income, 2) AS trainer_income, payment_count
+            FROM revenue_rollup
+        ),
+        diff AS (
+            SELECT * FROM (SELECT * FROM fresh_rounded EXCEPT SELECT * FROM stored_rounded)
+            UNION ALL
+            SELECT * FROM (SELECT * FROM stored_rounded EXCEPT SELECT * FROM fresh_rounded)
+        )
+        SELECT DISTINCT period, dimension, key FROM diff
+    ''').fetchall()
+    return [tuple(row) for row in rows]
+
+
+# --- Rapor sayfaları için okuyucular ---
+
+def monthly_totals(conn):
+    rows = conn.execute('''
+        SELECT period, total FROM revenue_rollup
+        WHERE dimension = 'month' AND period != 0
+        ORDER BY period DESC
+    ''').fetchall()
+    return [{'month': period_label(row['period']), 'total': row['total']} for row in rows]
+
+
+def belt_totals(conn):
+    return conn.execute('''
+        SELECT label AS belt_level, SUM(total) AS total FROM revenue_rollup
+        WHERE dimension = 'belt'
+        GROUP BY key
+        ORDER BY total DESC
+    ''').fetchall()
+
+
+def top_totals(conn, dimension, limit=None, order_by='total'):
+    return conn.execute(f'''
+        SELECT key AS id, MAX(label) AS name, SUM(total) AS total,
+               SUM(trainer_income) AS income
+        FROM revenue_rollup
+        WHERE dimension = ?
+        GROUP BY key
+        ORDER BY {order_by} DESC
+        LIMIT ?
+    ''', (dimension, -1 if limit is None else limit)).fetchall()
+
+
+if __name__ == '__main__':
+    from database import get_db_connection
+
+    conn = get_db_connection()
+    with conn:
+        rebuild_rollups(conn)
+    mismatches = verify_rollups(conn)
+    conn.close()
+    if mismatches:
+        print(f"❌ {len(mismatches)} toplam tutmuyor: {mismatches[:10]}")
+    else:
+        print("✅ Rapor toplamları yeniden hesaplandı ve doğrulandı.")
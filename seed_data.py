@@ -0,0 +1,226 @@
+import random
+import sqlite3
+from datetime import date, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from database import create_schema
+from migrations import version_triggers_suspended
+from periods import MONTH_NAMES, period_key
+from rollups import rebuild_rollups
+from subscriptions import rebuild_member_status
+
+# Ölçek ve performans denemeleri için sentetik akademi verisi.
+#
+# Aynı seed ve aynı "bugün" ile her çalıştırmada birebir aynı veri üretilir.
+# Sınıf popülerliği ve eğitmen başına sınıf sayısı eşit dağılmaz (birkaç
+# sınıf/eğitmen kalabalık, çoğu küçük); üyelerin çoğu tek sınıfa, bir kısmı
+# 2-4 sınıfa kayıtlıdır. Her üye kayıt ayından itibaren aylık ödeme yapar;
+# bir kısmı hâlâ aktiftir (yakında bitecek abonelikler), kalanı bırakmıştır.
+
+DEFAULT_SIZES = {
+    'members': 2000,
+    'classes': 40,
+    'trainers': 15,
+    'payments': 40000,
+}
+MAX_HISTORY_MONTHS = 120     # Bir üyenin en fazla kaç aylık ödeme geçmişi olur
+ACTIVE_RATIO = 0.6           # Abonelikleri hâlâ süren üyelerin oranı
+INSERT_BATCH = 20000
+
+FIRST_NAMES = (
+    'Ahmet', 'Mehmet', 'Mustafa', 'Ali', 'Hüseyin', 'Hasan', 'İbrahim', 'İsmail', 'Yusuf', 'Ömer',
+    'Emre', 'Burak', 'Çağrı', 'Oğuz', 'Kerem', 'Eren', 'Yasin', 'Şükrü', 'Tolga', 'Umut',
+    'Ayşe', 'Fatma', 'Emine', 'Hatice', 'Zeynep', 'Elif', 'Şeyma', 'Merve', 'Büşra', 'Özge',
+    'Gülşen', 'İrem', 'Çiğdem', 'Derya', 'Ebru', 'Selin', 'Nazlı', 'Öykü', 'Ece', 'Ilgın',
+)
+LAST_NAMES = (
+    'Yılmaz', 'Kaya', 'Demir', 'Şahin', 'Çelik', 'Yıldız', 'Yıldırım', 'Öztürk', 'Aydın', 'Özdemir',
+    'Arslan', 'Doğan', 'Kılıç', 'Aslan', 'Çetin', 'Kara', 'Koç', 'Kurt', 'Özkan', 'Şimşek',
+    'Polat', 'Özcan', 'Korkmaz', 'Çakır', 'Erdoğan', 'Güneş', 'Akın', 'Aktaş', 'Bulut', 'Ünal',
+    'Güler', 'Tekin', 'Işık', 'Uçar', 'Çeken', 'Bozkurt', 'Karaca', 'Türkmen', 'Gök', 'Sarı',
+)
+BELT_LEVELS = ('Beyaz', 'Sarı', 'Turuncu', 'Yeşil', 'Mavi', 'Mor', 'Kahverengi', 'Siyah')
+BELT_WEIGHTS = (30, 20, 14, 11, 9, 7, 5, 4)
+WEIGHT_CATEGORIES = ('-30 kg', '-38 kg', '-46 kg', '-55 kg', '-60 kg', '-66 kg', '-73 kg', '-81 kg', '-90 kg', '+90 kg')
+CLASS_LEVELS = ('Minikler', 'Yeni Başlayan', 'Orta Seviye', 'İleri Seviye', 'Yetişkin', 'Müsabaka')
+CLASS_DAYS = ('Pazartesi ve Çarşamba', 'Salı ve Perşembe', 'Cuma', 'Cumartesi ve Pazar', 'Hafta içi her gün')
+CLASS_TIMES = ('10:00', '14:00', '16:00', '17:30', '19:00', '20:30')
+
+ENROLLMENT_FANOUT = ((1, 55), (2, 30), (3, 10), (4, 5))    # (sınıf sayısı, ağırlık)
+MONTHLY_FEES = (1000, 1200, 1500, 1800)                     # Sınıf sayısına göre aylık ücret
+FEE_INCREASE_PER_YEAR = 0.35
+
+
+def _add_months(day, months):
+    month_index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(month_index, 12)
+    return date(year, month + 1, min(day.day, 28))
+
+
+def _phone(rng):
+    return f'05{rng.randint(30, 59)}{rng.randint(0, 9999999):07d}'
+
+
+def _email(rng, name, n):
+    user = name.lower().translate(str.maketrans('çğıöşüİ ', 'cgiosui.'))
+    return f'{user}{n}@{rng.choice(("gmail.com", "hotmail.com", "outlook.com", "yandex.com"))}'
+
+
+def _popularity(rng, count):
+    # Zipf benzeri: birkaç kalem çok popüler, uzun bir kuyruk
+    weights = [1 / (rank + 1) ** 0.8 for rank in range(count)]
+    rng.shuffle(weights)
+    return weights
+
+
+def _history_lengths(rng, members, payments):
+    if payments > members * MAX_HISTORY_MONTHS:
+        raise ValueError(f'{members} üye için en fazla {members * MAX_HISTORY_MONTHS} ödeme üretilebilir')
+    average = payments / members
+    lengths = [min(MAX_HISTORY_MONTHS, max(1, round(rng.expovariate(1 / average)))) for _ in range(members)]
+    # Toplam tam olarak istenen ödeme sayısı olsun
+    difference = payments - sum(lengths)
+    while difference:
+        i = rng.randrange(members)
+        if difference > 0 and lengths[i] < MAX_HISTORY_MONTHS:
+            lengths[i] += 1
+            difference -= 1
+        elif difference < 0 and lengths[i] > 1:
+            lengths[i] -= 1
+            difference += 1
+    return lengths
+
+
+def generate(conn, members=DEFAULT_SIZES['members'], classes=DEFAULT_SIZES['classes'],
+             trainers=DEFAULT_SIZES['trainers'], payments=DEFAULT_SIZES['payments'],
+             seed=42, today=None):
+    """Boş (şeması kurulmuş) bir veritabanını sentetik veriyle doldurur; commit çağırana aittir."""
+    rng = random.Random(seed)
+    today = today or date.today()
+
+    trainer_rows = []
+    for i in range(1, trainers + 1):
+        name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+        trainer_rows.append((i, name, _email(rng, name, i), _phone(rng), float(rng.randrange(30, 61, 5))))
+    conn.executemany('INSERT INTO trainers (id, name, email, phone, share_percent) VALUES (?, ?, ?, ?, ?)',
+                     trainer_rows)
+
+    trainer_weights = _popularity(rng, trainers)
+    class_rows, class_trainer = [], {}
+    for i in range(1, classes + 1):
+        trainer_id = rng.choices(range(1, trainers + 1), trainer_weights)[0]
+        class_trainer[i] = trainer_id
+        level = rng.choice(CLASS_LEVELS)
+        class_rows.append((i, f'{trainer_rows[trainer_id - 1][1].split()[0]} {i}. Grup', level,
+                           rng.choice(CLASS_DAYS), rng.choice(CLASS_TIMES), trainer_id))
+    conn.executemany('INSERT INTO classes (id, name, description, day, time, trainer_id) VALUES (?, ?, ?, ?, ?, ?)',
+                     class_rows)
+
+    class_ids = list(range(1, classes + 1))
+    class_weights = _popularity(rng, classes)
+    fanouts, fanout_weights = zip(*ENROLLMENT_FANOUT)
+    lengths = _history_lengths(rng, members, payments)
+
+    member_rows, enrollment_rows, payment_rows = [], [], []
+    for member_id in range(1, members + 1):
+        months = lengths[member_id - 1]
+        if rng.random() < ACTIVE_RATIO:
+            # Son ödemesi bu ay içinde; aboneliği önümüzdeki 30 günde bitiyor
+            last_start = today - timedelta(days=rng.randint(0, 29))
+        else:
+            last_start = _add_months(today, -rng.randint(2, 24))
+        first_start = _add_months(last_start, -(months - 1))
+
+        name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+        birth = _add_months(first_start, -rng.randint(6 * 12, 40 * 12))
+        minor = (today - birth).days < 18 * 365
+        parent = f'{rng.choice(FIRST_NAMES)} {name.split()[-1]}' if minor else None
+        picked = set(rng.choices(class_ids, class_weights, k=rng.choices(fanouts, fanout_weights)[0]))
+        first_class = min(picked)
+        member_rows.append((
+            member_id, name, _email(rng, name, member_id), _phone(rng), birth.isoformat(),
+            float(rng.randint(110, 195)), float(rng.randint(20, 110)),
+            rng.choices(BELT_LEVELS, BELT_WEIGHTS)[0], rng.choice(WEIGHT_CATEGORIES),
+            parent, _phone(rng) if minor else None, _email(rng, parent, member_id) if minor else None,
+            first_start.isoformat(), class_trainer[first_class],
+        ))
+        enrollment_rows.extend((member_id, class_id) for class_id in sorted(picked))
+
+        fee = MONTHLY_FEES[min(len(picked), len(MONTHLY_FEES)) - 1]
+        discount = rng.choice((1, 1, 1, 1, 0.9, 0.85))
+        for n in range(months):
+            start = _add_months(first_start, n)
+            years = (start - first_start).days / 365
+            amount = round(fee * discount * (1 + FEE_INCREASE_PER_YEAR) ** years, 2)
+            payment_rows.append((member_id, amount, start.isoformat(), start.isoformat(),
+                                 _add_months(start, 1).isoformat(), MONTH_NAMES[start.month - 1],
+                                 period_key(start.isoformat())))
+
+        if len(payment_rows) >= INSERT_BATCH:
+            _insert_payments(conn, payment_rows)
+            payment_rows = []
+
+    _insert_payments(conn, payment_rows)
+    conn.executemany('''
+        INSERT INTO members (id, name, email, phone, birth_date, height, weight, belt_level,
+                             weight_category, parent_name, parent_phone, parent_email,
+                             registration_date, trainer_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', member_rows)
+    conn.executemany('INSERT INTO enrollments (member_id, class_id) VALUES (?, ?)', enrollment_rows)
+
+    password = generate_password_hash('1234')
+    conn.executemany('INSERT OR IGNORE INTO users (username, password, role) VALUES (?, ?, ?)',
+                     [('admin1', password, 'admin'), ('trainer1', password, 'trainer')])
+
+    rebuild_rollups(conn)
+    rebuild_member_status(conn, today)
+    return {'members': members, 'classes': classes, 'trainers': trainers,
+            'payments': payments, 'enrollments': len(enrollment_rows)}
+
+
+def _insert_payments(conn, rows):
+    conn.executemany('''
+        INSERT INTO payments (member_id, amount, payment_date, start_date, end_date, note, period)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+
+
+def build_database(path, seed=42, today=None, **sizes):
+    """path'te sıfırdan bir veritabanı kurar ve doldurur."""
+    conn = sqlite3.connect(path)
+    if conn.execute('SELECT count(*) FROM sqlite_master').fetchone()[0]:
+        conn.close()
+        raise ValueError(f'{path} boş değil; sentetik veri sadece yeni bir dosyaya yazılır')
+
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = OFF')
+    create_schema(conn)
+    # Milyonlarca satırda satır başı sayaç tetikleyicisi yüklemeyi belirgin yavaşlatır
+    with version_triggers_suspended(conn):
+        counts = generate(conn, seed=seed, today=today, **{**DEFAULT_SIZES, **sizes})
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+    return counts
+
+
+if __name__ == '__main__':
+    # Örnek: python seed_data.py bench.db --members 50000 --classes 500 --trainers 200 --payments 2000000
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Sentetik akademi verisi üretir.')
+    parser.add_argument('path')
+    for key, value in DEFAULT_SIZES.items():
+        parser.add_argument(f'--{key}', type=int, default=value)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--today', type=date.fromisoformat, default=None, help='YYYY-MM-DD (varsayılan: bugün)')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = build_database(args.path, seed=args.seed, today=args.today,
+                            **{key: getattr(args, key) for key in DEFAULT_SIZES})
+    print(', '.join(f'{key}: {value}' for key, value in counts.items()),
+          f'({time.perf_counter() - started:.1f} sn)')
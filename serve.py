@@ -0,0 +1,134 @@
+import argparse
+import os
+import sqlite3
+
+# Üretim sunucusu: python serve.py
+#
+# app.run(debug=True) tek süreç, tek thread ve reloader açık çalışır; sadece
+# geliştirme içindir. Burada uygulama gunicorn altında çok süreçli (her
+# süreçte birkaç thread) çalışır. Uygulama ana süreçte bir kez yüklenir
+# (şema kontrolü, şablonların derlenmesi), worker'lar fork ile
+# bunu devralır. SIGTERM'de worker'lar ellerindeki istekleri bitirip kapanır.
+#
+# gunicorn yoksa (ör. Windows) waitress ile tek süreç, çok thread çalışır.
+
+DEFAULT_BIND = '127.0.0.1:5001'
+THREADS_PER_WORKER = 4
+GRACEFUL_TIMEOUT = 30        # SIGTERM sonrası isteklerin bitmesi için süre (saniye)
+REQUEST_TIMEOUT = 60
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def load_app():
+    from app import create_app
+    from database import init_db
+
+    # Şema kontrolü bir kez, ana süreçte; bağlantılar fork'tan sonra her
+    # worker'da açılır (post_fork)
+    init_db()
+    app = create_app()
+    warm_templates(app)
+    return app
+
+
+def warm_templates(app):
+    # Jinja şablonları ilk kullanımda derler; ana süreçte derlenirse her
+    # worker aynı derlenmiş halleri devralır
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+
+def post_fork(app, threads):
+    # Ana süreçteki bağlantı ve thread'ler çocuğa geçmez; her biri sıfırdan
+    for name in ('db_pool', 'response_cache', 'write_queue', 'scheduler'):
+        app.extensions[name].after_fork()
+    # Her thread'e bir bağlantı baştan açılır; ilk istekler PRAGMA/mmap beklemez
+    app.extensions['db_pool'].warm(threads)
+
+
+def worker_exit(app):
+    app.extensions['scheduler'].stop()     # Çalışan iş yazısını kuyruğa bırakmış olabilir; önce o
+    app.extensions['write_queue'].close()  # Sıradaki yazılar commit edilmeden kapanma
+    app.extensions['db_pool'].close_all()
+
+
+def on_exit(app):
+    # Tüm worker'lar kapandı; WAL dosyasını ana veritabanına yaz
+    conn = sqlite3.connect(app.config['DATABASE'])
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    conn.close()
+
+
+def run_gunicorn(app, bind, workers, threads, timeout):
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            options = {
+                'bind': bind,
+                'workers': workers,
+                'worker_class': 'gthread',
+                'threads': threads,
+                'preload_app': True,
+                'timeout': timeout,
+                'graceful_timeout': GRACEFUL_TIMEOUT,
+                'post_fork': lambda server, worker: post_fork(app, threads),
+                'worker_exit': lambda server, worker: worker_exit(app),
+                'on_exit': lambda server: on_exit(app),
+                'accesslog': '-',
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    Server().run()
+
+
+def run_waitress(app, bind, threads):
+    from waitress import serve
+    app.extensions['db_pool'].warm(threads)
+    try:
+        serve(app, listen=bind, threads=threads)
+    finally:
+        worker_exit(app)
+        on_exit(app)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='fittrack-lite üretim sunucusu')
+    parser.add_argument('--bind', default=os.environ.get('FITTRACK_BIND', DEFAULT_BIND))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('FITTRACK_WORKERS', 0)) or default_workers())
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('FITTRACK_THREADS', THREADS_PER_WORKER)))
+    parser.add_argument('--timeout', type=int, default=REQUEST_TIMEOUT)
+    parser.add_argument('--server', choices=('gunicorn', 'waitress'), default=None)
+    args = parser.parse_args(argv)
+
+    server = args.server
+    if server is None:
+        try:
+            import gunicorn  # noqa: F401
+            server = 'gunicorn'
+        except ImportError:
+            server = 'waitress'
+
+    if server == 'gunicorn' and args.workers > 1:
+        # Yanıt önbelleği worker'lar arasında ortak olmalı; yoksa bir worker'daki
+        # yazma diğerlerinin önbelleğini geçersiz kılamaz
+        os.environ.setdefault('FITTRACK_CACHE_DB', 'cache.db')
+
+    app = load_app()
+    if server == 'gunicorn':
+        run_gunicorn(app, args.bind, args.workers, args.threads, args.timeout)
+    else:
+        threads = args.workers * args.threads
+        print(f'waitress ile tek süreç, {threads} thread çalışılıyor (çok süreç için gunicorn kurun).')
+        run_waitress(app, args.bind, threads)
+
+
+if __name__ == '__main__':
+    main()
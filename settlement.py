@@ -0,0 +1,252 @@
+from datetime import datetime
+
+from attribution import attribution_ctes
+from periods import current_period, period_key, period_label
+
+# Eğitmen / salon hakediş hesabı. Tutarlar kuruş (tam sayı), paylar baz
+# puan (%45.5 → 4550) olarak hesaplanır; böylece yuvarlama satır satır
+# birikmez. Salon payı her zaman "toplam - eğitmen payları" olduğu için
+# toplamlar kuruşu kuruşuna tutar.
+#
+# Eğitmen payı eğitmen × sınıf satırı başına hesaplanır ve eğitmenin
+# toplamı bu satırların toplamıdır. Ay kapatılınca (close_period) satırlar
+# o günkü isim ve pay oranıyla settlement_lines tablosuna bir kez yazılır;
+# kapatılmış ay bundan sonra hep oradan okunur, geç gelen düzeltmeler ya
+# da değişen share_percent o ayın hakedişini değiştirmez.
+
+SETTLEMENT_SQL = '''
+    WITH {ctes},
+    class_revenue AS (
+        SELECT a.period, trainers.id AS trainer_id, trainers.name AS trainer_name,
+               classes.id AS class_id, classes.name AS class_name,
+               CAST(ROUND(COALESCE(trainers.share_percent, 0) * 100) AS INTEGER) AS share_bp,
+               SUM(CAST(ROUND(a.amount * 100) AS INTEGER)) AS revenue_kurus
+        FROM attributed a
+        JOIN trainers ON a.trainer_id = trainers.id
+        JOIN classes ON a.class_id = classes.id
+        {trainer_filter}
+        GROUP BY a.period, trainers.id, classes.id
+    )
+    SELECT period, trainer_id, trainer_name, class_id, class_name, share_bp, revenue_kurus,
+           (revenue_kurus * share_bp + 5000) / 10000 AS trainer_kurus
+    FROM class_revenue
+'''
+
+LINE_COLUMNS = ('period', 'trainer_id', 'trainer_name', 'class_id', 'class_name',
+                'share_bp', 'revenue_kurus', 'trainer_kurus')
+
+
+def to_tl(kurus):
+    return round(kurus / 100, 2)
+
+
+def _period_params(periods):
+    periods = sorted(set(periods))
+    return f"period IN ({','.join('?' * len(periods))})", periods
+
+
+def _income_by_period(conn, periods):
+    where, params = _period_params(periods)
+    rows = conn.execute(f'''
+        SELECT period, SUM(CAST(ROUND(amount * 100) AS INTEGER)) AS total_kurus
+        FROM payments WHERE {where}
+        GROUP BY period
+    ''', params).fetchall()
+    return {row['period']: row['total_kurus'] or 0 for row in rows}
+
+
+def _trainers(lines):
+    """Eğitmen × sınıf satırlarını eğitmen bazında toplar."""
+    trainers = {}
+    for line in lines:
+        trainer = trainers.get(line['trainer_id'])
+        if trainer is None:
+            trainer = trainers[line['trainer_id']] = {
+                'trainer_id': line['trainer_id'],
+                'name': line['trainer_name'],
+                'share_bp': line['share_bp'],
+                'revenue_kurus': 0,
+                'trainer_kurus': 0,
+                'classes': [],
+            }
+        trainer['revenue_kurus'] += line['revenue_kurus']
+        trainer['trainer_kurus'] += line['trainer_kurus']
+        trainer['classes'].append({
+            'class_id': line['class_id'],
+            'name': line['class_name'],
+            'revenue_kurus': line['revenue_kurus'],
+            'trainer_kurus': line['trainer_kurus'],
+        })
+    return sorted(trainers.values(), key=lambda t: (-t['trainer_kurus'], t['trainer_id']))
+
+
+def _result(periods, income, lines):
+    by_period = {period: [] for period in set(periods)}
+    for line in lines:
+        by_period[line['period']].append(line)
+    result = {}
+    for period, period_lines in by_period.items():
+        trainers = _trainers(period_lines)
+        total = income.get(period, 0)
+        result[period] = {
+            'total_kurus': total,
+            'salon_kurus': total - sum(t['trainer_kurus'] for t in trainers),
+            'closed_at': None,
+            'trainers': trainers,
+        }
+    return result
+
+
+def _live_lines(conn, periods, trainer_id=None):
+    where, params = _period_params(periods)
+    trainer_filter = ''
+    if trainer_id is not None:
+        trainer_filter = 'WHERE trainers.id = ?'
+        params = params + [trainer_id]
+    sql = SETTLEMENT_SQL.format(ctes=attribution_ctes(where), trainer_filter=trainer_filter)
+    return [dict(row) for row in conn.execute(sql, params)]
+
+
+def closed_periods(conn, periods=None):
+    """{period: settlement_periods satırı}; periods verilmezse kapatılmış tüm aylar."""
+    if periods is None:
+        rows = conn.execute('SELECT * FROM settlement_periods ORDER BY period DESC')
+    else:
+        if not periods:
+            return {}
+        where, params = _period_params(periods)
+        rows = conn.execute(f'SELECT * FROM settlement_periods WHERE {where}', params)
+    return {row['period']: row for row in rows}
+
+
+def _snapshot(conn, closed, trainer_id=None):
+    where, params = _period_params(closed)
+    if trainer_id is not None:
+        where += ' AND trainer_id = ?'
+        params = params + [trainer_id]
+    lines = [dict(row) for row in conn.execute(
+        f"SELECT {', '.join(LINE_COLUMNS)} FROM settlement_lines WHERE {where}", params)]
+    result = _result(closed, {period: row['total_kurus'] for period, row in closed.items()}, lines)
+    for period, row in closed.items():
+        result[period]['closed_at'] = row['closed_at']
+        if trainer_id is None:
+            result[period]['salon_kurus'] = row['salon_kurus']
+    return result
+
+
+def _sorted(result):
+    return {period: result[period] for period in sorted(result)}
+
+
+def settle(conn, periods):
+    """Her ay için toplam gelir, eğitmen payları ve salon payı (kuruş).
+
+    Kapatılmış aylar settlement_lines'tan okunur, açık aylar hesaplanır.
+
+    Dönüş: {202409: {'total_kurus': ..., 'salon_kurus': ..., 'closed_at': ...,
+                     'trainers': [{'trainer_id', 'name', 'share_bp',
+                                   'revenue_kurus', 'trainer_kurus',
+                                   'classes': [...]}, ...]}}
+    """
+    if not periods:
+        return {}
+    closed = closed_periods(conn, periods)
+    result = _snapshot(conn, closed) if closed else {}
+    open_periods = [p for p in set(periods) if p not in closed]
+    if open_periods:
+        result.update(_result(open_periods, _income_by_period(conn, open_periods),
+                              _live_lines(conn, open_periods)))
+    return _sorted(result)
+
+
+def trainer_settlement(conn, period, trainer_id):
+    """Tek eğitmenin o ayki hakedişi (eğitmen settle() satırı) veya None."""
+    closed = closed_periods(conn, [period])
+    if closed:
+        summary = _snapshot(conn, closed, trainer_id)[period]
+    else:
+        summary = _result([period], {}, _live_lines(conn, [period], trainer_id))[period]
+    return summary['trainers'][0] if summary['trainers'] else None
+
+
+def trainer_payouts(conn, trainer_id, limit=12):
+    """Eğitmenin kapatılmış aylardaki hakedişleri, en yenisi önce."""
+    return conn.execute('''
+        SELECT period, MAX(share_bp) AS share_bp,
+               SUM(revenue_kurus) AS revenue_kurus, SUM(trainer_kurus) AS trainer_kurus
+        FROM settlement_lines
+        WHERE trainer_id = ?
+        GROUP BY period
+        ORDER BY period DESC
+        LIMIT ?
+    ''', (trainer_id, limit)).fetchall()
+
+
+def trainer_income_totals(conn, limit=None):
+    """Tüm zamanların eğitmen kazançları (TL): kapatılmış aylar görüntüden,
+    açık aylar revenue_rollup'tan."""
+    return conn.execute('''
+        SELECT trainer_id AS id, MAX(name) AS name, SUM(total) AS total, SUM(income) AS income
+        FROM (
+            SELECT trainer_id, trainer_name AS name,
+                   revenue_kurus / 100.0 AS total, trainer_kurus / 100.0 AS income
+            FROM settlement_lines
+            UNION ALL
+            SELECT CAST(key AS INTEGER), label, total, trainer_income
+            FROM revenue_rollup
+            WHERE dimension = 'trainer'
+            AND period NOT IN (SELECT period FROM settlement_periods)
+        )
+        GROUP BY trainer_id
+        ORDER BY income DESC
+        LIMIT ?
+    ''', (-1 if limit is None else limit,)).fetchall()
+
+
+def close_period(conn, period, closed_at=None):
+    """Ayın hakedişini o anki pay oranlarıyla settlement tablolarına yazar.
+
+    Sadece geçmiş aylar kapatılabilir; aynı ay ikinci kez kapatılamaz.
+    Commit çağırana aittir.
+    """
+    if period >= current_period():
+        raise ValueError(f'{period_label(period)} henüz bitmedi, kapatılamaz')
+    if closed_periods(conn, [period]):
+        raise ValueError(f'{period_label(period)} zaten kapatılmış')
+
+    total = _income_by_period(conn, [period]).get(period, 0)
+    lines = _live_lines(conn, [period])
+    paid = sum(line['trainer_kurus'] for line in lines)
+    conn.execute('INSERT INTO settlement_periods (period, closed_at, total_kurus, salon_kurus) VALUES (?, ?, ?, ?)',
+                 (period, closed_at or datetime.now().isoformat(timespec='seconds'), total, total - paid))
+    conn.executemany(f"INSERT INTO settlement_lines ({', '.join(LINE_COLUMNS)}) VALUES ({', '.join('?' * len(LINE_COLUMNS))})",
+                     [tuple(line[column] for column in LINE_COLUMNS) for line in lines])
+    return settle(conn, [period])[period]
+
+
+if __name__ == '__main__':
+    # Örnek: python settlement.py 2024-01 2024-12
+    #        python settlement.py --close 2024-01 2024-12   (açık geçmiş ayları kapatır)
+    import sys
+    from database import get_db_connection
+
+    args = sys.argv[1:]
+    close = '--close' in args
+    if close:
+        args.remove('--close')
+    start, end = period_key(args[0]), period_key(args[1] if len(args) > 1 else args[0])
+    periods = [p for p in range(start, end + 1) if 1 <= p % 100 <= 12]
+
+    conn = get_db_connection()
+    if close:
+        with conn:
+            already = closed_periods(conn, periods)
+            for period in periods:
+                if period not in already and period < current_period():
+                    close_period(conn, period)
+    for period, summary in settle(conn, periods).items():
+        state = f"kapatıldı {summary['closed_at']}" if summary['closed_at'] else 'açık'
+        print(f"{period_label(period)}  toplam {to_tl(summary['total_kurus'])} ₺  salon {to_tl(summary['salon_kurus'])} ₺  ({state})")
+        for t in summary['trainers']:
+            print(f"    {t['name']}: {to_tl(t['trainer_kurus'])} ₺ (%{t['share_bp'] / 100})")
+    conn.close()
@@ -0,0 +1,34 @@
+// <input data-lookup="members" data-target="member_id"> alanlarını
+// /api/lookup/<tablo>?q=... ile doldurur ve seçilen kaydın id'sini
+// gizli alana yazar. Bütün listeyi sayfaya gömmek yerine yazdıkça sorar.
+document.querySelectorAll('input[data-lookup]').forEach(function (input) {
+    var list = document.createElement('datalist');
+    list.id = input.name + '-options';
+    input.setAttribute('list', list.id);
+    input.setAttribute('autocomplete', 'off');
+    input.after(list);
+
+    var hidden = input.form.querySelector('input[name="' + input.dataset.target + '"]');
+    var timer = null;
+
+    input.addEventListener('input', function () {
+        var match = input.value.match(/#(\d+)$/);
+        hidden.value = match ? match[1] : '';
+        if (match) {
+            return;
+        }
+        clearTimeout(timer);
+        timer = setTimeout(function () {
+            fetch('/api/lookup/' + input.dataset.lookup + '?q=' + encodeURIComponent(input.value))
+                .then(function (response) { return response.json(); })
+                .then(function (items) {
+                    list.innerHTML = '';
+                    items.forEach(function (item) {
+                        var option = document.createElement('option');
+                        option.value = item.name + ' #' + item.id;
+                        list.appendChild(option);
+                    });
+                });
+        }, 150);
+    });
+});
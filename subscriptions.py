@@ -0,0 +1,164 @@
+from datetime import date, datetime, timedelta
+
+from periods import current_period
+
+# /expiring sayfasında seçilebilen süreler (gün)
+EXPIRING_HORIZONS = (7, 14, 30)
+EXPIRING_PAGE_SIZE = 50
+RENEWAL_REMINDER_DAYS = 7    # Gece işi bu kadar gün kala hatırlatma açar
+
+# Üyenin abonelik durumu member_status tablosunda tutulur; sayfalar ödeme
+# geçmişini taramak yerine üye başına tek satır okur.
+#
+#   end_date            en son bitiş tarihi (end_date indeksiyle aranır)
+#   last_payment_date   son ödeme tarihi
+#   last_period         son ödemenin ayı (yyyymm)
+#   current_month_paid  as_of ayında ödeme var mı (0/1)
+#   days_left           as_of gününden bitişe kalan gün
+#
+# Ödeme yazan her iş ilgili üyeleri refresh_member_status() ile tazeler.
+# current_month_paid ve days_left güne bağlı olduğu için günde bir kez
+# refresh_status_dates() ile bütün tablo güncellenir. Hiç ödemesi olmayan
+# ve silinmiş (ödemeleri kalmış olsa da) üyenin satırı yoktur.
+
+STATUS_CHUNK = 500           # Tek IN (...) listesinde en fazla üye
+
+STATUS_COLUMNS = 'member_id, end_date, last_payment_date, last_period, current_month_paid, days_left, as_of'
+
+STATUS_SELECT = '''
+    SELECT member_id,
+           MAX(NULLIF(end_date, '')) AS end_date,
+           MAX(COALESCE(NULLIF(payment_date, ''), NULLIF(date, ''))) AS last_payment_date,
+           MAX(period) AS last_period,
+           COALESCE(MAX(period = :period), 0) AS current_month_paid,
+           CAST(julianday(MAX(NULLIF(end_date, ''))) - julianday(:today) AS INTEGER) AS days_left,
+           :today AS as_of
+    FROM payments
+    WHERE {where} AND member_id IN (SELECT id FROM members)
+    GROUP BY member_id
+'''
+
+
+def _status_params(today):
+    today = today or date.today()
+    return {'today': today.isoformat(), 'period': current_period(today)}
+
+
+def rebuild_member_status(conn, today=None):
+    """Tabloyu sıfırdan doldurur (migration, seed ve komut satırı)."""
+    conn.execute('DELETE FROM member_status')
+    conn.execute(f"INSERT INTO member_status ({STATUS_COLUMNS}) {STATUS_SELECT.format(where='1')}",
+                 _status_params(today))
+
+
+def refresh_member_status(conn, member_ids, today=None):
+    """Verilen üyelerin satırlarını ödemelerinden yeniden hesaplar (commit çağırana ait)."""
+    member_ids = sorted({int(member_id) for member_id in member_ids})
+    params = _status_params(today)
+    for i in range(0, len(member_ids), STATUS_CHUNK):
+        chunk = member_ids[i:i + STATUS_CHUNK]
+        names = {f'm{n}': member_id for n, member_id in enumerate(chunk)}
+        where = f"member_id IN ({', '.join(':' + name for name in names)})"
+        conn.execute(f'DELETE FROM member_status WHERE {where}', names)
+        conn.execute(f'INSERT INTO member_status ({STATUS_COLUMNS}) {STATUS_SELECT.format(where=where)}',
+                     {**params, **names})
+
+
+def refresh_status_dates(conn, today=None):
+    """Günlük tazeleme: kalan gün ve bu ay ödendi bilgisi bugüne göre."""
+    params = _status_params(today)
+    conn.execute('''
+        UPDATE member_status SET
+            days_left = CAST(julianday(end_date) - julianday(:today) AS INTEGER),
+            current_month_paid = EXISTS (
+                SELECT 1 FROM payments
+                WHERE payments.period = :period AND payments.member_id = member_status.member_id
+            ),
+            as_of = :today
+        WHERE as_of != :today
+    ''', params)
+
+
+def status_is_stale(conn, today=None):
+    """Günlük tazeleme bugün çalışmadıysa True."""
+    today = (today or date.today()).isoformat()
+    return conn.execute('SELECT 1 FROM member_status WHERE as_of != ? LIMIT 1', (today,)).fetchone() is not None
+
+
+def _window(days, today=None):
+    today = today or date.today()
+    return today.isoformat(), (today + timedelta(days=days)).isoformat()
+
+
+def count_expiring(conn, days=7, today=None):
+    start, end = _window(days, today)
+    # expiring_subscriptions ile aynı küme: üyesi olmayan satır sayılmaz
+    return conn.execute('''
+        SELECT COUNT(*) FROM member_status status
+        JOIN members ON members.id = status.member_id
+        WHERE status.end_date BETWEEN ? AND ?
+    ''', (start, end)).fetchone()[0]
+
+
+def expiring_subscriptions(conn, days=7, limit=EXPIRING_PAGE_SIZE, offset=0, today=None):
+    """Aboneliği önümüzdeki `days` gün içinde biten üyeler (end_date indeksinde aralık)."""
+    start, end = _window(days, today)
+    return conn.execute('''
+        SELECT members.id, members.name, members.belt_level AS belt, status.end_date, status.days_left
+        FROM member_status status
+        JOIN members ON members.id = status.member_id
+        WHERE status.end_date BETWEEN ? AND ?
+        ORDER BY status.end_date, members.name
+        LIMIT ? OFFSET ?
+    ''', (start, end, limit, offset)).fetchall()
+
+
+def queue_renewal_reminders(conn, days=RENEWAL_REMINDER_DAYS, today=None):
+    """Aboneliği `days` gün içinde bitecek üyeler için hatırlatma kaydı açar.
+
+    /expiring ile aynı aralık; aynı bitiş tarihi için üyeye ikinci kez
+    hatırlatma açılmaz. Yeni açılan kayıt sayısını döndürür.
+    """
+    start, end = _window(days, today)
+    return conn.execute('''
+        INSERT OR IGNORE INTO renewal_reminders (member_id, end_date, days_left, created_at)
+        SELECT member_id, end_date, days_left, ? FROM member_status
+        WHERE end_date BETWEEN ? AND ? AND member_id IN (SELECT id FROM members)
+    ''', (datetime.now().isoformat(timespec='seconds'), start, end)).rowcount
+
+
+def member_status(conn, member_id):
+    """Üyenin member_status satırı; hiç ödemesi yoksa None."""
+    return conn.execute('SELECT * FROM member_status WHERE member_id = ?', (member_id,)).fetchone()
+
+
+def subscription_end(conn, member_id):
+    """Bir üyenin son bitiş tarihi ve kalan gün sayısı; ödeme yoksa (None, None)."""
+    status = member_status(conn, member_id)
+    if status is None:
+        return None, None
+    return status['end_date'], status['days_left']
+
+
+def renewal_suggestion(conn, member_id, days=7):
+    end_date, days_left = subscription_end(conn, member_id)
+    if days_left is not None and days_left <= days:
+        return f"Bu öğrencinin aboneliği {days_left} gün içinde bitiyor. Yenileme önerin!"
+    return None
+
+
+if __name__ == '__main__':
+    # Günlük tazeleme (cron): python subscriptions.py
+    # Baştan hesaplama:       python subscriptions.py --rebuild
+    import sys
+    from database import get_db_connection
+
+    conn = get_db_connection()
+    with conn:
+        if '--rebuild' in sys.argv:
+            rebuild_member_status(conn)
+        else:
+            refresh_status_dates(conn)
+    count = conn.execute('SELECT COUNT(*) FROM member_status').fetchone()[0]
+    conn.close()
+    print(f"✅ {count} üyenin abonelik durumu güncel.")
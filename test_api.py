@@ -0,0 +1,90 @@
+import gzip
+import json
+
+import pytest
+
+
+@pytest.fixture
+def data(db):
+    # Ali ve Can eğitmen 2'nin, Deniz eğitmen 3'ün üyesi
+    db.executescript("""
+        INSERT INTO trainers (id, name, share_percent) VALUES (2, 'Ayşe', 40), (3, 'Mehmet', 50);
+        INSERT INTO classes (id, name, trainer_id) VALUES (10, 'Minikler', 2), (20, 'Yetişkin', 3);
+        INSERT INTO members (id, name, trainer_id) VALUES (1, 'Ali', 2), (2, 'Can', 2), (3, 'Deniz', 3);
+        INSERT INTO enrollments (member_id, class_id) VALUES (1, 10), (2, 10), (3, 20);
+        INSERT INTO payments (id, member_id, amount, payment_date, period) VALUES
+            (1, 1, 1000, '2024-09-01', 202409), (2, 2, 800, '2024-09-03', 202409),
+            (3, 3, 500, '2024-09-02', 202409);
+    """)
+    db.commit()
+
+
+def _ids(response):
+    return [row['id'] for row in response.get_json()['data']]
+
+
+def test_login_required(app):
+    assert app.test_client().get('/api/v1/members').status_code == 401
+
+
+def test_conditional_get(admin, data, db):
+    first = admin.get('/api/v1/members')
+    assert first.status_code == 200 and _ids(first) == [1, 2, 3]
+    etag = first.headers['ETag']
+    assert admin.get('/api/v1/members', headers={'If-None-Match': etag}).status_code == 304
+
+    db.execute("UPDATE members SET belt_level = 'Sarı' WHERE id = 1")
+    db.commit()
+    changed = admin.get('/api/v1/members', headers={'If-None-Match': etag})
+    assert changed.status_code == 200 and changed.headers['ETag'] != etag
+
+
+def test_fields_and_pagination(admin, data):
+    page = admin.get('/api/v1/members?fields=name&limit=2').get_json()
+    assert page['data'] == [{'id': 1, 'name': 'Ali'}, {'id': 2, 'name': 'Can'}]
+    rest = admin.get(f"/api/v1/members?fields=name&limit=2&after={page['next_after']}").get_json()
+    assert rest == {'data': [{'id': 3, 'name': 'Deniz'}], 'next_after': None}
+    assert admin.get('/api/v1/members?fields=sifre').status_code == 400
+
+
+def test_gzip(admin, db):
+    db.executemany('INSERT INTO members (name) VALUES (?)', [(f'Üye {i}',) for i in range(100)])
+    db.commit()
+    response = admin.get('/api/v1/members?limit=100', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert len(json.loads(gzip.decompress(response.get_data()))['data']) == 100
+
+
+def test_trainer_sees_only_own_members(admin, trainer, data):
+    assert _ids(trainer.get('/api/v1/members')) == [1, 2]
+    assert _ids(trainer.get('/api/v1/enrollments')) == [1, 2]
+    assert _ids(trainer.get('/api/v1/payments')) == [1, 2]
+    assert _ids(trainer.get('/api/v1/payments?member_id=3')) == []
+    assert trainer.get('/api/v1/members/3').status_code == 404
+    assert trainer.get('/api/v1/payments/3').status_code == 404
+    assert trainer.get('/api/v1/payments/1').status_code == 200
+
+
+def test_etag_differs_per_user(admin, trainer, data):
+    etag = admin.get('/api/v1/payments').headers['ETag']
+    # Yöneticinin ETag'i eğitmene kapsam dışı verinin önbellekteki kopyasını onaylatamaz
+    assert trainer.get('/api/v1/payments', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_trainer_scope_follows_member_moves(trainer, data, db):
+    first = trainer.get('/api/v1/payments')
+    db.execute('UPDATE members SET trainer_id = 3 WHERE id = 2')
+    db.commit()
+    moved = trainer.get('/api/v1/payments', headers={'If-None-Match': first.headers['ETag']})
+    assert moved.status_code == 200 and _ids(moved) == [1]
+
+
+def test_reports_access(admin, trainer, data):
+    assert trainer.get('/api/v1/reports/monthly').status_code == 403
+    assert admin.get('/api/v1/reports/monthly').status_code == 200
+
+    full = admin.get('/api/v1/reports/settlement/2024-09').get_json()['data']
+    assert {t['trainer_id'] for t in full['trainers']} == {2, 3}
+    own = trainer.get('/api/v1/reports/settlement/2024-09').get_json()['data']
+    assert [t['trainer_id'] for t in own['trainers']] == [2]
+    assert 'total_kurus' not in own and 'salon_kurus' not in own
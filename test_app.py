@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+from app import create_app, ensure_status_current
+from database import get_db_connection
+from subscriptions import count_expiring, queue_renewal_reminders, rebuild_member_status
+
+
+def _add_records(db):
+    db.execute("INSERT INTO trainers (id, name, share_percent) VALUES (2, 'Ayşe Hoca', 40)")
+    db.execute("INSERT INTO classes (id, name, trainer_id) VALUES (1, 'Minikler', 2)")
+    db.execute("INSERT INTO members (id, name, trainer_id) VALUES (1, 'Ali', 2)")
+    db.commit()
+
+
+def _count(db, table):
+    return db.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+
+def test_enroll_rejects_missing_or_unknown_ids(admin, db):
+    _add_records(db)
+    for form in ({'member_id': '', 'class_id': ''}, {'member_id': '1', 'class_id': '99'},
+                 {'member_id': 'x', 'class_id': '1'}):
+        response = admin.post('/enroll', data=form, follow_redirects=True)
+        assert response.status_code == 200
+    assert _count(db, 'enrollments') == 0
+
+    admin.post('/enroll', data={'member_id': '1', 'class_id': '1'})
+    assert _count(db, 'enrollments') == 1
+
+
+def test_enroll_error_is_shown_on_the_form(admin, db):
+    _add_records(db)
+    page = admin.post('/enroll', data={'member_id': '', 'class_id': '1'}, follow_redirects=True)
+    assert 'Üye: Listeden bir kayıt seçin.' in page.get_data(as_text=True)
+
+
+def test_add_payment_requires_existing_member_and_date(admin, db):
+    _add_records(db)
+    page = admin.post('/add_payment', data={'member_id': '', 'amount': '100', 'date': '2024-09-01', 'note': ''},
+                      follow_redirects=True)
+    assert 'Üye: Listeden bir kayıt seçin.' in page.get_data(as_text=True)
+    admin.post('/add_payment', data={'member_id': '42', 'amount': '100', 'date': '2024-09-01', 'note': ''})
+    admin.post('/add_payment', data={'member_id': '1', 'amount': '100', 'date': '', 'note': ''})
+    assert _count(db, 'payments') == 0
+
+    admin.post('/add_payment', data={'member_id': '1', 'amount': '100', 'date': '2024-09-01', 'note': ''})
+    assert _count(db, 'payments') == 1
+
+
+def test_class_trainer_is_optional_but_must_exist(admin, db):
+    _add_records(db)
+    admin.post('/add_class', data={'name': 'Yeni', 'description': '', 'day': '', 'time': '', 'trainer_id': '77'})
+    assert _count(db, 'classes') == 1
+    admin.post('/add_class', data={'name': 'Yeni', 'description': '', 'day': '', 'time': '', 'trainer_id': ''})
+    assert db.execute("SELECT trainer_id FROM classes WHERE name = 'Yeni'").fetchone()[0] is None
+
+    page = admin.post('/update_class/1', data={'name': 'Minikler', 'description': '', 'day': '', 'time': '',
+                                               'trainer_id': '77'}, follow_redirects=True)
+    assert 'Eğitmen: Seçilen kayıt bulunamadı' in page.get_data(as_text=True)
+    assert db.execute('SELECT trainer_id FROM classes WHERE id = 1').fetchone()[0] == 2
+
+
+def test_deleted_member_leaves_no_status_row(admin, db):
+    _add_records(db)
+    today = datetime.now().date()
+    admin.post('/add_payment', data={'member_id': '1', 'amount': '100', 'date': today.isoformat(), 'note': ''})
+    db.execute('UPDATE payments SET end_date = ?', ((today + timedelta(days=3)).isoformat(),))
+    rebuild_member_status(db, today)
+    db.commit()
+    assert count_expiring(db, today=today) == 1
+
+    admin.post('/delete_member/1')
+    # Ödemeleri kalsa da silinmiş üye sayılmaz ve hatırlatma açılmaz
+    assert _count(db, 'payments') == 1
+    assert _count(db, 'member_status') == 0
+    assert count_expiring(db, today=today) == 0
+    assert queue_renewal_reminders(db, today=today) == 0
+
+
+def test_status_check_is_per_app(app, db_path):
+    other = create_app({'DATABASE': db_path, 'SCHEDULER_ENABLED': False, 'TESTING': True})
+    try:
+        with app.app_context():
+            ensure_status_current(get_db_connection())
+        assert app.extensions['status_checked_on'] == datetime.now().date()
+        assert 'status_checked_on' not in other.extensions
+    finally:
+        other.extensions['write_queue'].close()
+        other.extensions['db_pool'].close_all()
@@ -0,0 +1,31 @@
+import threading
+
+import pytest
+
+import auth
+from auth import HashBusy, verify_password
+
+
+@pytest.fixture
+def busy_pool(monkeypatch):
+    """Hash havuzundaki bütün thread'ler meşgul; sıra beklenmez."""
+    monkeypatch.setattr(auth, 'HASH_TIMEOUT', 0.05)
+    gate = threading.Event()
+    blockers = [auth._executor.submit(gate.wait, 5) for _ in range(auth.HASH_WORKERS)]
+    yield
+    gate.set()
+    for blocker in blockers:
+        blocker.result(5)
+
+
+def test_verify_password_raises_hash_busy(busy_pool):
+    with pytest.raises(HashBusy):
+        verify_password('pbkdf2:sha256:1$x$y', 'z')
+
+
+def test_login_returns_503_when_hash_pool_is_busy(app, busy_pool):
+    response = app.test_client().post('/login', data={'username': 'admin1', 'password': '1234'})
+    assert response.status_code == 503
+    assert 'tekrar deneyin' in response.get_data(as_text=True)
+    # Yoğunluk başarısız deneme sayılmaz
+    assert not auth.login_blocked('admin1', '127.0.0.1')
@@ -0,0 +1,101 @@
+import io
+import sqlite3
+
+import pytest
+
+from bulk_import import RowError, import_members, import_payments, normalize_amount
+
+
+@pytest.mark.parametrize('text, amount', [
+    ('1.250', 1250),
+    ('1.250.000', 1250000),
+    ('-1.250', -1250),
+    ('1.250,50', 1250.5),
+    ('1,250.50', 1250.5),
+    ('1250.50', 1250.5),
+    ('1.25', 1.25),
+    ('12.5', 12.5),
+    ('1250,5', 1250.5),
+    ('₺ 1.250', 1250),
+    ('1250 TL', 1250),
+])
+def test_normalize_amount(text, amount):
+    assert normalize_amount(text) == amount
+
+
+def test_normalize_amount_rejects_garbage():
+    assert normalize_amount('  ') is None
+    with pytest.raises(RowError):
+        normalize_amount('bin lira')
+
+
+def _connection(path):
+    conn = sqlite3.connect(path, isolation_level='IMMEDIATE')
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _members(count, other_path=None):
+    for i in range(count):
+        if other_path and i == 2:
+            # İkinci parçaya geçerken başka bir bağlantı beklemeden yazabilmeli
+            other = sqlite3.connect(other_path, timeout=0)
+            other.execute("INSERT INTO trainers (name) VALUES ('araya giren')")
+            other.commit()
+            other.close()
+        yield i + 2, {'name': f'Üye {i}', 'email': f'uye{i % 3}@example.com', 'phone': ''}
+
+
+def test_member_dry_run_writes_nothing_and_holds_no_lock(db_path):
+    conn = _connection(db_path)
+    result = import_members(conn, _members(5, db_path), dry_run=True, batch_size=2)
+    conn.close()
+    # 3 farklı e-posta: 3 yeni, 2 güncelleme (ikisi önceki parçadaki kişiler)
+    assert (result['inserted'], result['updated']) == (3, 2)
+    db = sqlite3.connect(db_path)
+    assert db.execute('SELECT COUNT(*) FROM members').fetchone()[0] == 0
+    assert db.execute('SELECT COUNT(*) FROM trainers').fetchone()[0] == 1
+
+
+def test_member_dry_run_matches_real_import(db_path):
+    conn = _connection(db_path)
+    dry = import_members(conn, _members(7), dry_run=True, batch_size=2)
+    real = import_members(conn, _members(7), batch_size=2)
+    conn.close()
+    assert (dry['inserted'], dry['updated']) == (real['inserted'], real['updated'])
+    assert sqlite3.connect(db_path).execute('SELECT COUNT(*) FROM members').fetchone()[0] == 3
+
+
+def test_payment_import(db_path):
+    conn = _connection(db_path)
+    conn.execute("INSERT INTO members (id, name, email, phone) VALUES (1, 'Ali', 'ali@example.com', '05321112233')")
+    conn.commit()
+    rows = [
+        (2, {'email': 'ALI@example.com', 'amount': '1.250', 'payment_date': '01.09.2024'}),
+        (3, {'phone': '+90 532 111 22 33', 'amount': '1.250,50', 'payment_date': '2024-10-01'}),
+        (4, {'member_id': '99', 'amount': '100', 'payment_date': '2024-10-01'}),
+        (5, {'member_id': '1', 'amount': '', 'payment_date': '2024-10-01'}),
+    ]
+    dry = import_payments(conn, iter(rows), dry_run=True)
+    assert dry['inserted'] == 2 and [line for line, _ in dry['errors']] == [4, 5]
+    assert conn.execute('SELECT COUNT(*) FROM payments').fetchone()[0] == 0
+
+    import_payments(conn, iter(rows))
+    assert [tuple(row) for row in conn.execute('SELECT amount, period FROM payments ORDER BY id')] == [
+        (1250.0, 202409), (1250.5, 202410)]
+    conn.close()
+
+
+def test_import_route_rejects_unknown_kind(admin, db):
+    page = admin.post('/import', data={'kind': 'trainers', 'file': (io.BytesIO(b'name\nAli\n'), 'x.csv')},
+                      follow_redirects=True)
+    assert page.status_code == 200
+    assert 'Aktarım türü ve dosya seçilmeli.' in page.get_data(as_text=True)
+
+
+def test_import_route_writes_through_the_write_queue(app, admin, db):
+    csv_file = io.BytesIO('name,email\nAli,ali@example.com\nCan,can@example.com\n'.encode())
+    page = admin.post('/import', data={'kind': 'members', 'upsert': '1', 'file': (csv_file, 'uyeler.csv')})
+    assert page.status_code == 200
+    assert db.execute('SELECT COUNT(*) FROM members').fetchone()[0] == 2
+    assert app.extensions['write_queue'].stats()['jobs'] >= 1
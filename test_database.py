@@ -0,0 +1,35 @@
+import time
+
+import database
+from database import ConnectionPool, connect
+
+
+def test_warm_opens_connections_up_front(db_path):
+    pool = ConnectionPool(db_path, size=4)
+    pool.warm(3)
+    stats = pool.stats()
+    assert (stats['open'], stats['idle']) == (3, 3)
+    pool.release(pool.acquire())
+    assert pool.stats()['hits'] == 1
+    pool.warm(10)
+    assert pool.stats()['open'] == 4
+    pool.close_all()
+
+
+def test_query_time_includes_fetching(db_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(database, 'query_listeners', [lambda conn, sql, params, elapsed: calls.append((sql, elapsed))])
+    conn = connect(db_path)
+    conn.create_function('slow', 1, lambda x: time.sleep(0.002) or x)
+    calls.clear()               # Bağlantı açılışındaki PRAGMA'lar
+    cursor = conn.execute('WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 50) '
+                          'SELECT slow(i) FROM n')
+    assert calls == []          # Satırlar henüz okunmadı
+    assert len(list(cursor)) == 50
+    assert len(calls) == 1 and calls[0][1] >= 0.1
+
+    # Sonuna kadar okunmayan imleç bırakılınca bildirilir
+    assert conn.execute('SELECT 1 UNION ALL SELECT 2').fetchone()[0] == 1
+    conn.execute('CREATE TABLE t (x)')
+    assert len(calls) == 3
+    conn.close()
@@ -0,0 +1,56 @@
+from export import payments_query, stream_rows
+
+
+def _setup(db):
+    db.executescript("""
+        INSERT INTO trainers (id, name) VALUES (1, 'Ayşe'), (2, 'Mehmet');
+        INSERT INTO classes (id, name, trainer_id) VALUES (10, 'Minikler', 1), (11, 'Gençler', 1), (20, 'Yetişkin', 2);
+        INSERT INTO members (id, name) VALUES (1, 'Ali'), (2, 'Can'), (3, 'Ece');
+        INSERT INTO enrollments (member_id, class_id) VALUES (1, 10), (2, 11), (3, 20);
+        -- Eski form: sadece date / period
+        INSERT INTO payments (id, member_id, amount, date, period) VALUES (1, 1, 100, '2024-09-05', 202409);
+        INSERT INTO payments (id, member_id, amount, payment_date, period) VALUES (2, 2, 200, '2024-09-20', 202409);
+        INSERT INTO payments (id, member_id, amount, payment_date, period) VALUES (3, 3, 300, '2024-10-01', 202410);
+        INSERT INTO payments (id, member_id, amount, payment_date, period) VALUES (4, 1, 400, '2024-08-31', 202408);
+    """)
+    db.commit()
+
+
+def _ids(db, **filters):
+    sql, params = payments_query(**filters)
+    return [row['id'] for row in db.execute(sql, params)]
+
+
+def test_date_filter_includes_legacy_payments(db):
+    _setup(db)
+    assert _ids(db, start='2024-09-01', end='2024-09-30') == [1, 2]
+    assert _ids(db, start='2024-09-10') == [2, 3]
+    assert _ids(db, end='2024-09-05') == [1, 4]
+    sql, params = payments_query(start='2024-09-01', end='2024-09-30')
+    assert db.execute(sql, params).fetchone()['payment_date'] == '2024-09-05'
+
+
+def test_date_filter_treats_empty_payment_date_as_missing(db):
+    _setup(db)
+    db.execute("INSERT INTO payments (id, member_id, amount, payment_date, date, period) "
+               "VALUES (5, 2, 50, '', '2024-09-10', 202409)")
+    db.commit()
+    assert _ids(db, start='2024-09-01', end='2024-09-30') == [1, 2, 5]
+    sql, params = payments_query(start='2024-09-10', end='2024-09-10')
+    assert [dict(row)['payment_date'] for row in db.execute(sql, params)] == ['2024-09-10']
+
+
+def test_trainer_and_class_filters_combine(db):
+    _setup(db)
+    assert _ids(db, trainer_id=1) == [1, 2, 4]
+    assert _ids(db, class_id=11) == [2]
+    assert _ids(db, trainer_id=1, class_id=11) == [2]
+    assert _ids(db, trainer_id=2, class_id=11) == []
+
+
+def test_stream_rows_csv(db):
+    _setup(db)
+    sql, params = payments_query(class_id=20)
+    text = ''.join(stream_rows(db, sql, params, 'csv'))
+    assert text.lstrip('\ufeff').splitlines()[0].startswith('id,member_id,member_name,amount,payment_date')
+    assert '3,3,Ece,300.0,2024-10-01' in text
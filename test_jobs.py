@@ -0,0 +1,81 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import jobs
+from jobs import Heartbeat, Job, Scheduler, _iso, _now
+
+
+@pytest.fixture
+def scheduler(app):
+    calls = []
+
+    def ok():
+        calls.append('ok')
+        return 'tamam'
+
+    def broken():
+        calls.append('broken')
+        raise RuntimeError('bozuk')
+
+    scheduler = Scheduler(app, jobs=(Job('ok', 'Çalışan', ok, '03:00'),
+                                     Job('broken', 'Hatalı', broken, '03:00', max_attempts=2)))
+    scheduler.calls = calls
+    yield scheduler
+    scheduler._drop_connection()
+
+
+def _job(db, name):
+    return db.execute('SELECT * FROM jobs WHERE name = ? ORDER BY id DESC LIMIT 1', (name,)).fetchone()
+
+
+def test_run_now_executes_and_records(app, scheduler, db):
+    with app.app_context():
+        scheduler.run_now(scheduler._connection(), 'ok')
+        scheduler.tick()
+        row = db.execute("SELECT * FROM jobs WHERE name = 'ok' AND status = 'done'").fetchone()
+        assert row['result'] == 'tamam' and row['worker'] == scheduler.worker
+        # Sonraki turda bir sonraki gece planlanır
+        scheduler.tick()
+    assert _job(db, 'ok')['status'] == 'pending'
+    assert scheduler.calls == ['ok']
+
+
+def test_failing_job_backs_off_then_fails(app, scheduler, db):
+    with app.app_context():
+        scheduler.run_now(scheduler._connection(), 'broken')
+        scheduler.tick()
+        row = _job(db, 'broken')
+        assert (row['status'], row['attempts']) == ('pending', 1)
+        assert datetime.fromisoformat(row['run_at']) > _now()
+
+        scheduler.tick(now=_now() + timedelta(seconds=jobs.JOB_BACKOFF_SECONDS + 1))
+    row = db.execute("SELECT * FROM jobs WHERE name = 'broken' AND status = 'failed'").fetchone()
+    assert row['attempts'] == 2 and 'bozuk' in row['error']
+    assert scheduler.calls.count('broken') == 2
+
+
+def _running(db, worker, started):
+    db.execute('''
+        INSERT INTO jobs (name, status, run_at, attempts, max_attempts, worker, started_at, heartbeat_at)
+        VALUES ('ok', 'running', ?, 1, 3, ?, ?, ?)
+    ''', (_iso(started), worker, _iso(started), _iso(started)))
+    db.commit()
+    return db.execute('SELECT last_insert_rowid()').fetchone()[0]
+
+
+def test_job_without_heartbeat_is_recovered(scheduler, db):
+    _running(db, 'ölü-süreç', _now() - timedelta(seconds=jobs.JOB_STALE_SECONDS + 60))
+    scheduler._recover_stale(scheduler._connection(), _now())
+    assert _job(db, 'ok')['status'] == 'pending'
+
+
+def test_long_job_with_heartbeat_is_not_recovered(db_path, scheduler, db):
+    # Saatlerdir çalışan ama nabız veren iş
+    job_id = _running(db, scheduler.worker, _now() - timedelta(hours=3))
+    with Heartbeat(db_path, job_id, scheduler.worker, interval=0.05):
+        time.sleep(0.3)
+    later = _now() + timedelta(seconds=jobs.JOB_STALE_SECONDS - 60)
+    scheduler._recover_stale(scheduler._connection(), later)
+    assert _job(db, 'ok')['status'] == 'running'
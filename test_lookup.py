@@ -0,0 +1,43 @@
+import pytest
+
+from lookup import lookup_by_name
+
+
+@pytest.fixture
+def members(db):
+    db.executemany('INSERT INTO members (id, name) VALUES (?, ?)', [
+        (1, 'Ali Veli'), (2, 'Mehmet Ali Can'), (3, 'Alize Kaya'), (4, 'Işık Demir'),
+        (5, '100% Aktif'), (6, 'Aylin_Tan'),
+    ])
+    db.execute("INSERT INTO trainers (id, name) VALUES (1, 'Ayşe Hoca'), (2, 'Mert Ayşe')")
+    db.commit()
+    return db
+
+
+def _names(rows):
+    return [row['name'] for row in rows]
+
+
+def test_prefix_matches_come_first(members):
+    # Ön ek eşleşmeleri (indeks aralığı) önce, kelime başı eşleşmeleri sonra
+    assert _names(lookup_by_name(members, 'members', 'Ali')) == ['Ali Veli', 'Alize Kaya', 'Mehmet Ali Can']
+
+
+def test_word_start_match_ignores_case_and_turkish_letters(members):
+    assert _names(lookup_by_name(members, 'members', 'ali')) == ['Ali Veli', 'Alize Kaya', 'Mehmet Ali Can']
+    assert _names(lookup_by_name(members, 'members', 'isik')) == ['Işık Demir']
+    assert _names(lookup_by_name(members, 'members', 'ali ca')) == ['Mehmet Ali Can']
+
+
+def test_like_wildcards_are_plain_text(members):
+    assert _names(lookup_by_name(members, 'members', '%')) == []
+    assert _names(lookup_by_name(members, 'members', '_')) == []
+    assert _names(lookup_by_name(members, 'members', '100%')) == ['100% Aktif']
+
+
+def test_small_tables_use_prefix_only(members):
+    assert _names(lookup_by_name(members, 'trainers', 'Ayşe')) == ['Ayşe Hoca']
+
+
+def test_limit(members):
+    assert len(lookup_by_name(members, 'members', 'Al', limit=1)) == 1
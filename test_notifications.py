@@ -0,0 +1,182 @@
+import json
+import smtplib
+from datetime import date, datetime, timedelta
+
+import notifications
+from notifications import (FileTransport, SMTPTransport, _email_address, _mobile_number, _renewal_messages,
+                           claim_batch, dispatch, queue_renewal_notifications, release_stale_claims)
+from subscriptions import queue_renewal_reminders, rebuild_member_status
+
+
+class NoWait:
+    def wait(self, count):
+        pass
+
+
+LIMITERS = {'email': NoWait(), 'sms': NoWait()}
+
+
+def _write(db):
+    """writes.write yerine: func'ı tek transaction'da çalıştırıp sonucunu döndürür."""
+    def write(func):
+        with db:
+            return func(db, None)
+    return write
+
+
+def _outbox(db, count, channel='email'):
+    now = datetime.now().isoformat(timespec='seconds')
+    db.executemany('''
+        INSERT INTO outbox (dedupe_key, channel, recipient, body, created_at) VALUES (?, ?, ?, ?, ?)
+    ''', [(f'test:{i}:{channel}', channel, f'uye{i}@example.com', 'merhaba', now) for i in range(count)])
+    db.commit()
+
+
+def _statuses(db):
+    return {row['status']: row['n'] for row in db.execute('SELECT status, COUNT(*) AS n FROM outbox GROUP BY status')}
+
+
+class Recorder:
+    def __init__(self, fail=()):
+        self.sent = []
+        self.fail = set(fail)
+
+    def send(self, messages):
+        self.sent.extend(message['id'] for message in messages)
+        return {message['id']: ('reddedildi' if message['id'] in self.fail else None) for message in messages}
+
+
+def test_validation_helpers():
+    assert _email_address(' veli@example.com ') == 'veli@example.com'
+    assert _email_address('yok@') is None
+    assert _mobile_number('+90 532 111 22 33') == '05321112233'
+    assert _mobile_number('532 111 22 33') == '05321112233'
+    assert _mobile_number('0212 111 22 33') is None
+
+
+def test_queue_is_deduplicated_per_month(db):
+    today = date.today()
+    db.execute("INSERT INTO members (id, name, email, phone) VALUES (1, 'Ali', 'ali@example.com', '05321112233')")
+    db.execute('INSERT INTO payments (member_id, amount, payment_date, start_date, end_date) VALUES (1, 100, ?, ?, ?)',
+               (today.isoformat(), (today - timedelta(days=25)).isoformat(), (today + timedelta(days=3)).isoformat()))
+    rebuild_member_status(db, today)
+    queue_renewal_reminders(db, today=today)
+    db.commit()
+    assert queue_renewal_notifications(db, ['email', 'sms'], today) == 2
+    assert queue_renewal_notifications(db, ['email', 'sms'], today) == 0
+
+
+def test_dispatch_sends_and_records(db):
+    _outbox(db, 5)
+    transport = Recorder(fail={2})
+    totals = dispatch({'email': transport}, _write(db), batch_size=2, limiters=LIMITERS)
+    assert totals == {'sent': 4, 'failed': 1}
+    assert sorted(transport.sent) == [1, 2, 3, 4, 5]
+    assert _statuses(db) == {'sent': 4, 'pending': 1}
+    row = db.execute('SELECT * FROM outbox WHERE id = 2').fetchone()
+    assert row['attempts'] == 1 and row['claimed_by'] is None
+
+
+def test_claimed_rows_are_not_sent_twice(db):
+    _outbox(db, 4)
+    # Başka bir gönderici ilk iki mesajı sahiplenmiş ve hâlâ gönderiyor
+    with db:
+        claimed = claim_batch(db, 'email', 'diger', 2)
+    assert [message['id'] for message in claimed] == [1, 2]
+    transport = Recorder()
+    dispatch({'email': transport}, _write(db), limiters=LIMITERS)
+    assert transport.sent == [3, 4]
+    assert _statuses(db) == {'sending': 2, 'sent': 2}
+
+
+def test_stale_claims_are_released(db, monkeypatch):
+    _outbox(db, 2)
+    monkeypatch.setattr(notifications, 'NOTIFY_MAX_ATTEMPTS', 2)
+    with db:
+        claim_batch(db, 'email', 'olu', 2)
+        db.execute('UPDATE outbox SET attempts = 1 WHERE id = 2')
+    later = datetime.now() + timedelta(seconds=notifications.NOTIFY_CLAIM_SECONDS + 60)
+    assert release_stale_claims(db, datetime.now()) == 0
+    with db:
+        assert release_stale_claims(db, later) == 2
+    rows = {row['id']: row for row in db.execute('SELECT * FROM outbox')}
+    assert rows[1]['status'] == 'pending' and rows[1]['claimed_by'] is None
+    assert rows[2]['status'] == 'failed'
+
+
+def test_connection_error_fails_the_whole_batch(db):
+    _outbox(db, 3)
+
+    class Down:
+        def send(self, messages):
+            raise ConnectionRefusedError('bağlantı yok')
+
+    totals = dispatch({'email': Down()}, _write(db), limiters=LIMITERS)
+    assert totals == {'sent': 0, 'failed': 3}
+    assert _statuses(db) == {'pending': 3}
+
+
+def test_file_transport(tmp_path):
+    path = tmp_path / 'out.jsonl'
+    message = {'id': 7, 'channel': 'sms', 'recipient': '05321112233', 'subject': None, 'body': 'selam'}
+    assert FileTransport(str(path)).send([message]) == {7: None}
+    assert json.loads(path.read_text(encoding='utf-8')) == message
+
+
+class DroppingSMTP:
+    """Üçüncü mesajda bağlantısı kopan SMTP sunucusu."""
+    sent = []
+
+    def __init__(self, host, port, timeout):
+        pass
+
+    def send_message(self, email):
+        if len(self.sent) == 2:
+            raise smtplib.SMTPServerDisconnected('bağlantı koptu')
+        if email['To'] == 'yok@example.com':
+            raise smtplib.SMTPRecipientsRefused({email['To']: (550, b'yok')})
+        self.sent.append(email['To'])
+
+    def quit(self):
+        raise smtplib.SMTPServerDisconnected('bağlantı yok')
+
+    def close(self):
+        pass
+
+
+def test_smtp_disconnect_keeps_delivered_messages(db, monkeypatch):
+    monkeypatch.setattr(smtplib, 'SMTP', DroppingSMTP)
+    monkeypatch.setattr(DroppingSMTP, 'sent', [])
+    now = datetime.now().isoformat(timespec='seconds')
+    db.executemany('INSERT INTO outbox (dedupe_key, channel, recipient, body, created_at) VALUES (?, ?, ?, ?, ?)',
+                   [(f'test:{i}', 'email', recipient, 'merhaba', now) for i, recipient in
+                    enumerate(['a@example.com', 'yok@example.com', 'b@example.com', 'c@example.com', 'd@example.com'])])
+    db.commit()
+    totals = dispatch({'email': SMTPTransport('localhost')}, _write(db), limiters=LIMITERS)
+    assert totals == {'sent': 2, 'failed': 3}
+    assert DroppingSMTP.sent == ['a@example.com', 'b@example.com']
+    rows = {row['recipient']: row for row in db.execute('SELECT * FROM outbox')}
+    assert rows['a@example.com']['status'] == rows['b@example.com']['status'] == 'sent'
+    assert 'SMTPRecipientsRefused' in rows['yok@example.com']['error']
+    assert rows['c@example.com']['status'] == 'pending'
+    assert 'SMTPServerDisconnected' in rows['c@example.com']['error']
+
+
+def _member(birth_date, **contacts):
+    row = {'member_id': 1, 'end_date': '2024-09-30', 'name': 'Ali', 'birth_date': birth_date,
+           'email': None, 'phone': None, 'parent_name': 'Ayşe', 'parent_email': None, 'parent_phone': None}
+    row.update(contacts)
+    return {message[2]: message[3] for message in _renewal_messages(row, ['email', 'sms'], 202409, date(2024, 9, 25))}
+
+
+def test_recipient_depends_on_age():
+    contacts = dict(email='ali@example.com', phone='05321112233',
+                    parent_email='veli@example.com', parent_phone='05329998877')
+    # 18 yaşını doldurmuş üye kendisi alır; bir gün önce hâlâ veli
+    assert _member('2006-09-25', **contacts) == {'email': 'ali@example.com', 'sms': '05321112233'}
+    assert _member('2006-09-26', **contacts) == {'email': 'veli@example.com', 'sms': '05329998877'}
+    assert _member(None, **contacts) == {'email': 'ali@example.com', 'sms': '05321112233'}
+    # Yetişkinin kendi adresi yoksa veliye gönderilmez
+    assert _member('1990-01-01', parent_email='veli@example.com') == {}
+    assert _member('2015-01-01', email='ali@example.com') == {'email': 'ali@example.com'}
+    assert _member('', parent_email='veli@example.com') == {'email': 'veli@example.com'}
@@ -0,0 +1,16 @@
+import sqlite3
+import time
+
+from response_cache import ResponseCache
+
+
+def test_purge_expired(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = ResponseCache(disk_path=path)
+    cache.set('/reports?x=1', b'eski', 'text/html', ('payments',), cache.versions(('payments',)), ttl=0.01)
+    cache.set('/reports', b'yeni', 'text/html', ('payments',), cache.versions(('payments',)))
+    time.sleep(0.02)
+    assert cache.purge_expired() == 1
+    assert [row[0] for row in sqlite3.connect(path).execute('SELECT key FROM cache_entries')] == ['/reports']
+    assert cache.get('/reports').body == b'yeni'
+    assert cache.get('/reports?x=1') is None
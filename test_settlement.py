@@ -0,0 +1,74 @@
+import sqlite3
+
+import pytest
+
+from periods import current_period
+from settlement import close_period, settle, trainer_payouts
+
+PERIOD = 202409
+
+
+def _setup(db):
+    db.executescript("""
+        INSERT INTO trainers (id, name, share_percent) VALUES (2, 'Ayşe', 40), (3, 'Mehmet', 50);
+        INSERT INTO classes (id, name, trainer_id) VALUES (10, 'Minikler', 2), (20, 'Yetişkin', 3);
+        INSERT INTO members (id, name) VALUES (1, 'Ali'), (2, 'Can');
+        INSERT INTO enrollments (member_id, class_id) VALUES (1, 10), (2, 20);
+        INSERT INTO payments (member_id, amount, payment_date, period) VALUES
+            (1, 1000, '2024-09-01', 202409), (2, 500.5, '2024-09-02', 202409);
+    """)
+    db.commit()
+
+
+def _trainer_kurus(summary):
+    return {t['trainer_id']: t['trainer_kurus'] for t in summary['trainers']}
+
+
+def test_closed_period_is_read_from_snapshot(db):
+    _setup(db)
+    live = settle(db, [PERIOD])[PERIOD]
+    closed = close_period(db, PERIOD, closed_at='2024-10-01T09:00:00')
+    db.commit()
+    assert closed['closed_at'] == '2024-10-01T09:00:00'
+    assert (closed['total_kurus'], _trainer_kurus(closed)) == (live['total_kurus'], _trainer_kurus(live))
+    assert _trainer_kurus(closed) == {2: 40000, 3: 25025}
+
+    # Pay oranı sonradan değişse de kapatılmış ay değişmez
+    db.execute('UPDATE trainers SET share_percent = 60 WHERE id = 2')
+    db.commit()
+    assert _trainer_kurus(settle(db, [PERIOD])[PERIOD]) == {2: 40000, 3: 25025}
+    assert [row['trainer_kurus'] for row in trainer_payouts(db, 2)] == [40000]
+
+
+def test_period_cannot_be_closed_twice_or_early(db):
+    _setup(db)
+    close_period(db, PERIOD)
+    with pytest.raises(ValueError):
+        close_period(db, PERIOD)
+    with pytest.raises(ValueError):
+        close_period(db, current_period())
+
+
+@pytest.mark.parametrize('sql', [
+    'UPDATE settlement_lines SET trainer_kurus = 0',
+    'DELETE FROM settlement_lines',
+    'UPDATE settlement_periods SET total_kurus = 0',
+    'DELETE FROM settlement_periods',
+])
+def test_snapshot_is_immutable(db, sql):
+    _setup(db)
+    close_period(db, PERIOD)
+    db.commit()
+    with pytest.raises(sqlite3.IntegrityError, match='kapatılmış hakediş'):
+        db.execute(sql)
+
+
+def test_trainer_payout_panel(app, trainer, admin, db):
+    _setup(db)
+    close_period(db, PERIOD)
+    db.commit()
+    page = trainer.get('/trainer/2/payouts').get_data(as_text=True)
+    assert 'Geçmiş Hakedişler' in page and '2024-09' in page
+    assert trainer.get('/trainer/3/payouts').status_code == 403
+    assert admin.get('/trainer/3/payouts').status_code == 200
+    assert '/trainer/2/payouts' in admin.get('/trainer/2').get_data(as_text=True)
@@ -0,0 +1,95 @@
+import sqlite3
+import threading
+
+import pytest
+
+from write_queue import WriteQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    path = str(tmp_path / 'queue.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT NOT NULL)')
+    conn.execute('CREATE TABLE totals (n INTEGER)')
+    conn.close()
+    # Uzun pencere: testteki işler aynı commit'e düşer
+    queue = WriteQueue(path, window=0.2)
+    yield queue, path
+    queue.close()
+
+
+def _names(path):
+    return sorted(row[0] for row in sqlite3.connect(path).execute('SELECT name FROM items'))
+
+
+def _insert(name, defer=None):
+    def job(conn, batch):
+        conn.execute('INSERT INTO items (name) VALUES (?)', (name,))
+        if defer is not None:
+            batch.defer(defer, [name])
+        return name
+    return job
+
+
+def _submit_together(queue, jobs):
+    # Yazıcı ilk işi beklerken diğerleri de sıraya girsin
+    gate = threading.Event()
+    queue.submit(lambda conn, batch: gate.wait(1))
+    futures = [queue.submit(job) for job in jobs]
+    gate.set()
+    return futures
+
+
+def test_jobs_share_one_commit(queue):
+    queue, path = queue
+    futures = _submit_together(queue, [_insert(f'üye {i}') for i in range(5)])
+    assert [future.result(5) for future in futures] == [f'üye {i}' for i in range(5)]
+    assert queue.stats()['max_batch'] >= 5
+    assert len(_names(path)) == 5
+
+
+def test_failing_job_only_rolls_back_itself(queue):
+    queue, path = queue
+
+    def bad(conn, batch):
+        conn.execute("INSERT INTO items (name) VALUES ('yarım')")
+        conn.execute('INSERT INTO items (name) VALUES (NULL)')
+
+    futures = _submit_together(queue, [_insert('a'), bad, _insert('b')])
+    assert futures[0].result(5) == 'a'
+    with pytest.raises(sqlite3.IntegrityError):
+        futures[1].result(5)
+    assert futures[2].result(5) == 'b'
+    assert _names(path) == ['a', 'b']
+
+
+def test_failing_deferred_step_only_fails_its_job(queue):
+    queue, path = queue
+
+    def refresh(conn, names):
+        if 'bozuk' in names:
+            raise ValueError('geçersiz üye')
+        conn.executemany('INSERT INTO totals (n) VALUES (?)', [(len(name),) for name in names])
+
+    futures = _submit_together(queue, [_insert('a', refresh), _insert('bozuk', refresh), _insert('b', refresh)])
+    assert futures[0].result(5) == 'a'
+    with pytest.raises(ValueError):
+        futures[1].result(5)
+    assert futures[2].result(5) == 'b'
+    assert _names(path) == ['a', 'b']
+    assert sqlite3.connect(path).execute('SELECT COUNT(*) FROM totals').fetchone()[0] == 2
+    assert queue.stats()['isolated_batches'] == 1
+
+
+def test_timed_out_write_is_cancelled(queue):
+    queue, path = queue
+    gate = threading.Event()
+    blocker = queue.submit(lambda conn, batch: gate.wait(5))
+    with pytest.raises(TimeoutError):
+        queue.write(_insert('geç'), timeout=0.05)
+    gate.set()
+    blocker.result(5)
+    assert queue.write(_insert('sonra')) == 'sonra'
+    # Süresi dolan iş sonradan commit edilmez; yeniden gönderim çift kayıt açmaz
+    assert _names(path) == ['sonra']
@@ -0,0 +1,282 @@
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from queue import Queue, Empty
+
+from flask import current_app
+from werkzeug.local import LocalProxy
+
+# Gruplu yazma (group commit).
+#
+# Kayıt akşamlarında her POST kendi transaction'ını commit edince her biri
+# ayrı bir fsync bekliyordu. Yazma işleri artık tek bir yazıcı thread'e
+# sıraya konur; yazıcı ilk işi aldıktan sonra en fazla WRITE_BATCH_WINDOW
+# kadar bekleyip gelen işleri toplar ve hepsini tek transaction'da, tek
+# fsync ile commit eder. İstek, kendi yazısını içeren commit diske
+# yazıldıktan sonra yanıt alır (synchronous = FULL).
+#
+# Her iş kendi SAVEPOINT'inde çalışır; hata veren iş sadece kendini geri
+# alır. Rapor toplamı tazeleme gibi işler batch.defer() ile toplanır ve
+# commit'ten önce bir kez çalışır. Ertelenmiş adım hata verirse grup
+# geri alınır ve işler tek tek yeniden çalıştırılır; yine sadece hatanın
+# geldiği iş başarısız olur.
+#
+# Onayı WRITE_TIMEOUT içinde gelmeyen iş henüz başlamadıysa iptal edilir;
+# istek hata alır ve yazı hiç yapılmaz (kullanıcı yeniden gönderince kayıt
+# iki kez açılmaz). Yazıcı işi almışsa commit beklenir.
+
+WRITE_BATCH_WINDOW = 0.005   # Saniye; ilk işten sonra ek iş bekleme süresi
+WRITE_BATCH_SIZE = 64        # Bir commit'te en fazla iş
+WRITE_TIMEOUT = 10           # Saniye; istek yazının onayını en fazla bu kadar bekler
+
+_STOP = object()
+
+
+class WriteBatch:
+    """Bir commit'teki işlerin ortak ertelenmiş adımları."""
+
+    def __init__(self):
+        self.deferred = {}
+
+    def defer(self, func, items=None):
+        """func(conn, items) veya items yoksa func(conn); commit'ten önce bir kez çalışır."""
+        if items is None:
+            self.deferred.setdefault(func, None)
+        else:
+            existing = self.deferred.get(func)
+            self.deferred[func] = (existing or set()) | set(items)
+
+    def run(self, conn):
+        for func, items in self.deferred.items():
+            if items is None:
+                func(conn)
+            else:
+                func(conn, items)
+
+
+class WriteJob:
+    __slots__ = ('func', 'future', 'enqueued')
+
+    def __init__(self, func):
+        self.func = func
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class WriteQueue:
+    """Bir veritabanı dosyasının tek yazıcısı; her uygulamanın kendi kuyruğu vardır
+    (create_app, app.extensions['write_queue'])."""
+
+    def __init__(self, path=None, window=WRITE_BATCH_WINDOW, max_size=WRITE_BATCH_SIZE):
+        self.path = path
+        self.window = window
+        self.max_size = max_size
+        self._reset()
+
+    def _reset(self):
+        self._queue = Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._conn = None
+        self.batches = 0
+        self.jobs = 0
+        self.failed_jobs = 0
+        self.failed_batches = 0
+        self.isolated_batches = 0
+        self.max_batch = 0
+        self.commit_time = 0.0
+        self.max_commit_time = 0.0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    # --- İstek tarafı ---
+
+    def submit(self, func):
+        """func(conn, batch) yazıcı thread'de çalışır; commit sonrası sonucu dönen Future."""
+        self._start()
+        job = WriteJob(func)
+        self._queue.put(job)
+        return job.future
+
+    def write(self, func, timeout=WRITE_TIMEOUT):
+        """İşi sıraya koyar ve commit'in diske yazılmasını bekler.
+
+        Süre dolduğunda iş hâlâ sıradaysa iptal edilip TimeoutError yükselir.
+        """
+        future = self.submit(func)
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            if future.cancel():
+                raise
+            # Yazıcı işi almış; yarıda bırakılırsa yazı yine de commit olur
+            return future.result()
+
+    # --- Yazıcı thread ---
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+                self._thread.start()
+
+    def _connection(self):
+        if self._conn is None:
+            from database import connect
+            conn = connect(self.path)            # Havuza ait olmayan, yazıcıya özel bağlantı
+            conn.isolation_level = None          # BEGIN/COMMIT burada elle yönetilir
+            conn.execute('PRAGMA synchronous = FULL')
+            self._conn = conn
+        return self._conn
+
+    def _collect(self, first):
+        jobs = [first]
+        deadline = time.perf_counter() + self.window
+        while len(jobs) < self.max_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except Empty:
+                break
+            if job is _STOP:
+                self._queue.put(_STOP)
+                break
+            jobs.append(job)
+        return jobs
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            jobs = self._collect(first)
+            try:
+                self._commit(jobs)
+            except Exception as e:
+                # Bağlantı bozulduysa bir sonraki batch yenisini açar
+                self._drop_connection()
+                for job in jobs:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+        self._drop_connection()
+
+    def _commit(self, jobs):
+        # Süresi dolup iptal edilmiş işler atlanır; kalanlar artık iptal edilemez
+        jobs = [job for job in jobs if job.future.set_running_or_notify_cancel()]
+        if not jobs:
+            return
+        started = time.perf_counter()
+        try:
+            results = self._transaction(jobs)
+        except Exception:
+            with self._lock:
+                self.failed_batches += 1
+            if len(jobs) == 1:
+                raise
+            # Ertelenmiş adım veya COMMIT hata verdi; hangi işten geldiği
+            # bilinmiyor. İşler tek tek kendi transaction'larında yeniden
+            # çalışır, sadece hatalı iş başarısız olur.
+            self._drop_connection()
+            results = []
+            for job in jobs:
+                try:
+                    results.extend(self._transaction([job]))
+                except Exception as e:
+                    results.append((job, None, e))
+            with self._lock:
+                self.isolated_batches += 1
+
+        finished = time.perf_counter()
+        failed = 0
+        for job, value, error in results:
+            if error is None:
+                job.future.set_result(value)
+            else:
+                failed += 1
+                job.future.set_exception(error)
+
+        with self._lock:
+            self.batches += 1
+            self.jobs += len(jobs)
+            self.failed_jobs += failed
+            self.max_batch = max(self.max_batch, len(jobs))
+            self.commit_time += finished - started
+            self.max_commit_time = max(self.max_commit_time, finished - started)
+            for job in jobs:
+                waited = finished - job.enqueued
+                self.wait_time += waited
+                self.max_wait_time = max(self.max_wait_time, waited)
+
+    def _transaction(self, jobs):
+        """İşleri tek transaction'da çalıştırır; [(iş, sonuç, hata)] döndürür.
+
+        İşin kendi hatası sadece o işi geri alır. Ertelenmiş adımların veya
+        COMMIT'in hatası tüm transaction'ı geri alıp yükseltilir.
+        """
+        conn = self._connection()
+        batch = WriteBatch()
+        results = []
+
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for job in jobs:
+                conn.execute('SAVEPOINT job')
+                try:
+                    results.append((job, job.func(conn, batch), None))
+                except Exception as e:
+                    conn.execute('ROLLBACK TO job')
+                    results.append((job, None, e))
+                conn.execute('RELEASE job')
+            batch.run(conn)
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        return results
+
+    def _drop_connection(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    # --- Yaşam döngüsü ---
+
+    def close(self, timeout=WRITE_TIMEOUT):
+        """Sıradaki işleri bitirip yazıcıyı durdurur."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        self._thread = None
+
+    def after_fork(self):
+        # Ana süreçteki thread ve bağlantı çocuğa geçmez; sıfırdan başla
+        self._reset()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'jobs': self.jobs,
+                'failed_jobs': self.failed_jobs,
+                'failed_batches': self.failed_batches,
+                'isolated_batches': self.isolated_batches,
+                'queued': self._queue.qsize(),
+                'max_batch': self.max_batch,
+                'avg_batch': round(self.jobs / self.batches, 2) if self.batches else 0,
+                'avg_commit_ms': round(self.commit_time / self.batches * 1000, 3) if self.batches else 0,
+                'max_commit_ms': round(self.max_commit_time * 1000, 3),
+                'avg_wait_ms': round(self.wait_time / self.jobs * 1000, 3) if self.jobs else 0,
+                'max_wait_ms': round(self.max_wait_time * 1000, 3),
+            }
+
+
+# Etkin uygulamanın yazma kuyruğu
+writes = LocalProxy(lambda: current_app.extensions['write_queue'])